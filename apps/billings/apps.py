@@ -6,6 +6,6 @@ class BillingsConfig(AppConfig):
     name = 'apps.billings'
 
     def ready(self) -> None:
-        ''' Load the Bbillings App Signals. '''
-        from apps.billings import signals
-        return super().ready()
\ No newline at end of file
+        ''' Load the Bbillings App Signals and outbox event handlers. '''
+        from apps.billings import signals, handlers
+        return super().ready()
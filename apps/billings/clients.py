@@ -0,0 +1,227 @@
+"""
+Process-wide EasySwitch clients.
+
+Building an EasySwitch client validates its configuration and instantiates
+every provider adapter, and the SDK opens (then closes) a fresh HTTP session
+and event loop for each call: no connection to a provider is ever reused.
+
+`get_client` returns one `PooledEasySwitch` per provider configuration,
+built once and shared by every thread of the process. Its calls run on a
+single background event loop where each adapter keeps its HTTP session
+open, so provider connections are kept alive between requests. A client is
+rebuilt when the EASYSWITCH_* settings it was built from change.
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+from django.conf import settings
+from easyswitch import EasySwitch, Provider
+from easyswitch.utils.http import HTTPClient
+
+logger = logging.getLogger(__name__)
+
+
+def get_client_config() -> Dict[str, Any]:
+    ''' Return the EasySwitch configuration built from settings. '''
+
+    return {
+        "debug": True,
+        # "default_provider": Provider.PAYGATE,
+        "providers": {
+            Provider.PAYGATE: {
+                "api_key": settings.EASYSWITCH_PAYGATE_API_KEY,
+                "environment": settings.EASYSWITCH_ENVIRONMENT,
+                "callback_url": settings.EASYSWITCH_PAYGATE_CALLBACK_URL,
+            },
+            Provider.CINETPAY: {
+                "api_key": settings.EASYSWITCH_CINETPAY_API_KEY,
+                "callback_url": settings.EASYSWITCH_CINETPAY_CALLBACK_URL,
+                "environment": settings.EASYSWITCH_ENVIRONMENT,
+                "extra": {
+                    "secret": settings.EASYSWITCH_CINETPAY_X_SECRET,
+                    "site_id": settings.EASYSWITCH_CINETPAY_X_STIE_ID,
+                    "channels": "ALL",     # More details on Cinetpay's documentation.
+                    "lang": "fr"        # More details on Cinetpay's documentation.
+                }
+            },
+            Provider.FEDAPAY: {
+                "api_secret": settings.EASYSWITCH_FEDAPAY_SECRET_KEY,
+                "callback_url": settings.EASYSWITCH_FEDAPAY_CALLBACK_URL,
+                "timeout": 60,
+                "environment": settings.EASYSWITCH_ENVIRONMENT,
+                "extra": {
+                    "webhook_secret": settings.EASYSWITCH_FEDAPAY_WEBHOOK_SECRET,
+                }
+            },
+        }
+    }
+
+
+####
+##      EVENT LOOP
+#####
+class EventLoopThread:
+    ''' An asyncio event loop running forever in a daemon thread. '''
+
+    def __init__(self):
+        self.loop = None
+        self._lock = threading.Lock()
+
+    def get_loop(self):
+        ''' Return the running loop, started on first use. '''
+
+        if self.loop is None:
+            with self._lock:
+                if self.loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target = loop.run_forever, name = 'easyswitch-loop', daemon = True
+                    ).start()
+                    self.loop = loop
+        return self.loop
+
+    def run(self, coroutine):
+        ''' Run coroutine on the loop and return its result, from any thread. '''
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self.get_loop()).result()
+
+
+event_loop = EventLoopThread()
+
+
+####
+##      POOLED CLIENT
+#####
+class KeepAliveHTTPClient(HTTPClient):
+    ''' HTTP client whose session outlives `async with` blocks, keeping connections alive. '''
+
+    @property
+    def is_closed(self) -> bool:
+        # ADAPTERS REPLACE A CLOSED CLIENT ON EVERY CALL, THIS ONE (RE)OPENS ITS SESSION ON ENTRY
+        return False
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def close_session(self) -> None:
+        await super().close_session()
+        # THE SESSION CLOSED ITS CONNECTOR, A NEW SESSION NEEDS A NEW ONE
+        self.connector = None
+
+
+class PooledEasySwitch(EasySwitch):
+    '''
+    EasySwitch client running every call on the shared event loop, with
+    one persistent HTTP session per provider adapter.
+    '''
+
+    def _initialize_integrators(self):
+        super()._initialize_integrators()
+
+        # ADAPTERS CALL get_client(), RETURNING THEIR "client" UNLESS IT IS CLOSED
+        for integrator in self._integrators.values():
+            client = getattr(integrator, 'client', None)
+            if isinstance(client, HTTPClient) and not isinstance(client, KeepAliveHTTPClient):
+                integrator.client = KeepAliveHTTPClient(
+                    base_url = client.base_url,
+                    default_headers = client.default_headers,
+                    timeout = client.timeout.total,
+                    max_retries = client.max_retries,
+                    retry_delay = client.retry_delay,
+                    debug = client.debug,
+                    proxy = client.proxy,
+                    pool_size = client.pool_size,
+                )
+
+    def send_payment(self, transaction, provider: Optional[Provider] = None):
+        provider = provider or transaction.provider or self.config.default_provider
+        return event_loop.run(self._get_integrator(provider).send_payment(transaction = transaction))
+
+    def check_status(self, transaction_id: str, provider: Optional[Provider] = None):
+        return event_loop.run(self._get_integrator(provider).check_status(transaction_id))
+
+    def cancel_transaction(self, transaction_id: str, provider: Optional[Provider] = None):
+        return event_loop.run(self._get_integrator(provider).cancel_transaction(transaction_id))
+
+    def refund(self, transaction_id: str, provider: Optional[Provider] = None, amount=None, reason=None):
+        return event_loop.run(self._get_integrator(provider).refund(
+            transaction_id = transaction_id, amount = amount, reason = reason
+        ))
+
+    def validate_webhook(self, payload, headers, provider: Optional[Provider] = None):
+        return event_loop.run(self._get_integrator(provider).validate_webhook(
+            payload = payload, headers = headers
+        ))
+
+    def parse_webhook(self, payload, headers, provider: Optional[Provider] = None):
+        return event_loop.run(self._get_integrator(provider).parse_webhook(
+            payload = payload, headers = headers
+        ))
+
+    async def aclose(self):
+        ''' Close the HTTP sessions of every adapter. '''
+
+        for integrator in self._integrators.values():
+            client = getattr(integrator, 'client', None)
+            if isinstance(client, HTTPClient):
+                await client.close_session()
+
+    def close(self):
+        event_loop.run(self.aclose())
+
+
+####
+##      CLIENT REGISTRY
+#####
+class ClientRegistry:
+    ''' Thread-safe registry of pooled clients, one per configuration. '''
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(config):
+        ''' Return a digest of config, providers keyed by name. '''
+
+        document = json.dumps(config, sort_keys = True, default = str)
+        return hashlib.sha256(document.encode()).hexdigest()
+
+    def get(self, config=None) -> PooledEasySwitch:
+        ''' Return the client of config (settings by default), built on first use. '''
+
+        config = config or get_client_config()
+        key = self.get_key(config)
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    logger.info("Building EasySwitch client")
+                    client = self._clients[key] = PooledEasySwitch.from_dict(config)
+        return client
+
+    def clear(self):
+        ''' Drop every client, closing their connections. '''
+
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close EasySwitch client: {str(e)}")
+
+
+registry = ClientRegistry()
+
+
+def get_client() -> PooledEasySwitch:
+    ''' Return the shared EasySwitch client of the current settings. '''
+
+    return registry.get()
@@ -0,0 +1,27 @@
+from apps.billings.models import Transaction
+from core.export import Export
+
+####
+##      TRANSACTION EXPORT
+#####
+class TransactionExport(Export):
+    ''' One flat row per transaction, order and user joined. '''
+
+    model = Transaction
+    columns = (
+        ('id', 'id'),
+        ('code', 'code'),
+        ('created', 'created'),
+        ('modified', 'modified'),
+        ('status', 'status'),
+        ('type', 'type'),
+        ('amount', 'amount'),
+        ('currency', 'currency'),
+        ('provider', 'provider'),
+        ('reference', 'reference'),
+        ('payment_method', 'payment_method'),
+        ('order', 'order'),
+        ('order_code', 'order__code'),
+        ('user', 'user'),
+        ('user_email', 'user__email'),
+    )
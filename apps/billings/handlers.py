@@ -0,0 +1,69 @@
+"""
+Outbox event handlers of the billings app, loaded by BillingsConfig.ready().
+
+Handlers run after commit in the outbox relay, at least once: they only
+apply changes that are not applied yet. Handlers calling the payment
+provider run on the "provider" queue, in their own relay threads.
+"""
+
+import logging
+from django.utils.datastructures import CaseInsensitiveMapping
+
+from apps.billings.models import Transaction
+from apps.billings.services import PaymentService, send_transaction_update
+from apps.billings.tasks import initiate_payment
+from apps.orders.models import Order
+from apps.outbox.events import handler
+
+logger = logging.getLogger(__name__)
+
+
+## SEND TRANSACTION TO PROVIDER
+@handler('transaction.created', queue='provider')
+def request_payment_link(event):
+    ''' Send the newly created transaction to payment API and get checkout url. '''
+
+    initiate_payment(event.aggregate_id)
+
+
+## PROCESS RECEIVED WEBHOOKS
+@handler('transaction.webhook', queue='provider')
+def process_payment_webhook(event):
+    ''' Apply a webhook acknowledged by TransactionViewSet.callback, a failure is retried. '''
+
+    PaymentService().process_webhook(
+        payload=event.payload['payload'],
+        headers=CaseInsensitiveMapping(event.payload['headers'])
+    )
+
+
+## PROCESS ORDER PAYMENT SUCCESS
+@handler('transaction.updated')
+def process_order_payment_success(event):
+    ''' Mark the order of a successful payment as delivering. '''
+
+    payload = event.payload
+    if not (
+        payload.get('order') and
+        payload.get('type') == Transaction.TYPES.PAYMENT and
+        payload.get('status') == Transaction.STATUES.SUCCESSFUL
+    ):
+        return
+
+    order = Order.objects.filter(
+        pk=payload['order'], status=Order.OrderStatus.WAITING_FOR_PAYMENT
+    ).first()
+    if order is not None:
+        order.status = Order.OrderStatus.DELIVERING
+        order.save()
+        logger.info(f"Order {order.code} marked as paid successfully")
+
+
+## PUSH TRANSACTION UPDATES
+@handler('transaction.updated')
+def push_transaction_update(event):
+    ''' Send the updated transaction to its user's websocket group. '''
+
+    instance = Transaction.objects.select_related('order').filter(pk=event.aggregate_id).first()
+    if instance is not None:
+        send_transaction_update(instance)
@@ -0,0 +1,179 @@
+import hmac
+import json
+import time
+import hashlib
+import statistics
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from django.test import override_settings
+from django.utils import timezone
+from easyswitch import EasySwitch, Provider
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import User
+from apps.billings.clients import get_client_config, registry
+from apps.billings.models import Transaction
+from apps.billings.views import TransactionViewSet
+from apps.outbox.events import HANDLERS
+from apps.outbox.models import OutboxEvent
+from apps.outbox.relay import Relay
+from apps.utils.benchmarks import BenchmarkCommand
+
+WEBHOOK_SECRET = 'wh_bench_secret'
+
+# DUMMY CREDENTIALS, NO PROVIDER IS CALLED
+BENCH_SETTINGS = {
+    'EASYSWITCH_ENVIRONMENT': 'sandbox',
+    'EASYSWITCH_PAYGATE_API_KEY': 'bench',
+    'EASYSWITCH_PAYGATE_CALLBACK_URL': 'https://shop.test/billings/callback',
+    'EASYSWITCH_CINETPAY_API_KEY': 'bench',
+    'EASYSWITCH_CINETPAY_X_SECRET': 'bench',
+    'EASYSWITCH_CINETPAY_X_STIE_ID': '1',
+    'EASYSWITCH_CINETPAY_CALLBACK_URL': 'https://shop.test/billings/callback',
+    'EASYSWITCH_FEDAPAY_SECRET_KEY': 'sk_sandbox_bench',
+    'EASYSWITCH_FEDAPAY_WEBHOOK_SECRET': WEBHOOK_SECRET,
+    'EASYSWITCH_FEDAPAY_CALLBACK_URL': 'https://shop.test/billings/callback',
+}
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to measure payment webhook throughput"""
+
+    help = "POST signed FedaPay webhooks to /billings/callback from parallel clients, then process the inbox"
+
+    def add_arguments(self, parser):
+        """Add bench_webhooks Comand arguments"""
+
+        parser.add_argument(
+            '-n', '--webhooks', type = int, default = 500,
+            help = 'Number of webhooks per run'
+        )
+        parser.add_argument(
+            '-w', '--workers', type = int, default = 8,
+            help = 'Number of parallel clients'
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark on committed fixtures, parallel clients do not share a transaction"""
+
+        last_event = OutboxEvent.objects.aggregate(last = Max('id'))['last'] or 0
+        user = User.objects.create_user(
+            'bench-webhooks', 'P@ssw0rd',
+            email = 'bench-webhooks@fakestore.com',
+            phone_number = '+22890000997'
+        )
+
+        try:
+            # NO IN-PROCESS RELAY: THE INBOX IS PROCESSED AFTER THE CALLBACKS
+            with override_settings(OUTBOX = {**getattr(settings, 'OUTBOX', {}), 'WORKERS': 0}, **BENCH_SETTINGS):
+                self.run(user = user, **options)
+        finally:
+            Transaction.objects.filter(user = user).delete()
+            user.delete()
+            OutboxEvent.objects.filter(id__gt = last_event).delete()
+
+    def run(self, user, **options):
+        """Measure callback acknowledgement with both client strategies, then inbox processing"""
+
+        count, workers = options.get('webhooks'), options.get('workers')
+        transactions = Transaction.objects.bulk_create([
+            Transaction(user = user, amount = 500, code = f'TRX-BENCH-WH-{i}')
+            for i in range(count)
+        ])
+        requests = [self.webhook(transaction, i) for i, transaction in enumerate(transactions)]
+
+        # CALLBACKS ARE PARSED BY THE DEFAULT PROVIDER
+        config = {**get_client_config(), 'default_provider': Provider.FEDAPAY}
+
+        self.stdout.write(f'{count} webhooks, {workers} clients')
+        results = {}
+        for label, get_client in (
+            ('client built per request (before)', lambda: EasySwitch.from_dict(config)),
+            ('shared pooled client', lambda: registry.get(config)),
+        ):
+            OutboxEvent.objects.filter(event_type = 'transaction.webhook', aggregate_id__startswith = 'TRX-BENCH-WH-').delete()
+            with patch('apps.billings.services.get_client', get_client):
+                results[label] = self.send(requests, workers)
+
+            statuses, elapsed, timings = results[label]
+            self.stdout.write(
+                f'ack, {label:<36} {count / elapsed:>7.0f} webhooks/s   '
+                f'p50 {statistics.median(timings):>7.2f} ms   '
+                f'p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:>7.2f} ms   '
+                f'responses {statuses}'
+            )
+
+        before, after = (count / elapsed for _, elapsed, _ in results.values())
+        self.stdout.write(self.style.SUCCESS(f'Acknowledgement throughput x{after / before:.2f}'))
+
+        # THE INBOX OF THE LAST RUN, WITHOUT SIDE EFFECTS OF THE UPDATED TRANSACTIONS
+        with patch('apps.billings.services.get_client', lambda: registry.get(config)), \
+                patch.dict(HANDLERS, {'transaction.updated': []}):
+            stats = Relay().drain()
+        applied = Transaction.objects.filter(user = user, status = Transaction.STATUES.SUCCESSFUL).count()
+        self.stdout.write(f'processing: {stats.report()}, {applied} transactions paid')
+
+    def webhook(self, transaction, i):
+        """Return the signed FedaPay callback body and headers of transaction"""
+
+        payload = {
+            'name': 'transaction.approved',
+            'entity': {
+                'id': i,
+                'amount': 500,
+                'status': 'approved',
+                'created_at': timezone.now().isoformat(),
+                'currency_id': 1,
+                'custom_metadata': {'Transaction': transaction.code},
+            },
+        }
+        timestamp = int(time.time())
+        signed = f"{timestamp}.{json.dumps(payload, separators = (',', ':'), ensure_ascii = False)}"
+        signature = hmac.new(WEBHOOK_SECRET.encode(), signed.encode(), hashlib.sha256).hexdigest()
+        return payload, {'HTTP_X_FEDAPAY_SIGNATURE': f't={timestamp},s={signature}'}
+
+    def send(self, requests, workers):
+        """POST every webhook from `workers` threads, return statuses, elapsed seconds and sorted timings in ms"""
+
+        factory = APIRequestFactory()
+        view = TransactionViewSet.as_view({'post': 'callback'})
+
+        lock = threading.Lock()
+        pending = list(reversed(requests))
+        statuses, timings = {}, []
+        start = threading.Barrier(workers + 1)
+
+        def client():
+            start.wait()
+            try:
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        payload, headers = pending.pop()
+
+                    request = factory.post('/billings/callback', payload, format = 'json', **headers)
+                    began = time.perf_counter()
+                    status = view(request).status_code
+                    elapsed = (time.perf_counter() - began) * 1000
+
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                        timings.append(elapsed)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target = client) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return statuses, time.perf_counter() - began, sorted(timings)
@@ -0,0 +1,12 @@
+from apps.billings.exports import TransactionExport
+from core.export import ExportCommand
+
+####
+##      COMMAND CLASS
+#####
+class Command(ExportCommand):
+    """Django command to export transactions"""
+
+    help = "Stream transactions as CSV or NDJSON, oldest first"
+
+    export_class = TransactionExport
@@ -127,6 +127,12 @@ class Transaction(TimeStampedUUIDModel):
         verbose_name = _("Transaction")
         verbose_name_plural = _("Transactions")
         ordering = ['-created']
+        indexes = [
+            # KEYSET PAGINATION
+            models.Index(fields = ['created', 'id']),
+            # WEBHOOKS NAME THEIR TRANSACTION BY CODE
+            models.Index(fields = ['code']),
+        ]
 
     def __str__(self):
         return self.code
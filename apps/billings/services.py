@@ -2,17 +2,17 @@ import logging
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from typing import Any, Dict, Optional, Union
-from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from easyswitch.types import TransactionStatus as EasySwitchTransactionStatus
 from easyswitch import (
-    EasySwitch, 
     TransactionDetail, 
-    Provider,
     WebhookEvent,
 )
 
+from apps.billings.clients import get_client
 from apps.billings.models import Transaction as T
+from apps.outbox.events import publish_event
+from apps.outbox.models import OutboxEvent
 from core.exceptions import (
     PaymentProcessingError,
     PaymentValidationError,
@@ -23,6 +23,52 @@ from core.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# AGGREGATE OF RECEIVED WEBHOOKS, IDENTIFIED BY TRANSACTION CODE
+WEBHOOK_AGGREGATE = 'billings.webhook'
+
+
+def send_transaction_update(transaction: T) -> None:
+    """
+    Push a transaction update to its user's TransactionConsumer group.
+
+    The payload is the order of the transaction, or the transaction itself
+    when it has no order.
+
+    Args:
+        transaction: Transaction instance
+    """
+    order = getattr(transaction, 'order', None)
+    try:
+        if order:
+            from apps.orders.serializers import OrderSerializer
+            order.refresh_from_db()
+            user_id = order.client_id
+            payload = OrderSerializer(order).data
+        else:
+            from apps.billings.serializers import TransactionSerializer
+            user_id = transaction.user_id
+            payload = TransactionSerializer(transaction).data
+    except Exception as e:
+        logger.error(f"Failed to serialize transaction update for {transaction.code}: {str(e)}")
+        return
+
+    if not user_id:
+        logger.warning(f"No user_id found for transaction {transaction.code}; skipping realtime notification.")
+        return
+
+    channel_layer = get_channel_layer()
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f"user_{user_id}",
+            {
+                "type": "transaction_update",
+                "payload": payload
+            }
+        )
+        logger.info(f"Realtime transaction update sent to user_{user_id}")
+    except Exception as e:
+        logger.error(f"Failed to send realtime transaction update for user_{user_id}: {str(e)}")
+
 
 class PaymentService:
     """
@@ -38,12 +84,14 @@ class PaymentService:
         """
         Initialize the payment service.
         
+        The EasySwitch client is shared by the whole process (see
+        apps.billings.clients), so a service is cheap to create.
+        
         Args:
             client: Optional EasySwitch client instance for testing
         """
         try:
-            env_file = settings.BASE_DIR / '.env'
-            self._client = client or self._get_client(env_file)
+            self._client = client or get_client()
             
             # self._validate_client_configuration()
         except Exception as e:
@@ -51,44 +99,6 @@ class PaymentService:
             raise ConfigurationError(
                 detail=f"Payment service configuration failed. EasySwitch client initialization error: {str(e)}",
             )
-
-    def _get_client(self, env_file: str=None):
-        config = {
-            "debug": True,
-            # "default_provider": Provider.PAYGATE,
-            "providers": {
-                Provider.PAYGATE: {
-                    "api_key": settings.EASYSWITCH_PAYGATE_API_KEY,
-                    "environment": settings.EASYSWITCH_ENVIRONMENT,
-                    "callback_url": settings.EASYSWITCH_PAYGATE_CALLBACK_URL,
-                },
-                Provider.CINETPAY: {
-                    "api_key": settings.EASYSWITCH_CINETPAY_API_KEY,
-                    "callback_url": settings.EASYSWITCH_CINETPAY_CALLBACK_URL,
-                    "environment": settings.EASYSWITCH_ENVIRONMENT,
-                    "extra": {
-                        "secret": settings.EASYSWITCH_CINETPAY_X_SECRET,
-                        "site_id": settings.EASYSWITCH_CINETPAY_X_STIE_ID,
-                        "channels": "ALL",     # More details on Cinetpay's documentation.
-                        "lang": "fr"        # More details on Cinetpay's documentation.
-                    }
-                },
-                Provider.FEDAPAY: {
-                    "api_secret": settings.EASYSWITCH_FEDAPAY_SECRET_KEY,
-                    "callback_url": settings.EASYSWITCH_FEDAPAY_CALLBACK_URL,
-                    "timeout": 60,
-                    "environment": settings.EASYSWITCH_ENVIRONMENT,
-                    "extra": {
-                        "webhook_secret": settings.EASYSWITCH_FEDAPAY_WEBHOOK_SECRET,
-                    }
-                },
-            }
-        }
-        print(config)
-        
-        client = EasySwitch.from_dict(config)
-
-        return client
     
     def _validate_client_configuration(self) -> None:
         """Validate that the EasySwitch client is properly configured."""
@@ -255,6 +265,70 @@ class PaymentService:
                 detail=f"Failed to process payment response. Response processing error: {str(e)}",
             )
     
+    def parse_webhook(self, payload: Dict[str, Any], headers: Dict[str, Any]) -> WebhookEvent:
+        """
+        Verify the signature of a provider webhook and parse it.
+        
+        Args:
+            payload: The data received from the payment provider webhook.
+            headers: The headers received with the webhook request.
+        
+        Returns:
+            WebhookEvent: The parsed webhook event from the payment provider.
+        
+        Raises:
+            PaymentWebhookError: If the webhook is invalid or does not name a transaction.
+        """
+        try:
+            webhook_data: WebhookEvent = self._client.parse_webhook(payload, headers)
+        except Exception as e:
+            error = f"Invalid webhook: {str(e)}"
+            logger.error(error)
+            raise PaymentWebhookError(error)
+        
+        logger.info(f"(parse_webhook) Webhook data parsed: {webhook_data}")
+        
+        # Extract local transaction code safely
+        custom_metadata = (webhook_data.metadata or {}).get("custom_metadata") or {}
+        if not custom_metadata.get("Transaction"):
+            error = "Missing transaction description in webhook payload."
+            logger.error(error)
+            raise PaymentWebhookError(error)
+        
+        return webhook_data
+    
+    def receive_webhook(self, payload: Dict[str, Any], headers: Dict[str, Any]) -> OutboxEvent:
+        """
+        Verify a provider webhook and store it, unprocessed, in the inbox.
+        
+        The raw webhook is recorded as a `transaction.webhook` outbox event
+        keyed on the transaction code, so the webhooks of a transaction are
+        processed in order by `process_webhook` (see apps.billings.handlers),
+        with retries, and are marked failed when they keep failing.
+        
+        Args:
+            payload: The data received from the payment provider webhook.
+            headers: The headers received with the webhook request.
+        
+        Returns:
+            OutboxEvent: The recorded inbox event.
+        
+        Raises:
+            PaymentWebhookError: If the webhook is invalid or does not name a transaction.
+        """
+        webhook_data = self.parse_webhook(payload, headers)
+        
+        return publish_event(
+            'transaction.webhook',
+            WEBHOOK_AGGREGATE,
+            webhook_data.metadata["custom_metadata"]["Transaction"],
+            {
+                'provider': webhook_data.provider,
+                'payload': payload,
+                'headers': dict(headers),
+            }
+        )
+    
     def process_webhook(self, payload: Dict[str, Any], headers: Dict[str, Any]) -> T:
         """
         Process incoming webhook data from the payment provider.
@@ -264,7 +338,7 @@ class PaymentService:
             headers: The headers received with the webhook request.
 
         Returns:
-            WebhookEvent: The parsed webhook event from the payment provider.
+            Transaction: The transaction updated by the webhook.
 
         Raises:
             PaymentWebhookError: If the webhook parsing fails.
@@ -272,25 +346,13 @@ class PaymentService:
             Exception: For any other unexpected errors.
         """
         try:
-            # Parse webhook payload
-            webhook_data: WebhookEvent = self._client.parse_webhook(payload, headers)
-            
-            logger.info(f"(process_webhook) Webhook data parsed: {webhook_data}")
-
-            # Extract local transaction code safely
-            metadata = webhook_data.metadata
-            custom_metadata = metadata.get("custom_metadata", {})
-            local_transaction_code = custom_metadata.get("Transaction", None)
-            
-            if not local_transaction_code:
-                error = "Missing transaction description in webhook payload."
-                logger.error(error)
-                raise PaymentWebhookError(error)
+            webhook_data = self.parse_webhook(payload, headers)
+            local_transaction_code = webhook_data.metadata["custom_metadata"]["Transaction"]
         
-            transaction = T.objects.get(code=local_transaction_code)
+            transaction = T.objects.filter(code=local_transaction_code).first()
             
             if not transaction:
-                error = f"Transaction not found: {str(e)}"
+                error = f"Transaction not found: {local_transaction_code}"
                 logger.error(error)
                 raise TransactionNotFoundError(error)
 
@@ -300,11 +362,9 @@ class PaymentService:
                 webhook_data=webhook_data,
                 transaction=transaction
             )
-            
-            # Send realtime data to frontend with channels (web socket)
-            if not transaction.status == T.STATUES.PENDING:
-                self._send_realtime_transaction_info_to_frontend(transaction)
 
+
+            # REALTIME UPDATE IS PUSHED BY apps.billings.handlers ONCE THE NEW STATUS IS COMMITTED
             return transaction
         
         except PaymentWebhookError as e:
@@ -348,47 +408,6 @@ class PaymentService:
             transaction.status = self.get_internal_status_from_provider(webhook_data.status)
             transaction.save()
 
-    def _send_realtime_transaction_info_to_frontend(self, transaction: T) -> None:
-        """Send transaction data to frontend after callback
-
-        Args:
-            transaction (T): transaction object
-
-        Returns:
-            _type_: None
-        """
-        # Notify transaction update via WebSocket
-        order = getattr(transaction, 'order', None)
-        if order:
-            order.refresh_from_db()
-            user_id = getattr(getattr(order, 'client', None), 'id', None)
-        else:
-            user_id = None
-
-        if not user_id:
-            logger.warning(f"No user_id found for transaction {transaction.code}; skipping realtime notification.")
-            return
-
-        try:
-            from apps.orders.serializers import OrderSerializer
-            payload = OrderSerializer(order).data
-        except Exception as e:
-            logger.error(f"Failed to serialize order for transaction {transaction.code}: {str(e)}")
-            return
-
-        channel_layer = get_channel_layer()
-        try:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{user_id}",
-                {
-                    "type": "transaction_update",
-                    "payload": payload
-                }
-            )
-            logger.info(f"Realtime transaction update sent to user_{user_id}")
-        except Exception as e:
-            logger.error(f"Failed to send realtime transaction update for user_{user_id}: {str(e)}")
-
     # --- EASYSWITCH STATUS MAPPING ---
     
     def map_easyswitch_status_to_internal(self, provider_status: Union[str, EasySwitchTransactionStatus]) -> Optional[str]:
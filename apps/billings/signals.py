@@ -1,11 +1,13 @@
+from django.core.signals import setting_changed
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 import logging
 from asgiref.sync import sync_to_async, async_to_sync
 
 from apps.accounts.models import User
+from apps.billings.clients import registry
 from apps.billings.models import Transaction
-from apps.billings.services import PaymentService
+from apps.outbox.events import publish
 
 from apps.orders.models import Order
 from core.exceptions import (
@@ -39,42 +41,26 @@ logger = logging.getLogger(__name__)
 #         return transaction
 
 
-## SEND TRANSACTION TO PROVIDER
+## PUBLISH TRANSACTION EVENTS
 @receiver(post_save, sender=Transaction)
-def send_transaction_request(sender, instance: Transaction, created, **kwargs):
-    ''' Send the newly created transaction to payment API and get checkout url. '''
-    
-    # OUR SIGNAL EVENT MUST BE A CREATE ACTION
-    if created and instance.status == Transaction.STATUES.PENDING:
-        # SEND TRANSACTION TO PROVIDER
-        _ = PaymentService().create_transaction(
-            transaction=instance
-        )
+def publish_transaction_event(sender, instance: Transaction, created, **kwargs):
+    ''' Record the change in the outbox, handled by apps.billings.handlers after commit. '''
 
+    publish(
+        'transaction.created' if created else 'transaction.updated',
+        instance,
+        {
+            'status': instance.status,
+            'type': instance.type,
+            'order': str(instance.order_id) if instance.order_id else None,
+        }
+    )
 
-## PROCESS ORDER PAYMENT SUCCESS
-@receiver(post_save, sender=Transaction)
-def process_order_payment_success(
-    sender, instance: Transaction, 
-    created, **kwargs
-):
-    ''' Process successful order payment. '''
-    
-    # CHECK IF TRANSACTION IS FOR ORDER AND SUCCESSFUL
-    if (not created and 
-        instance.type == Transaction.TYPES.PAYMENT and 
-        instance.status == Transaction.STATUES.SUCCESSFUL and
-        instance.order):
-        
-        try:
-            logger.info(f"Processing successful payment for order {instance.order.code}")
-            
-            # UPDATE ORDER STATUS
-            order = instance.order
-            order.status = Order.OrderStatus.DELIVERING
-            order.save()
-            
-            logger.info(f"Order {order.code} marked as paid successfully")
-            
-        except Exception as e:
-            logger.error(f"Error processing order payment success: {str(e)}")
+
+## RELOAD PAYMENT CLIENTS
+@receiver(setting_changed)
+def reload_payment_clients(sender, setting, **kwargs):
+    ''' Drop clients built from EASYSWITCH_* settings that just changed. '''
+
+    if setting.startswith('EASYSWITCH_'):
+        registry.clear()
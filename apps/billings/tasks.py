@@ -0,0 +1,34 @@
+"""
+Background payment initiation.
+
+Requesting a payment link blocks on the provider's API, so it never runs in
+the request creating the transaction: `initiate_payment` is called by the
+outbox relay (apps.billings.handlers) once the transaction is committed.
+Saving the link publishes a `transaction.updated` event, which pushes it to
+the user's `TransactionConsumer` group; `get_payment_link` polling sees it
+as soon as it is saved.
+"""
+
+import logging
+
+from apps.billings.models import Transaction
+from apps.billings.services import PaymentService
+
+logger = logging.getLogger(__name__)
+
+
+def initiate_payment(pk):
+    ''' Request the payment link of a pending transaction, once. '''
+
+    instance = Transaction.objects.select_related('user', 'order').filter(pk=pk).first()
+    # ALREADY INITIATED OR CANCELLED MEANWHILE
+    if instance is None or instance.payment_link or instance.status != Transaction.STATUES.PENDING:
+        return
+
+    try:
+        PaymentService().create_transaction(transaction=instance)
+    except Exception as e:
+        logger.error(f"Payment initiation failed for transaction {instance.code}: {str(e)}")
+        # create_transaction FAILS THE TRANSACTION ITSELF, NOT THE SERVICE CONSTRUCTOR
+        if instance.status == Transaction.STATUES.PENDING:
+            instance.fail()
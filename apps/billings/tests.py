@@ -1,3 +1,305 @@
-from django.test import TestCase
+import os
+import csv
+import hmac
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import transaction as db_transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from easyswitch import Provider
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.billings.clients import (
+    KeepAliveHTTPClient,
+    PooledEasySwitch,
+    event_loop,
+    get_client,
+    get_client_config,
+    registry,
+)
+from apps.billings.models import Transaction
+from apps.billings.services import PaymentService
+from apps.orders.models import Order
+from apps.outbox.models import OutboxEvent
+from apps.outbox.relay import Relay
+
+# DUMMY PROVIDER CREDENTIALS, NO PROVIDER IS CALLED
+EASYSWITCH_SETTINGS = {
+    'EASYSWITCH_ENVIRONMENT': 'sandbox',
+    'EASYSWITCH_PAYGATE_API_KEY': 'paygate-key',
+    'EASYSWITCH_PAYGATE_CALLBACK_URL': 'https://shop.test/billings/callback',
+    'EASYSWITCH_CINETPAY_API_KEY': 'cinetpay-key',
+    'EASYSWITCH_CINETPAY_X_SECRET': 'cinetpay-secret',
+    'EASYSWITCH_CINETPAY_X_STIE_ID': '1',
+    'EASYSWITCH_CINETPAY_CALLBACK_URL': 'https://shop.test/billings/callback',
+    'EASYSWITCH_FEDAPAY_SECRET_KEY': 'sk_sandbox_key',
+    'EASYSWITCH_FEDAPAY_WEBHOOK_SECRET': 'wh_sandbox_secret',
+    'EASYSWITCH_FEDAPAY_CALLBACK_URL': 'https://shop.test/billings/callback',
+}
 
 # Create your tests here.
+
+
+####
+##      PAYMENT INITIATION TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False})
+@patch('apps.billings.handlers.send_transaction_update')
+@patch('apps.billings.tasks.PaymentService')
+class PaymentInitiationTestCase(TestCase):
+    ''' Ensure payment links are requested after commit and can be polled. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'payer', 'P@ssw0rd',
+            email = 'payer@fakestore.com',
+            phone_number = '+22890000004'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_transaction(self, **fields):
+        with self.captureOnCommitCallbacks() as callbacks:
+            transaction = Transaction.objects.create(user = self.user, amount = 500, **fields)
+        return transaction, callbacks
+
+    def test_link_is_polled_until_initiated(self, service, notify):
+        transaction, callbacks = self.create_transaction()
+        url = f'/billings/{transaction.pk}/get_payment_link'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['payment_status'], 'pending')
+
+        def initiate(transaction):
+            transaction.payment_link = 'https://pay.example.com/checkout/1'
+            transaction.save()
+        service.return_value.create_transaction.side_effect = initiate
+
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment_link'], 'https://pay.example.com/checkout/1')
+        notify.assert_called_once()
+
+    def test_initiated_once(self, service, notify):
+        transaction, callbacks = self.create_transaction()
+        Transaction.objects.filter(pk = transaction.pk).update(status = Transaction.STATUES.CANCELLED)
+
+        for callback in callbacks:
+            callback()
+
+        service.assert_not_called()
+        notify.assert_not_called()
+
+    def test_successful_payment_completes_the_order(self, service, notify):
+        order = Order.objects.create(client = self.user)
+        transaction, callbacks = self.create_transaction(order = order)
+
+        with self.captureOnCommitCallbacks(execute = True):
+            transaction.succeed()
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.DELIVERING)
+        notify.assert_called_once()
+
+    def test_rolled_back_changes_have_no_side_effects(self, service, notify):
+        transaction, _ = self.create_transaction()
+
+        with self.captureOnCommitCallbacks(execute = True):
+            try:
+                with db_transaction.atomic():
+                    transaction.succeed()
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+
+        self.assertFalse(OutboxEvent.objects.filter(event_type = 'transaction.updated').exists())
+        notify.assert_not_called()
+
+    def test_retried_creation_calls_the_provider_once(self, service, notify):
+        data = {'user_id': str(self.user.pk), 'type': Transaction.TYPES.PAYMENT, 'amount': 500}
+        headers = {'Idempotency-Key': 'pay-1'}
+
+        with self.captureOnCommitCallbacks(execute = True):
+            first = self.client.post('/billings/', data, format = 'json', headers = headers)
+        with self.captureOnCommitCallbacks(execute = True):
+            retry = self.client.post('/billings/', data, format = 'json', headers = headers)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Transaction.objects.count(), 1)
+        service.return_value.create_transaction.assert_called_once()
+
+    def test_export_command_resumes_into_the_file(self, service, notify):
+        first, _ = self.create_transaction()
+        second, _ = self.create_transaction(status = Transaction.STATUES.SUCCESSFUL)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'transactions.csv')
+
+        call_command('export_transactions', file = path, status = first.status, stderr = StringIO())
+        call_command('export_transactions', file = path, resume = str(first.pk), stderr = StringIO())
+
+        with open(path) as export:
+            rows = list(csv.DictReader(export))
+        self.assertEqual([row['id'] for row in rows], [str(first.pk), str(second.pk)])
+        self.assertEqual(rows[0]['user_email'], 'payer@fakestore.com')
+
+
+####
+##      PAYMENT CLIENT TEST CASE
+#####
+class ConnectionCountingHandler(BaseHTTPRequestHandler):
+    ''' Answer {} over HTTP/1.1, counting client connections. '''
+
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(**EASYSWITCH_SETTINGS)
+class PaymentClientTestCase(TestCase):
+    ''' Ensure provider clients are shared, rebuilt on new settings and keep connections alive. '''
+
+    def test_one_client_per_configuration(self):
+        clients = []
+        threads = [
+            threading.Thread(target = lambda: clients.append(PaymentService()._client))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIsInstance(clients[0], PooledEasySwitch)
+
+        with override_settings(EASYSWITCH_FEDAPAY_SECRET_KEY = 'sk_sandbox_rotated'):
+            self.assertIsNot(PaymentService()._client, clients[0])
+
+    def test_adapters_keep_their_session(self):
+        integrator = get_client()._get_integrator(Provider.FEDAPAY)
+        self.assertIsInstance(integrator.client, KeepAliveHTTPClient)
+        self.assertIs(integrator.get_client(), integrator.client)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ConnectionCountingHandler)
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        client = KeepAliveHTTPClient(f'http://127.0.0.1:{server.server_port}')
+        self.addCleanup(event_loop.run, client.close_session())
+
+        async def get():
+            async with client as session:
+                return await session.get('/status')
+
+        for _ in range(3):
+            self.assertEqual(event_loop.run(get()).status, 200)
+        self.assertEqual(len(ConnectionCountingHandler.connections), 1)
+
+
+####
+##      PAYMENT WEBHOOK INBOX TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False, 'MAX_ATTEMPTS': 2}, **EASYSWITCH_SETTINGS)
+@patch('apps.billings.handlers.send_transaction_update')
+@patch('apps.billings.tasks.PaymentService')
+class PaymentWebhookInboxTestCase(TestCase):
+    ''' Ensure callbacks are acknowledged once stored, then processed with retries. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'webhooks', 'P@ssw0rd',
+            email = 'webhooks@fakestore.com',
+            phone_number = '+22890000011'
+        )
+        cls.transaction = Transaction.objects.create(user = cls.user, amount = 500)
+
+    def setUp(self):
+        self.client = APIClient()
+
+        # CALLBACKS ARE PARSED BY THE DEFAULT PROVIDER
+        config = {**get_client_config(), 'default_provider': Provider.FEDAPAY}
+        client = patch('apps.billings.services.get_client', lambda: registry.get(config))
+        client.start()
+        self.addCleanup(client.stop)
+
+    def callback(self, code, secret = EASYSWITCH_SETTINGS['EASYSWITCH_FEDAPAY_WEBHOOK_SECRET']):
+        payload = {
+            'name': 'transaction.approved',
+            'entity': {
+                'id': 1, 'amount': 500, 'status': 'approved', 'currency_id': 1,
+                'created_at': '2026-01-01T00:00:00+00:00',
+                'custom_metadata': {'Transaction': code},
+            },
+        }
+        timestamp = int(time.time())
+        signed = f"{timestamp}.{json.dumps(payload, separators = (',', ':'), ensure_ascii = False)}"
+        signature = hmac.new(secret.encode(), signed.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            '/billings/callback', payload, format = 'json',
+            HTTP_X_FEDAPAY_SIGNATURE = f't={timestamp},s={signature}'
+        )
+
+    def webhooks(self):
+        return OutboxEvent.objects.filter(event_type = 'transaction.webhook')
+
+    def test_acknowledged_before_processing(self, service, notify):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.callback(self.transaction.code)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.webhooks().get().aggregate_id, str(self.transaction.code))
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, Transaction.STATUES.PENDING)
+
+        for callback in callbacks:
+            callback()
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, Transaction.STATUES.SUCCESSFUL)
+        self.assertEqual(self.webhooks().get().status, OutboxEvent.STATUES.PROCESSED)
+
+    def test_invalid_signature_is_rejected(self, service, notify):
+        response = self.callback(self.transaction.code, secret = 'forged')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.webhooks().exists())
+
+    def test_failing_webhook_is_dead_lettered(self, service, notify):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.assertEqual(self.callback('TRANS-UNKNOWN').status_code, 200)
+        self.assertEqual(self.webhooks().get().status, OutboxEvent.STATUES.PENDING)
+
+        self.webhooks().update(available_at = timezone.now())
+        Relay().drain()
+
+        event = self.webhooks().get()
+        self.assertEqual(event.status, OutboxEvent.STATUES.FAILED)
+        self.assertIn('TRANS-UNKNOWN', event.last_error)
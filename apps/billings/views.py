@@ -15,8 +15,11 @@ from apps.billings.serializers import (
     TransactionCreateSerializer,
     TransactionUpdateSerializer
 )
+from apps.billings.exports import TransactionExport
 from apps.billings.services import PaymentService
 from apps.billings.models import Transaction
+from core.export import ExportMixin
+from core.idempotency import IdempotentCreateMixin
 from core.exceptions import (
     PaymentValidationError,
     PaymentProcessingError,
@@ -30,7 +33,7 @@ logger = logging.getLogger(__name__)
 ####
 ##      BILLINGS VIEWSET
 #####
-class TransactionViewSet(ModelViewSet):
+class TransactionViewSet(IdempotentCreateMixin, ExportMixin, ModelViewSet):
     ''' ViewSet class for Transaction Model. '''
 
     queryset = TransactionSerializer.Meta.model.objects.all()
@@ -39,7 +42,14 @@ class TransactionViewSet(ModelViewSet):
     search_fields = [
         'code', 'type', 'amount',
     ]
+    filterset_fields = {
+        'status': ['exact'],
+        'type': ['exact'],
+        'provider': ['exact'],
+        'created': ['gte', 'lte', 'date__gte', 'date__lte'],
+    }
     lookup_field = 'id'
+    export_class = TransactionExport
 
     def get_queryset(self):
         ''' Return specific objects based on requesting user. '''
@@ -92,6 +102,17 @@ class TransactionViewSet(ModelViewSet):
                 },
                 status=200
             )
+
+        # LINK STILL REQUESTED IN THE BACKGROUND (apps.billings.tasks): POLL AGAIN
+        if obj and obj.status == Transaction.STATUES.PENDING:
+            return Response(
+                {
+                    'payment_link': None,
+                    'payment_status': obj.status
+                },
+                status=202,
+                headers={'Retry-After': '1'}
+            )
         
         # OBJECT NOT FOUND OR NO BILL URL
         return Response(
@@ -117,18 +138,20 @@ class TransactionViewSet(ModelViewSet):
         logger.debug(f"Headers: {dict(request.headers)}")
         logger.debug(f"Payload: {request.data}")
 
+        # ACKNOWLEDGED ONCE VERIFIED AND STORED, PROCESSED BY apps.billings.handlers
+        payload = request.data.dict() if hasattr(request.data, 'dict') else request.data
         try:
-            webhook = PaymentService().process_webhook(
-                payload=request.data,
+            event = PaymentService().receive_webhook(
+                payload=payload,
                 headers=request.headers
             )
-            logger.info(f"Webhook processed successfully for transaction {getattr(webhook, 'transaction_id', 'N/A')}")
+            logger.info(f"Webhook received for transaction {event.aggregate_id}")
             
             return Response({'status': 'OK'}, status=status.HTTP_200_OK)
         
         except Exception as e:
             logger.error(f"Failed to process payment callback: {str(e)}", exc_info=True)
-        return Response({'status': 'ERROR', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'status': 'ERROR', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
     @action(methods=['GET'], detail=True)
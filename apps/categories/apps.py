@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CategoriesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.categories"
+
+    def ready(self) -> None:
+        ''' Load the Categories App Signals. '''
+        from apps.categories import signals
+        return super().ready()
@@ -0,0 +1,70 @@
+from django.core.cache import caches
+from django.conf import settings
+from rest_framework.test import APIRequestFactory
+
+from apps.categories.models import Category
+from apps.categories.serializers import CategorySerializer
+from apps.categories.views import CategoryViewSet
+from apps.utils.benchmarks import BenchmarkCommand
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to compare recursive and materialized category trees"""
+
+    help = "Benchmark category tree rendering on a 5-level, 2,000-node tree"
+
+    # NODES PER LEVEL (5 LEVELS, 2,000 NODES)
+    LEVELS = (5, 20, 100, 375, 1500)
+
+    def seed(self):
+        """Create the tree level by level, spreading nodes over the previous level"""
+
+        parents = [None]
+        for size in self.LEVELS:
+            parents = [
+                Category.objects.create(
+                    name = f'Bench category {len(parents)}-{i}',
+                    parent = parents[i % len(parents)]
+                )
+                for i in range(size)
+            ]
+        return Category.objects.filter(parent = None).first()
+
+    def run(self, **options):
+        """Time the former recursive rendering against the tree endpoints"""
+
+        self.stdout.write(f'Seeding {sum(self.LEVELS)} categories...')
+        root = self.seed()
+
+        factory = APIRequestFactory()
+        list_view = CategoryViewSet.as_view({'get': 'list'})
+        detail_view = CategoryViewSet.as_view({'get': 'retrieve'})
+
+        def recursive():
+            # FORMER LISTING: ONE children QUERY PER NODE, EVERY ROW LISTED AT TOP LEVEL
+            return CategorySerializer(Category.objects.all(), many = True).data
+
+        def recursive_subtree():
+            return CategorySerializer(Category.objects.get(pk = root.pk)).data
+
+        def uncached(view):
+            # MEASURE RENDERING, NOT THE RESPONSE CACHE
+            caches[settings.RESPONSE_CACHE_ALIAS].clear()
+            return view
+
+        def tree():
+            return uncached(list_view)(factory.get('/categories/', {'limit': 10000})).data
+
+        def subtree():
+            return uncached(detail_view)(factory.get(f'/categories/{root.pk}'), id = str(root.pk)).data
+
+        for label, func in (
+            ('children query per node  all categories', recursive),
+            ('children query per node  one root subtree', recursive_subtree),
+            ('materialized tree        /categories/', tree),
+            ('materialized tree        /categories/<root>', subtree),
+        ):
+            queries = self.count_queries(func)
+            self.measure(f'{label} ({queries} queries)', func)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.categories.models import Category
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to recompute categories materialized paths"""
+
+    help = "Recompute Category.path and Category.depth from parent links"
+
+    def handle(self, *args, **options):
+        """Handle rebuild_category_paths command"""
+
+        updated = Category.objects.rebuild_paths()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt paths of {updated} Categories successfully'
+            )
+        )
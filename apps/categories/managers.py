@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models import Subquery, Value
+from django.db.models.functions import Concat
+
+# MATERIALIZED PATHS ARE MADE OF "<hex id>/" SEGMENTS, "~" SORTS AFTER EVERY CHARACTER THEY USE
+PATH_SEPARATOR = '/'
+PATH_END = '~'
+
+####
+##      CATEGORY QUERYSET
+#####
+class CategoryQuerySet(models.QuerySet):
+    ''' Custom QuerySet for Category Model. '''
+
+    def subtree(self, root):
+        '''
+        Return root (a Category or a category id) and all its descendants.
+
+        A single range predicate on the indexed path: no recursive query.
+        '''
+
+        if isinstance(root, self.model):
+            return self.with_path_prefix(root.path)
+
+        path = Subquery(self.model.objects.filter(pk = root).values('path')[:1])
+        return self.filter(
+            path__gte = path,
+            path__lt = Concat(path, Value(PATH_END), output_field = models.CharField())
+        )
+
+    def with_path_prefix(self, path):
+        ''' Return categories whose path starts with path (range predicate). '''
+
+        return self.filter(path__gte = path, path__lt = path + PATH_END)
+
+    def rebuild_paths(self):
+        ''' Recompute path and depth of every category, parents first. Return the number of rows. '''
+
+        nodes = {
+            pk: (parent_id, None)
+            for pk, parent_id in self.model.objects.values_list('pk', 'parent_id')
+        }
+
+        def resolve(pk):
+            parent_id, computed = nodes[pk]
+            if computed is None:
+                parent_path, parent_depth = resolve(parent_id) if parent_id else ('', -1)
+                computed = (parent_path + pk.hex + PATH_SEPARATOR, parent_depth + 1)
+                nodes[pk] = (parent_id, computed)
+            return computed
+
+        updates = []
+        for pk in list(nodes):
+            path, depth = resolve(pk)
+            updates.append(self.model(pk = pk, path = path, depth = depth))
+        self.model.objects.bulk_update(updates, ['path', 'depth'], batch_size = 1000)
+
+        # NO SIGNALS ON bulk_update
+        from apps.categories.tree import bump_version
+        bump_version()
+        return len(updates)
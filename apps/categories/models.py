@@ -1,10 +1,14 @@
 import simplejson as Json
 from bson import ObjectId
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 from apps.utils.models import TimeStampedUUIDModel
+from apps.categories.managers import CategoryQuerySet, PATH_SEPARATOR
 
 # Create your models here.
 
@@ -29,6 +33,17 @@ class Category(TimeStampedUUIDModel):
         null = True, blank = True,
         related_name = 'children'
     )
+    derivatives = models.JSONField(default = dict, blank = True, editable = False)
+
+    # MATERIALIZED PATH: "<root id>/<...>/<own id>/", MAINTAINED BY save()
+    path = models.CharField(max_length = 1000, db_index = True, editable = False, default = '')
+    depth = models.PositiveSmallIntegerField(default = 0, editable = False)
+
+    # SET OBJECT MANAGER CLASS
+    objects = CategoryQuerySet.as_manager()
+
+    # IMAGE FIELDS WITH RESPONSIVE DERIVATIVES (apps.utils.images)
+    DERIVATIVE_FIELDS = ('icon', 'image')
     
     # META CLASS
     class Meta:
@@ -44,4 +59,44 @@ class Category(TimeStampedUUIDModel):
         
     def get_id_prefix(self):
         ''' Return a specific ID prefix for category Model Objects '''
-        return 'CAT'
\ No newline at end of file
+        return 'CAT'
+
+    def get_parent_path(self):
+        ''' Return (path, depth) of the parent category, read from the database. '''
+
+        if self.parent_id is None:
+            return '', -1
+        return Category.objects.filter(pk = self.parent_id).values_list('path', 'depth').get()
+
+    def clean(self):
+        ''' Refuse moving a category below itself. '''
+
+        super().clean()
+        if self.parent_id and self.pk.hex + PATH_SEPARATOR in self.get_parent_path()[0]:
+            raise ValidationError(_('A category cannot be moved below itself or its descendants.'))
+
+    def save(self, *args, **kwargs):
+        ''' Maintain the materialized path, moving descendants along. '''
+
+        with transaction.atomic():
+            # STORED VALUES: THE INSTANCE MAY BE STALE
+            old_path, old_depth = Category.objects.filter(pk = self.pk).values_list(
+                'path', 'depth'
+            ).first() or ('', 0)
+            parent_path, parent_depth = self.get_parent_path()
+            self.path = parent_path + self.pk.hex + PATH_SEPARATOR
+            self.depth = parent_depth + 1
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'path', 'depth'}
+
+            super().save(*args, **kwargs)
+
+            if old_path and old_path != self.path:
+                # REWRITE THE PATH PREFIX OF EVERY DESCENDANT IN ONE UPDATE
+                Category.objects.with_path_prefix(old_path).exclude(pk = self.pk).update(
+                    path = Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth = F('depth') + (self.depth - old_depth),
+                    modified = timezone.now()
+                )
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from apps.categories.models import (
     Category,
 )
+from apps.utils.images import srcset
 
 
 ####
@@ -22,11 +23,18 @@ class CategorySerializer(serializers.ModelSerializer):
         
         # GET INSTANCE REPRESENTATION FIRST
         rep = super().to_representation(instance)
+
+        # REPLACE STORED DERIVATIVES WITH THEIR URLS
+        rep.pop('derivatives', None)
+        request = self.context.get('request')
+        for field in Category.DERIVATIVE_FIELDS:
+            rep[f'{field}_srcset'] = srcset(instance, field, request)
         
         # ADD CHILDREN TO FINAL REPRESENTATION.
-        rep['children'] = CategorySerializer(
-            instance = instance.children.all(), 
-            many=True
-        ).data
+        # (FROM THE TREE BUILT BY CategoryViewSet WHEN AVAILABLE, RENDERED BY
+        # THIS SERIALIZER INSTEAD OF A NEW ONE PER NODE)
+        tree = self.context.get('children')
+        children = tree.get(instance.pk, []) if tree is not None else instance.children.all()
+        rep['children'] = [self.to_representation(child) for child in children]
         
         return rep
\ No newline at end of file
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.categories.models import Category
+from apps.categories.tree import bump_version
+from apps.utils import images
+from core.cache import invalidate_tags
+
+
+## PURGE CACHED CATEGORY RESPONSES
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_responses(sender, instance: Category, **kwargs):
+    ''' Invalidate categories responses and products embedding this category. '''
+
+    invalidate_tags('categories', f'categories:{instance.pk}')
+
+
+## INVALIDATE WORKERS CATEGORY TREES
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance: Category, **kwargs):
+    ''' Make every worker rebuild its category tree on next access. '''
+
+    bump_version()
+
+
+## RENDER CATEGORY IMAGES DERIVATIVES
+@receiver(post_save, sender=Category)
+def render_category_derivatives(sender, instance: Category, **kwargs):
+    ''' Schedule thumb/card/full renditions of new or replaced icon and image. '''
+
+    images.schedule(instance)
@@ -1,3 +1,198 @@
-from django.test import TestCase
+import time
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.categories.models import Category
+from apps.categories.tree import CategoryTree, bump_version, get_category_tree
 
 # Create your tests here.
+
+
+####
+##      CATEGORIES CONDITIONAL GET TEST CASE
+#####
+class CategoriesConditionalGetTestCase(TestCase):
+    ''' Ensure unchanged category reads are answered with 304. '''
+
+    def setUp(self):
+        cache.clear()
+        self.parent = Category.objects.create(name = 'Parent')
+        self.child = Category.objects.create(name = 'Child', parent = self.parent)
+        self.client = APIClient()
+
+    def test_nested_child_change_invalidates_parent(self):
+        url = f'/categories/{self.parent.id}'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH = etag).status_code, 304)
+
+        self.child.name = 'Renamed child'
+        self.child.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['children'][0]['name'], 'Renamed child')
+
+    def test_deletion_is_not_hidden_by_if_modified_since(self):
+        response = self.client.get('/categories/')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        self.child.delete()
+        response = self.client.get(
+            f'/categories/{self.parent.id}', HTTP_IF_MODIFIED_SINCE = http_date(time.time())
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['children'], [])
+
+
+####
+##      CATEGORIES TREE TEST CASE
+#####
+class CategoriesTreeTestCase(TestCase):
+    ''' Ensure the materialized path is maintained and trees cost a single query. '''
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name = 'Electronics')
+        self.phones = Category.objects.create(name = 'Phones', parent = self.electronics)
+        self.android = Category.objects.create(name = 'Android', parent = self.phones)
+        self.fashion = Category.objects.create(name = 'Fashion')
+
+    def test_paths(self):
+        self.android.refresh_from_db()
+        self.assertEqual(self.android.depth, 2)
+        self.assertEqual(
+            self.android.path,
+            f'{self.electronics.pk.hex}/{self.phones.pk.hex}/{self.android.pk.hex}/'
+        )
+        self.assertEqual(
+            set(Category.objects.subtree(self.electronics.pk)),
+            {self.electronics, self.phones, self.android}
+        )
+
+    def test_move_rewrites_descendants(self):
+        self.phones.parent = self.fashion
+        self.phones.save()
+
+        self.android.refresh_from_db()
+        self.assertTrue(self.android.path.startswith(self.fashion.path))
+        self.assertEqual(self.android.depth, 2)
+        self.assertEqual(set(Category.objects.subtree(self.electronics)), {self.electronics})
+
+        with self.assertRaises(ValidationError):
+            self.fashion.parent = self.android
+            self.fashion.save()
+
+    def test_rebuild_paths(self):
+        Category.objects.update(path = '', depth = 0)
+        call_command('rebuild_category_paths', stdout = StringIO())
+
+        self.android.refresh_from_db()
+        self.assertEqual(self.android.depth, 2)
+        self.assertTrue(self.android.path.startswith(self.electronics.path))
+
+    def test_list_is_read_from_the_category_tree(self):
+        self.client.force_authenticate(User.objects.create_user(
+            'reader', 'P@ssw0rd', email = 'reader@fakestore.com', phone_number = '+22890000002'
+        ))
+        # COLD WORKER: THE TREE QUERY, VALIDATORS COME FROM THE TREE VERSION
+        with self.assertNumQueries(1):
+            response = self.client.get('/categories/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/categories/').status_code, 200)
+
+        roots = {node['name']: node for node in response.data['results']}
+        self.assertEqual(set(roots), {'Electronics', 'Fashion'})
+        self.assertEqual(roots['Electronics']['children'][0]['children'][0]['name'], 'Android')
+
+    def test_subtree(self):
+        response = self.client.get('/categories/', {'root': self.phones.pk})
+        self.assertEqual([node['name'] for node in response.data['results']], ['Phones'])
+        self.assertEqual(response.data['results'][0]['children'][0]['name'], 'Android')
+
+        response = self.client.get(f'/categories/{self.phones.pk}')
+        self.assertEqual(response.data['children'][0]['name'], 'Android')
+        self.assertEqual(self.client.get('/categories/not-an-id').status_code, 404)
+
+    def test_cursor_is_rejected(self):
+        response = self.client.get('/categories/', {'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/categories/', {'search': 'Phones', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters_list_matches_with_subtrees(self):
+        for params in ({'search': 'Phones'}, {'name': 'Phones'}, {'parent': self.electronics.pk}):
+            response = self.client.get('/categories/', params)
+            self.assertEqual([node['name'] for node in response.data['results']], ['Phones'])
+            self.assertEqual(response.data['results'][0]['children'][0]['name'], 'Android')
+
+        response = self.client.get('/categories/', {'parent__isnull': 'true'})
+        roots = {node['name']: node for node in response.data['results']}
+        self.assertEqual(set(roots), {'Electronics', 'Fashion'})
+        self.assertEqual(roots['Electronics']['children'][0]['name'], 'Phones')
+
+
+####
+##      CATEGORY TREE CACHE TEST CASE
+#####
+class CategoryTreeCacheTestCase(TestCase):
+    ''' Ensure workers rebuild their category tree once per version. '''
+
+    def setUp(self):
+        cache.clear()
+        self.root = Category.objects.create(name = 'Root')
+
+    def test_rebuilt_after_writes_only(self):
+        with self.assertNumQueries(1):
+            tree = get_category_tree()
+        with self.assertNumQueries(0):
+            self.assertIs(get_category_tree(), tree)
+
+        child = Category.objects.create(name = 'Child', parent = self.root)
+        with self.assertNumQueries(1):
+            tree = get_category_tree()
+        self.assertEqual([node.name for node in tree.subtree(self.root.pk)], ['Root', 'Child'])
+
+        child.delete()
+        self.assertIsNone(get_category_tree().get(child.pk))
+
+    def test_concurrent_stale_readers_rebuild_once(self):
+        get_category_tree()
+        bump_version()
+
+        calls = []
+
+        def load(version):
+            calls.append(version)
+            time.sleep(0.05)
+            return CategoryTree(version, [])
+
+        with patch.object(CategoryTree, 'load', side_effect = load):
+            threads = [threading.Thread(target = get_category_tree) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(CATEGORY_TREE_TTL = 0)
+    def test_process_local_versions_expire(self):
+        tree = get_category_tree()
+
+        # A WRITE BUMPING ANOTHER WORKER'S PRIVATE CACHE ONLY
+        Category.objects.bulk_create([Category(name = 'Elsewhere')])
+
+        rebuilt = get_category_tree()
+        self.assertEqual(rebuilt.version, tree.version)
+        self.assertNotEqual(rebuilt.fingerprint, tree.fingerprint)
+        self.assertIn('Elsewhere', [node.name for node in rebuilt.roots()])
@@ -0,0 +1,146 @@
+"""
+In-memory category trees.
+
+Trees are built from a flat list of categories fetched with a single query,
+instead of one `children` query per node.
+
+Every worker process keeps an immutable snapshot of the whole tree
+(`get_category_tree`), validated on access against a version counter shared
+through the cache and bumped by Category writes. A stale snapshot is rebuilt
+once per worker: concurrent threads wait for the rebuild instead of querying
+the database too. When the cache is private to each process (LocMemCache),
+other workers never see a bump, so snapshots are also rebuilt once older
+than CATEGORY_TREE_TTL seconds.
+"""
+
+import time
+import threading
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import is_process_local
+
+VERSION_KEY = 'category-tree:version'
+
+
+def children_map(nodes):
+    ''' Return {parent id: [children]} of nodes, keeping their order. '''
+
+    children = {}
+    for node in nodes:
+        children.setdefault(node.parent_id, []).append(node)
+    return children
+
+
+####
+##      CATEGORY TREE
+#####
+class CategoryTree:
+    ''' Immutable snapshot of every category, never modify its nodes. '''
+
+    def __init__(self, version, nodes):
+        self.version = version
+        self.nodes = tuple(nodes)
+        self.loaded = time.monotonic()
+        self.by_id = MappingProxyType({node.pk: node for node in self.nodes})
+        self.children = MappingProxyType({
+            parent_id: tuple(children)
+            for parent_id, children in children_map(self.nodes).items()
+        })
+        # VERSIONS OF PROCESS-LOCAL CACHES MISS OTHER WORKERS WRITES, THE CONTENT DOES NOT
+        self.fingerprint = f'{version}|{len(self.nodes)}|' + str(
+            max((node.modified for node in self.nodes), default = None)
+        )
+
+    @classmethod
+    def load(cls, version):
+        ''' Build the tree from a single query, in Category ordering. '''
+
+        from apps.categories.models import Category
+
+        return cls(version, Category.objects.all())
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def roots(self):
+        return self.children.get(None, ())
+
+    def subtree(self, pk):
+        ''' Return the node `pk` and its descendants, parents first. '''
+
+        root = self.by_id.get(pk)
+        if root is None:
+            return []
+
+        nodes, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(reversed(self.children.get(node.pk, ())))
+        return nodes
+
+
+## TREE VERSION
+def get_version():
+    ''' Return the shared tree version, initializing it when missing. '''
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # ADD DOES NOT OVERWRITE A VERSION SET BY ANOTHER WORKER MEANWHILE
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    '''
+    Invalidate every worker's tree, now and once the current transaction
+    commits: a worker rebuilding in between would snapshot uncommitted state.
+    '''
+
+    def bump():
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+## PER WORKER SNAPSHOT
+_lock = threading.Lock()
+_tree = None
+
+
+def get_ttl():
+    ''' Return the seconds a snapshot is trusted, None when versions are shared by every worker. '''
+
+    if not is_process_local('default', 'Category tree version'):
+        return None
+    return getattr(settings, 'CATEGORY_TREE_TTL', 5)
+
+
+def is_fresh(tree, version, ttl):
+    return (
+        tree is not None and tree.version == version and
+        (ttl is None or time.monotonic() - tree.loaded < ttl)
+    )
+
+
+def get_category_tree():
+    ''' Return this worker's tree, rebuilt when the shared version changed. '''
+
+    global _tree
+    version, ttl = get_version(), get_ttl()
+    tree = _tree
+    if is_fresh(tree, version, ttl):
+        return tree
+
+    with _lock:
+        # ANOTHER THREAD MAY HAVE REBUILT IT WHILE WE WAITED
+        version, tree = get_version(), _tree
+        if not is_fresh(tree, version, ttl):
+            tree = _tree = CategoryTree.load(version)
+    return tree
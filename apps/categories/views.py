@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from rest_framework import filters
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import (
@@ -9,9 +10,17 @@ from rest_framework.parsers import (
     MultiPartParser, FormParser, JSONParser
 )
 
+import uuid
+import hashlib
+from django.http import Http404
+from django.utils.http import quote_etag
+
+from core.cache import CachedResponseMixin
+from core.conditional import ConditionalGetMixin
 from apps.categories.serializers import (
     CategorySerializer
 )
+from apps.categories.tree import get_category_tree
 
 # Create your views here.
 
@@ -19,18 +28,113 @@ from apps.categories.serializers import (
 ####
 ##      CATEGORIES VIEWSET CLASS
 #####
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, ConditionalGetMixin, ModelViewSet):
     ''' ViewSet class for Categories Model. '''
     
+    cache_namespace = 'categories'
     queryset = CategorySerializer.Meta.model.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     parser_classes = [ MultiPartParser, FormParser, JSONParser]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = {
+        'parent': ['exact', 'isnull'],
+        'name': ['exact', 'icontains'],
+    }
     search_fields = [
         'code','name','description'
     ]
     lookup_field = 'id'
+    # LISTS ARE TREE NODES, NOT A QUERYSET KEYSET PAGINATION COULD FILTER
+    cursor_pagination = None
+
+    def get_request_cache_tags(self, request):
+        ''' Categories embed their whole subtree, any category write invalidates them all. '''
+
+        return [self.cache_namespace]
+
+    def is_filtered(self):
+        ''' Is the list narrowed by "?search=" or any filterset field. '''
+
+        filterset = DjangoFilterBackend().get_filterset_class(self, self.get_queryset())
+        params = {filters.SearchFilter.search_param, *filterset.base_filters}
+        return any(self.request.query_params.get(param) for param in params)
+
+    def filter_queryset(self, queryset):
+        '''
+        List the category tree: top categories with their subtrees, read from
+        the worker's category tree. "?root=<id>" lists the subtree of a category,
+        "?search=" and filters list the matching categories with their subtrees.
+        '''
+
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+
+        tree = get_category_tree()
+        self.tree = tree.children
+
+        # SEARCH AND FILTER MATCHES ARE LISTED WITH THEIR WHOLE SUBTREES
+        if self.is_filtered():
+            return list(queryset)
+
+        root = self.request.query_params.get('root')
+        if root:
+            node = tree.get(self.parse_id(root))
+            return [node] if node else []
+        return list(tree.roots())
+
+    def get_object(self):
+        ''' Read the category and its subtree from the worker's category tree. '''
+
+        if self.action != 'retrieve':
+            return super().get_object()
+
+        tree = get_category_tree()
+        instance = tree.get(self.parse_id(self.kwargs[self.lookup_url_kwarg or self.lookup_field]))
+        if instance is None:
+            raise Http404
+
+        self.tree = tree.children
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    @staticmethod
+    def parse_id(value):
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            raise Http404
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'tree'):
+            context['children'] = self.tree
+        return context
+
+    def get_validators(self, request):
+        '''
+        Validate tree reads against the tree version, without querying the
+        database. No Last-Modified: removing a category (or a node of an
+        embedded subtree) never makes the tree newer.
+        '''
+
+        if self.is_filtered():
+            return super().get_validators(request)
+
+        tree = get_category_tree()
+        if not tree.nodes:
+            return None, None
+
+        params = sorted(request.query_params.lists())
+        fingerprint = f'{request.path}|{params}|{tree.fingerprint}'
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        return etag, None
+
+    def get_conditional_queryset(self):
+        ''' Filtered results embed their whole subtree, validate against every category. '''
+
+        return self.get_queryset()
     
     def get_permissions(self):
         ''' Retrun permissions to use based on action '''
@@ -117,6 +117,10 @@ class Notification(TimeStampedUUIDModel):
         verbose_name = _("Notification")
         verbose_name_plural = _("Notifications")
         ordering = ['-created','-is_readed']
+        indexes = [
+            # KEYSET PAGINATION
+            models.Index(fields = ['created', 'id']),
+        ]
 
     def __str__(self):
         return self.code
@@ -1,8 +1,9 @@
 from django.contrib import admin
 
 from apps.orders.models import (
-    Order, Article
+    Order, Article, Reservation
 )
+from apps.orders.search import get_search_backend
 
 # Register your models here.
 
@@ -18,6 +19,21 @@ class ArticleInline(admin.TabularInline):
     extra = 1
 
 
+#####
+##      STOCK RESERVATIONS IN LINE CLASS
+######
+class ReservationInline(admin.TabularInline):
+    ''' Read only inline class for Reservation Model Admin '''
+    model = Reservation
+    extra = 0
+    can_delete = False
+    fields = ['product', 'quantity', 'status', 'expires_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj = None):
+        return False
+
+
 ####
 ##      ORDERS ADMIN SITE
 #####
@@ -27,13 +43,20 @@ class OrderAdmin(admin.ModelAdmin):
     
     list_display = [
         'code','client',
-        'status','created'
+        'total','status','created'
     ]
     list_filter = [
         'status',
     ]
     search_fields = [
-        'code','client','articles'
+        'code',
     ]
     list_per_page = LIMIT_PER_PAGE
-    inlines = [ArticleInline]
+    inlines = [ArticleInline, ReservationInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        ''' Search through the orders search index, ranked and without duplicates. '''
+
+        if not search_term.strip():
+            return queryset, False
+        return get_search_backend(queryset.db).search(queryset, search_term), False
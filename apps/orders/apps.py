@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BillingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.orders"
+
+    def ready(self) -> None:
+        ''' Load the Orders App Signals and outbox event handlers. '''
+        from django.db.models.signals import post_migrate
+        from apps.orders import signals, handlers
+
+        post_migrate.connect(signals.create_search_index, sender=self)
+        return super().ready()
@@ -0,0 +1,34 @@
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from apps.billings.models import Transaction
+from apps.orders.models import Article, Order
+from core.export import Export
+
+####
+##      ORDER EXPORT
+#####
+class OrderExport(Export):
+    ''' One flat row per order, client and payment joined. '''
+
+    model = Order
+    columns = (
+        ('id', 'id'),
+        ('code', 'code'),
+        ('created', 'created'),
+        ('status', 'status'),
+        ('total', 'total'),
+        ('items', Coalesce(Subquery(
+            Article.objects.filter(order = OuterRef('pk')).order_by().values('order').annotate(
+                items = Sum('quantity')
+            ).values('items')
+        ), 0)),
+        ('payment_status', Subquery(
+            Transaction.objects.filter(
+                order = OuterRef('pk'), type = Transaction.TYPES.PAYMENT
+            ).order_by('-created').values('status')[:1]
+        )),
+        ('client', 'client'),
+        ('client_username', 'client__username'),
+        ('client_email', 'client__email'),
+    )
@@ -0,0 +1,53 @@
+"""
+Outbox event handlers of the orders app, loaded by BillingsConfig.ready().
+
+Handlers run after commit in the outbox relay, at least once: reindexing
+is idempotent, reservations change status once.
+"""
+
+from apps.orders.models import Order, Reservation
+from apps.orders.search import get_search_backend
+from apps.outbox.events import handler
+
+# ORDERS REINDEXED PER BATCH WHEN A CLIENT CHANGES
+CHUNK_SIZE = 500
+
+
+## KEEP ORDER SEARCH DOCUMENTS UP TO DATE
+@handler('order.created')
+@handler('order.updated')
+@handler('order.articles_changed')
+def index_order(event):
+    ''' (Re)index the order of the event. '''
+
+    get_search_backend().index(Order.objects.filter(pk=event.aggregate_id))
+
+
+@handler('client.updated')
+def index_client_orders(event):
+    ''' Reindex every order of a client whose names changed. '''
+
+    pks = list(
+        Order.objects.filter(client=event.aggregate_id).order_by('pk').values_list('pk', flat=True)
+    )
+    backend = get_search_backend()
+    for start in range(0, len(pks), CHUNK_SIZE):
+        backend.index(Order.objects.filter(pk__in=pks[start:start + CHUNK_SIZE]))
+
+
+## SETTLE STOCK RESERVATIONS WITH PAYMENTS
+@handler('transaction.updated')
+def settle_reservations(event):
+    ''' Sell the reserved stock of paid orders, give it back when payment failed or was cancelled. '''
+
+    from apps.billings.models import Transaction
+
+    payload = event.payload
+    if not payload.get('order') or payload.get('type') != Transaction.TYPES.PAYMENT:
+        return
+
+    reservations = Reservation.objects.filter(order=payload['order'])
+    if payload.get('status') == Transaction.STATUES.SUCCESSFUL:
+        reservations.consume()
+    elif payload.get('status') in (Transaction.STATUES.FAILED, Transaction.STATUES.CANCELLED):
+        reservations.release()
@@ -0,0 +1,54 @@
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.orders.views import OrderViewSet
+from apps.utils.benchmarks import BenchmarkCommand, seed_products
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to measure order creation against cart size"""
+
+    help = "Benchmark POST /orders/ latency and queries for growing carts"
+
+    def add_arguments(self, parser):
+        """Add bench_order_create Comand arguments"""
+
+        super().add_arguments(parser)
+        parser.add_argument(
+            '-s', '--sizes', type = int, nargs = '+', default = [1, 10, 30, 100],
+            help = 'Number of articles per cart'
+        )
+
+    def run(self, **options):
+        """Time order creation for each cart size"""
+
+        sizes = options.get('sizes')
+        _, products = seed_products(max(sizes), categories = 5)
+        user = User.objects.create_user(
+            'bench-buyer', 'P@ssw0rd',
+            email = 'bench-buyer@fakestore.com',
+            phone_number = '+22890000999'
+        )
+
+        factory = APIRequestFactory()
+        view = OrderViewSet.as_view({'post': 'create'})
+
+        def create(size):
+            def post():
+                request = factory.post('/orders/', {
+                    'articles': [
+                        {'product': str(product.pk), 'quantity': 2}
+                        for product in products[:size]
+                    ]
+                }, format = 'json')
+                force_authenticate(request, user)
+                response = view(request)
+                assert response.status_code == 201, response.data
+            return post
+
+        # PAYMENT LINKS ARE REQUESTED AFTER COMMIT, NEVER DURING THE ROLLED BACK BENCHMARK
+        for size in sizes:
+            queries = self.count_queries(create(size))
+            self.measure(f'{size:>4} articles ({queries} queries)', create(size))
@@ -0,0 +1,143 @@
+import time
+import statistics
+import threading
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Max, Sum
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.categories.models import Category
+from apps.orders.models import Order, Reservation
+from apps.orders.views import OrderViewSet
+from apps.outbox.models import OutboxEvent
+from apps.products.models import Product
+from apps.utils.benchmarks import BenchmarkCommand
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to stress parallel checkouts of a single hot product"""
+
+    help = "Run parallel POST /orders/ against one product with little stock, check oversell and latency"
+
+    def add_arguments(self, parser):
+        """Add bench_stock Comand arguments"""
+
+        parser.add_argument(
+            '-c', '--checkouts', type = int, default = 400,
+            help = 'Number of checkouts'
+        )
+        parser.add_argument(
+            '-w', '--workers', type = int, default = 32,
+            help = 'Number of parallel clients'
+        )
+        parser.add_argument(
+            '-s', '--stock', type = int, default = 100,
+            help = 'Initial stock of the hot product'
+        )
+        parser.add_argument(
+            '-q', '--quantity', type = int, default = 1,
+            help = 'Units bought per checkout'
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark on committed fixtures, parallel clients do not share a transaction"""
+
+        last_event = OutboxEvent.objects.aggregate(last = Max('id'))['last'] or 0
+        category = Category.objects.create(name = 'Bench hot category')
+        product = Product.objects.create(
+            name = 'Bench hot product', brand = 'bench', category = category,
+            price = 100, stock = options.get('stock')
+        )
+        user = User.objects.create_user(
+            'bench-rush', 'P@ssw0rd',
+            email = 'bench-rush@fakestore.com',
+            phone_number = '+22890000998'
+        )
+
+        try:
+            # NO IN-PROCESS RELAY: PAYMENTS ARE NEVER REQUESTED FOR BENCH ORDERS
+            with override_settings(OUTBOX = {**getattr(settings, 'OUTBOX', {}), 'WORKERS': 0}):
+                self.run(product = product, user = user, **options)
+        finally:
+            Order.objects.filter(client = user).delete()
+            user.delete()
+            category.delete()
+            OutboxEvent.objects.filter(id__gt = last_event).delete()
+
+    def run(self, product, user, **options):
+        """Run every checkout from `workers` threads and verify the stock"""
+
+        checkouts, workers = options.get('checkouts'), options.get('workers')
+        stock, quantity = options.get('stock'), options.get('quantity')
+
+        factory = APIRequestFactory()
+        view = OrderViewSet.as_view({'post': 'create'})
+        data = {'articles': [{'product': str(product.pk), 'quantity': quantity}]}
+
+        lock = threading.Lock()
+        remaining = [checkouts]
+        statuses, timings, errors = {}, [], []
+        start = threading.Barrier(workers + 1)
+
+        def client():
+            start.wait()
+            try:
+                while True:
+                    with lock:
+                        if not remaining[0]:
+                            return
+                        remaining[0] -= 1
+
+                    request = factory.post('/orders/', data, format = 'json')
+                    force_authenticate(request, user)
+                    began = time.perf_counter()
+                    try:
+                        status = view(request).status_code
+                    except Exception as e:
+                        status = 'error'
+                        errors.append(repr(e))
+                    elapsed = (time.perf_counter() - began) * 1000
+
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                        timings.append(elapsed)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target = client) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        # WHAT WAS SOLD MUST MATCH WHAT LEFT THE SHELF
+        product.refresh_from_db(fields = ['stock'])
+        sold = statuses.get(201, 0) * quantity
+        reserved = Reservation.objects.filter(product = product).aggregate(units = Sum('quantity'))['units'] or 0
+        oversold = max(sold - stock, 0)
+
+        timings.sort()
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))]
+
+        self.stdout.write(f'{checkouts} checkouts of {quantity} unit(s), {workers} clients, {stock} units in stock')
+        self.stdout.write(f'responses {dict(sorted(statuses.items(), key = str))} in {elapsed:.2f}s ({checkouts / elapsed:.0f}/s)')
+        self.stdout.write(f'sold {sold} units, reserved {reserved}, stock left {product.stock}, oversold {oversold}')
+        self.stdout.write(
+            f'latency ms: p50 {statistics.median(timings):.1f}   p95 {percentile(0.95):.1f}   '
+            f'p99 {percentile(0.99):.1f}   max {timings[-1]:.1f}'
+        )
+        for error in errors[:3]:
+            self.stdout.write(self.style.WARNING(error))
+
+        if oversold or product.stock < 0 or sold != reserved or sold + product.stock != stock:
+            raise CommandError('Stock is inconsistent with sold units')
+        self.stdout.write(self.style.SUCCESS('No oversell'))
@@ -0,0 +1,12 @@
+from apps.orders.exports import OrderExport
+from core.export import ExportCommand
+
+####
+##      COMMAND CLASS
+#####
+class Command(ExportCommand):
+    """Django command to export orders"""
+
+    help = "Stream orders as CSV or NDJSON, oldest first"
+
+    export_class = OrderExport
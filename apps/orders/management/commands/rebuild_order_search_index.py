@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.search import get_search_backend
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to rebuild the orders search index"""
+
+    help = "Drop and rebuild the orders full-text search index"
+
+    def add_arguments(self, parser):
+        """Add rebuild_order_search_index Comand arguments"""
+
+        # CHUNK SIZE
+        parser.add_argument(
+            '-c', '--chunk-size', type = int, default = 2000,
+            help = 'Number of orders indexed per batch'
+        )
+
+    def handle(self, *args, **options):
+        """Handle rebuild_order_search_index command"""
+
+        backend = get_search_backend()
+        indexed = backend.rebuild(chunk_size = options.get('chunk_size'))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed {indexed} Orders with {backend.__class__.__name__}'
+            )
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to reconcile stored order totals"""
+
+    help = "Recompute Order.total of orders whose articles no longer match it, in chunks"
+
+    def add_arguments(self, parser):
+        """Add recompute_order_totals Comand arguments"""
+
+        # CHUNK SIZE
+        parser.add_argument(
+            '-c', '--chunk-size', type = int, default = 1000,
+            help = 'Number of orders checked per query'
+        )
+
+        # ALL
+        parser.add_argument(
+            '-a', '--all', action = 'store_true',
+            help = 'Recompute every order, not only drifted ones'
+        )
+
+    def handle(self, *args, **options):
+        """Handle recompute_order_totals command"""
+
+        chunk_size = options.get('chunk_size')
+        ids = list(
+            Order.objects.order_by('pk').values_list('pk', flat = True)
+        )
+
+        updated = 0
+        for start in range(0, len(ids), chunk_size):
+            orders = Order.objects.filter(pk__in = ids[start:start + chunk_size])
+            if not options.get('all'):
+                orders = Order.objects.filter(pk__in = list(orders.drifted().values_list('pk', flat = True)))
+            updated += orders.refresh_totals()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Recomputed totals of {updated} Orders successfully'
+            )
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.billings.models import Transaction
+from apps.orders.models import Reservation
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to release the stock of unpaid orders"""
+
+    help = "Cancel pending payments of orders whose stock reservations expired and release their stock"
+
+    def handle(self, *args, **options):
+        """Handle release_expired_reservations command"""
+
+        orders = set(Reservation.objects.expired().values_list('order', flat = True))
+
+        released = 0
+        for order in orders:
+            with transaction.atomic():
+                # LOCKED: A PAYMENT CONFIRMED MEANWHILE IS NOT OVERWRITTEN
+                for payment in Transaction.objects.select_for_update().filter(
+                    order = order,
+                    type = Transaction.TYPES.PAYMENT,
+                    status = Transaction.STATUES.PENDING
+                ):
+                    payment.cancel()
+
+                # ALSO RELEASED BY THE CANCELLATION HANDLER, WHICHEVER RUNS FIRST
+                released += Reservation.objects.expired().filter(order = order).release()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Released {released} units reserved by {len(orders)} unpaid Orders'
+            )
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Article
+from apps.orders.serializers import SNAPSHOT_FIELDSET, product_snapshot
+from apps.products.models import Product
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to snapshot products of articles created before snapshots"""
+
+    help = "Fill empty Article.snapshot from the current product, in chunks"
+
+    def add_arguments(self, parser):
+        """Add snapshot_articles Comand arguments"""
+
+        # CHUNK SIZE
+        parser.add_argument(
+            '-c', '--chunk-size', type = int, default = 1000,
+            help = 'Number of articles updated per query'
+        )
+
+    def handle(self, *args, **options):
+        """Handle snapshot_articles command"""
+
+        chunk_size = options.get('chunk_size')
+        ids = list(
+            Article.objects.filter(snapshot = {}).order_by('pk').values_list('pk', flat = True)
+        )
+
+        updated = 0
+        for start in range(0, len(ids), chunk_size):
+            articles = list(
+                Article.objects.filter(pk__in = ids[start:start + chunk_size]).only('pk', 'product')
+            )
+            products = Product.objects.for_representation(
+                fieldset = SNAPSHOT_FIELDSET
+            ).in_bulk({article.product_id for article in articles})
+
+            for article in articles:
+                article.snapshot = product_snapshot(products[article.product_id])
+            updated += Article.objects.bulk_update(articles, ['snapshot'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Snapshotted products of {updated} Articles successfully'
+            )
+        )
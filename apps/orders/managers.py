@@ -0,0 +1,191 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import (
+    Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.exceptions import ProductOutOfStockError
+
+logger = logging.getLogger(__name__)
+
+####
+##      ORDER QUERYSET
+#####
+class OrderQuerySet(models.QuerySet):
+    ''' Custom QuerySet for Order Model. '''
+
+    def computed_total(self):
+        ''' Return an expression summing the articles of the outer order in SQL. '''
+
+        articles = self.model._meta.get_field('articles').related_model
+        totals = articles.objects.filter(
+            order = OuterRef('pk')
+        ).order_by().values('order').annotate(
+            total = Sum(F('selling_price') * F('quantity'))
+        ).values('total')
+
+        return Coalesce(Subquery(totals), 0)
+
+    def drifted(self):
+        ''' Orders whose stored total no longer matches their articles. '''
+
+        return self.alias(
+            computed_total = self.computed_total()
+        ).exclude(total = F('computed_total'))
+
+    def refresh_totals(self):
+        ''' Recompute the stored total of every order in one UPDATE. '''
+
+        return self.update(total = self.computed_total())
+
+
+
+def out_of_stock(names):
+    ''' Return the error refusing a checkout of products named names. '''
+
+    return ProductOutOfStockError(_('Not enough stock for: %s.') % ', '.join(sorted(names)))
+
+
+def per_product(quantities):
+    ''' Return an expression evaluating to quantities[product id] on the product row. '''
+
+    return Case(
+        *[When(pk = pk, then = Value(quantity)) for pk, quantity in quantities.items()],
+        output_field = IntegerField()
+    )
+
+
+####
+##      RESERVATION QUERYSET
+#####
+class ReservationQuerySet(models.QuerySet):
+    '''
+    Custom QuerySet for Reservation Model.
+
+    Product stock is only changed by conditional UPDATEs (never read,
+    modified and saved from Python): a checkout takes stock with
+    `stock >= quantity` in the WHERE clause, a reservation changes status
+    with its current status in the WHERE clause, so concurrent checkouts
+    cannot oversell and a reservation is released or consumed once.
+
+    Expired reservations of the products a checkout wants are released by
+    the checkout itself, `manage.py release_expired_reservations` also
+    cancels the pending payments of their orders.
+    '''
+
+    def reserve(self, order, articles):
+        '''
+        Take the stock of articles and hold it for order, or raise
+        ProductOutOfStockError. Call it last in the transaction creating order:
+        product rows stay locked until it commits.
+        '''
+
+        from apps.products.models import Product
+
+        quantities = {}
+        for article in articles:
+            quantities[article.product_id] = quantities.get(article.product_id, 0) + article.quantity
+
+        expires_at = timezone.now() + timedelta(seconds = settings.STOCK_RESERVATION_TTL)
+        reservations = [
+            self.model(order = order, product_id = pk, quantity = quantity, expires_at = expires_at)
+            for pk, quantity in quantities.items()
+        ]
+        for reservation in reservations:
+            reservation.clean()
+        self.bulk_create(reservations)
+
+        products = Product.objects.filter(pk__in = quantities)
+        if len(quantities) > 1:
+            # LOCK ROWS IN ONE ORDER SO CARTS SHARING PRODUCTS CANNOT DEADLOCK
+            list(products.order_by('pk').select_for_update().values_list('pk', flat = True))
+
+        # ABANDONED CHECKOUTS GIVE THEIR STOCK BACK BEFORE IT IS TAKEN
+        self.model.objects.expired().filter(product__in = quantities).release()
+
+        # ALL OR NOTHING: ANY SHORT PRODUCT ROLLS THE TRANSACTION BACK
+        wanted = per_product(quantities)
+        taken = products.filter(Q(stock__isnull = True) | Q(stock__gte = wanted)).update(
+            stock = F('stock') - wanted,
+            modified = timezone.now()
+        )
+        if taken < len(quantities):
+            short = [
+                name for pk, name, stock in products.values_list('pk', 'name', 'stock')
+                if stock is not None and stock < quantities[pk]
+            ]
+            raise out_of_stock(short)
+        return reservations
+
+    def release(self):
+        ''' Give the stock of held reservations back, return the number released. '''
+
+        from apps.products.models import Product
+
+        quantities = {}
+        with transaction.atomic():
+            for pk, product_id, quantity in self.filter(
+                status = self.model.STATUES.HELD
+            ).values_list('pk', 'product_id', 'quantity'):
+                # A CONCURRENT RELEASE (OR CONSUME) OF THE SAME RESERVATION UPDATES NOTHING
+                if self.model.objects.filter(pk = pk, status = self.model.STATUES.HELD).update(
+                    status = self.model.STATUES.RELEASED, modified = timezone.now()
+                ):
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+            if quantities:
+                given = per_product(quantities)
+                Product.objects.filter(pk__in = quantities).update(
+                    stock = F('stock') + given,
+                    modified = timezone.now()
+                )
+        return sum(quantities.values())
+
+    def consume(self):
+        '''
+        Turn reservations of paid orders into sales. Stock released meanwhile
+        (payment confirmed after expiry) is taken again when still available.
+        '''
+
+        from apps.products.models import Product
+
+        with transaction.atomic():
+            consumed = self.filter(status = self.model.STATUES.HELD).update(
+                status = self.model.STATUES.CONSUMED, modified = timezone.now()
+            )
+            for pk, product_id, quantity in self.filter(
+                status = self.model.STATUES.RELEASED
+            ).values_list('pk', 'product_id', 'quantity'):
+                if not self.model.objects.filter(pk = pk, status = self.model.STATUES.RELEASED).update(
+                    status = self.model.STATUES.CONSUMED, modified = timezone.now()
+                ):
+                    continue
+                consumed += 1
+                if not Product.objects.filter(
+                    Q(stock__isnull = True) | Q(stock__gte = quantity), pk = product_id
+                ).update(stock = F('stock') - quantity, modified = timezone.now()):
+                    logger.warning(
+                        f'Oversold product {product_id}: reservation {pk} paid after its stock was released'
+                    )
+        return consumed
+
+    def expired(self):
+        ''' Held reservations past their expiry date. '''
+
+        return self.filter(status = self.model.STATUES.HELD, expires_at__lte = timezone.now())
+
+    def releasable(self):
+        ''' Return an expression summing the expired held quantities of the outer product. '''
+
+        held = self.expired().filter(
+            product = OuterRef('pk')
+        ).order_by().values('product').annotate(
+            total = Sum('quantity')
+        ).values('total')
+
+        return Coalesce(Subquery(held), 0)
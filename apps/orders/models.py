@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 from apps.utils.models import TimeStampedUUIDModel
+from apps.orders.managers import OrderQuerySet, ReservationQuerySet
 from apps.products.models import (
     Product,
 )
@@ -37,6 +38,11 @@ class Order(TimeStampedUUIDModel):
         choices=OrderStatus.choices,
         default=OrderStatus.WAITING_FOR_PAYMENT
     )
+
+    # SUM OF ARTICLES TOTALS, KEPT UP TO DATE BY apps.orders.signals
+    total = models.IntegerField(default = 0, editable = False)
+
+    objects = OrderQuerySet.as_manager()
     
     # META CLASS
     class Meta:
@@ -45,6 +51,12 @@ class Order(TimeStampedUUIDModel):
         verbose_name = _('Order')
         verbose_name_plural = _('Orders')
         ordering = ['-created']
+        indexes = [
+            # KEYSET PAGINATION
+            models.Index(fields = ['created', 'id']),
+            # ?ordering=total AND ?total__gte=
+            models.Index(fields = ['total']),
+        ]
     
     def __str__(self):
         return self.code
@@ -53,12 +65,6 @@ class Order(TimeStampedUUIDModel):
     def get_id_prefix(self):
         ''' Return a specific ID prefix for Articles Model Objects. '''
         return 'ORDER'
-    
-    def total(self):
-        ''' Return the order total price. '''
-        
-        # NORMALY WILL RETURN A REULT OF (selling_prince * quantity)
-        return sum([a.total() for a in self.articles.all()])
 
 
 ####
@@ -79,6 +85,9 @@ class Article(TimeStampedUUIDModel):
     )
     selling_price = models.IntegerField(default = 0)
     quantity = models.IntegerField(default=1)         # WOULD LIKE TO ADD QUANTITY.
+
+    # PRODUCT AS BOUGHT (name, code, price, thumbnail), RENDERED INSTEAD OF THE PRODUCT
+    snapshot = models.JSONField(default = dict, blank = True, editable = False)
     
     # META CLASS
     class Meta:
@@ -101,3 +110,56 @@ class Article(TimeStampedUUIDModel):
         
         # NORMALY WILL RETURN A RESULT OF (selling_prince * quantity)
         return self.selling_price * self.quantity
+
+
+
+####
+##      STOCK RESERVATION MODEL
+#####
+class Reservation(TimeStampedUUIDModel):
+    ''' Stock of a product held for an order while its payment is pending. '''
+
+    class STATUES(models.TextChoices):
+        ''' Reservation statues. '''
+
+        HELD = 'held', _('HELD')
+        CONSUMED = 'consumed', _('CONSUMED')
+        RELEASED = 'released', _('RELEASED')
+
+    order = models.ForeignKey(
+        Order, on_delete = models.CASCADE,
+        related_name = 'reservations'
+    )
+    product = models.ForeignKey(
+        Product, on_delete = models.CASCADE,
+        related_name = 'reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length = 20,
+        choices = STATUES.choices,
+        default = STATUES.HELD
+    )
+    # HELD STOCK IS RELEASED PAST THIS DATE (BY THE NEXT CHECKOUT OF THE PRODUCT OR manage.py release_expired_reservations)
+    expires_at = models.DateTimeField()
+
+    objects = ReservationQuerySet.as_manager()
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Reservation Model '''
+
+        verbose_name = _('Reservation')
+        verbose_name_plural = _('Reservations')
+        ordering = ['created']
+        indexes = [
+            # EXPIRED HELD RESERVATIONS
+            models.Index(fields = ['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id} ({self.status})'
+
+    def get_id_prefix(self):
+        ''' Return a specific ID prefix for Reservation Model Objects. '''
+        return 'RSV'
@@ -0,0 +1,84 @@
+"""
+Full-text search index for Orders.
+
+Every order is indexed as one document: its reference (order code, client
+names and code), the names of its products and of their categories. The
+document is refreshed by outbox handlers when the order, its articles or
+its client change (apps.orders.handlers), so searching never joins
+articles, products or categories.
+"""
+
+from core import search
+
+from apps.categories.tree import get_category_tree
+from apps.orders.models import Article, Order
+
+
+####
+##      ORDER SEARCH INDEX
+#####
+class OrderSearchIndex(search.SearchIndex):
+    ''' Orders by reference, product names and category names. '''
+
+    model = Order
+    table = 'orders_order_search'
+    key = 'order_id'
+    columns = ('reference', 'products', 'categories')
+    weights = (10.0, 5.0, 2.0)
+    search_fields = (
+        'code', 'client__first_name', 'client__last_name', 'client__code',
+        'articles__product__name', 'articles__product__category__name',
+    )
+
+    def category_names(self, tree, category_id):
+        ''' Return the names of a category and of its ancestors. '''
+
+        names, node = [], tree.get(category_id)
+        while node is not None:
+            names.append(node.name)
+            node = tree.get(node.parent_id)
+        return names
+
+    def documents(self, queryset, chunk_size=2000):
+        tree = get_category_tree()
+        orders = list(
+            queryset.order_by().values_list(
+                'pk', 'code', 'client__first_name', 'client__last_name',
+                'client__username', 'client__code',
+            )
+        )
+        for start in range(0, len(orders), chunk_size):
+            chunk = orders[start:start + chunk_size]
+
+            # ONE ARTICLES QUERY PER CHUNK
+            products, categories = {}, {}
+            articles = Article.objects.filter(
+                order__in = [row[0] for row in chunk]
+            ).values_list('order_id', 'snapshot', 'product__name', 'product__category_id')
+            for order_id, snapshot, name, category_id in articles:
+                # NAME AS BOUGHT AND CURRENT NAME
+                products.setdefault(order_id, set()).update(filter(None, ((snapshot or {}).get('name'), name)))
+                categories.setdefault(order_id, set()).update(self.category_names(tree, category_id))
+
+            for pk, *reference in chunk:
+                yield (
+                    pk,
+                    ' '.join(filter(None, reference)),
+                    ' '.join(sorted(products.get(pk, ()))),
+                    ' '.join(sorted(categories.get(pk, ()))),
+                )
+
+
+def get_search_backend(using=None):
+    ''' Return the search backend matching the Order database. '''
+
+    return search.get_search_backend(OrderSearchIndex(), using)
+
+
+####
+##      ORDER SEARCH FILTER
+#####
+class OrderSearchFilter(search.SearchIndexFilter):
+    ''' Full-text search on orders through the search index, best matches first. '''
+
+    index_class = OrderSearchIndex
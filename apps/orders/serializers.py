@@ -1,20 +1,49 @@
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
 
 from apps.billings.serializers import TransactionSerializer
+from apps.orders.managers import out_of_stock
 from apps.orders.models import (
-    Article, Order
+    Article, Order, Reservation
 )
+from apps.products.models import Product
 from apps.products.serializers import (
     ProductSerializer
 )
 from apps.accounts.serializers import UserSerializer
+from core.fieldsets import FieldSet, SparseFieldsMixin
+
+# PRODUCT FIELDS COPIED INTO ARTICLES AT PURCHASE TIME
+SNAPSHOT_FIELDSET = FieldSet(fields = {'name', 'code', 'price', 'thumbnail'}, expand = {})
+
+
+def product_snapshot(product:Product):
+    '''
+    Return what an article remembers of product. Load products with
+    Product.objects.for_representation(fieldset = SNAPSHOT_FIELDSET).
+    '''
+
+    return {
+        'name': product.name,
+        'code': product.code,
+        'price': product.price,
+        # RELATIVE URL, MADE ABSOLUTE WHEN RENDERED
+        'thumbnail': ProductSerializer().get_thumbnail(product),
+    }
 
 ####
 ##      ARTICLES SERIALIZER
 #####
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ''' Serializer class for Articles Model. '''
+
+    # RENDERED BY to_representation
+    custom_fields = ('product',)
+
+    # RESOLVED FOR THE WHOLE CART BY OrderSerializer.validate_articles
+    product = serializers.UUIDField()
     
     # META CLASS
     class Meta:
@@ -25,6 +54,11 @@ class ArticleSerializer(serializers.ModelSerializer):
             "selling_price",
             "quantity"
         )
+        extra_kwargs = {
+            # PRICED SERVER SIDE FROM Product.price
+            'selling_price': {'read_only': True},
+            'quantity': {'min_value': 1},
+        }
         
     def to_representation(self, instance:Article):
         ''' Override Instance reprensentation method to customize fields. '''
@@ -32,21 +66,38 @@ class ArticleSerializer(serializers.ModelSerializer):
         # GET INSTANCE REPRESENTATION FIRST
         rep = super().to_representation(instance)
         
-        rep['product'] = ProductSerializer(
-            instance = instance.product,
-            context = self.context
-        ).data
+        # CURRENT PRODUCT ONLY ON "?expand=articles.product", ELSE THE PRODUCT AS BOUGHT
+        if self.fieldset.expands_explicitly('product'):
+            rep['product'] = ProductSerializer(
+                instance = instance.product,
+                context = self.nested_context('product')
+            ).data
+        elif self.fieldset.includes('product'):
+            rep['product'] = self.get_snapshot(instance)
         
-        rep['total'] = instance.total()
+        if self.fieldset.includes('total'):
+            rep['total'] = instance.total()
         
         return rep
+
+    def get_snapshot(self, instance:Article):
+        ''' Return the product snapshot of instance, without loading the product. '''
+
+        snapshot = {'id': str(instance.product_id), **instance.snapshot}
+        request = self.context.get('request')
+        if request is not None and snapshot.get('thumbnail'):
+            snapshot['thumbnail'] = request.build_absolute_uri(snapshot['thumbnail'])
+        return snapshot
     
     
 ####
 ##      ORDER SERIALIZER
 #####
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ''' Serializer class for Orders Model. '''
+
+    # RENDERED BY to_representation
+    custom_fields = ('client', 'articles')
     
     articles = ArticleSerializer(many = True)
     status = serializers.CharField(default=Order.OrderStatus.WAITING_FOR_PAYMENT)
@@ -80,51 +131,103 @@ class OrderSerializer(serializers.ModelSerializer):
         # GET INSTANCE REPRESENTATION FIRST
         rep = super().to_representation(instance)
         
+        fieldset = self.fieldset
+
         # ADD CLIENT REPRESENTATION 
-        rep['client'] = UserSerializer(
-            instance = instance.client
-        ).data
+        if fieldset.expands('client'):
+            rep['client'] = UserSerializer(
+                instance = instance.client
+            ).data
+        elif fieldset.includes('client'):
+            rep['client'] = str(instance.client_id)
         
         # ADD ARTICLES TO REPRESENTATION
-        rep['articles'] = ArticleSerializer(
-            instance = instance.articles,
-            many = True, context = self.context
-        ).data
-        
-        # ADD TOTAL
-        rep['total'] = instance.total()
+        if fieldset.expands('articles'):
+            rep['articles'] = ArticleSerializer(
+                instance = instance.articles.all(),
+                many = True, context = self.nested_context('articles')
+            ).data
         
-        # ADD TRANSACTION
-        transaction = instance.transactions.first()
-        rep['transaction'] = TransactionSerializer(transaction).data if transaction else None
+        # ADD TRANSACTION (LATEST ONE, PREFETCHED BY OrderViewSet WHEN AVAILABLE)
+        if fieldset.expands('transaction') or fieldset.includes('payment_status'):
+            transaction = next(iter(instance.transactions.all()), None)
+            if fieldset.expands('transaction'):
+                rep['transaction'] = TransactionSerializer(transaction).data if transaction else None
+
+            # "pending" UNTIL THE PAYMENT LINK IS PUSHED TO THE USER (apps.billings.tasks)
+            if fieldset.includes('payment_status'):
+                rep['payment_status'] = transaction.status if transaction else None
                 
         return rep
 
+    def validate_articles(self, articles):
+        ''' Resolve every ordered product in one query and price articles from it. '''
+
+        if not articles:
+            raise serializers.ValidationError(_('An order must contain at least one article.'))
+
+        ids = {article['product'] for article in articles}
+        # EXPIRED RESERVATIONS ARE RELEASED BY THIS CHECKOUT, THEIR STOCK IS AVAILABLE
+        products = Product.objects.for_representation(fieldset = SNAPSHOT_FIELDSET).annotate(
+            available = F('stock') + Reservation.objects.releasable()
+        ).in_bulk(ids)
+        missing = ids - products.keys()
+        if missing:
+            raise serializers.ValidationError(
+                [_('Invalid pk "%s" - object does not exist.') % pk for pk in sorted(map(str, missing))]
+            )
+
+        # SOLD OUT PRODUCTS ARE REFUSED BEFORE LOCKING ANYTHING, THE RESERVATION DECIDES FOR THE OTHERS
+        wanted = {}
+        for article in articles:
+            wanted[article['product']] = wanted.get(article['product'], 0) + article['quantity']
+        short = [
+            products[pk].name for pk, quantity in wanted.items()
+            if products[pk].available is not None and products[pk].available < quantity
+        ]
+        if short:
+            raise out_of_stock(short)
+
+        for article in articles:
+            article['product'] = products[article['product']]
+            article['selling_price'] = article['product'].price
+            article['snapshot'] = product_snapshot(article['product'])
+        return articles
+
     def create(self, validated_data):
-        ''' Override create method to auto create articles. '''
-        
+        ''' Create the order, its articles, its payment transaction and its stock reservations atomically. '''
+
+        from apps.billings.models import Transaction
+
         articles = validated_data.pop('articles')
         user = self.context['request'].user
 
-        # Créer l'ordre
-        order = Order.objects.create(
-            **validated_data,
-            client=user
-        )
-        
-        # Créer tous les articles
-        for article_data in articles:
-            Article.objects.create(**article_data, order=order)
-        
-        if order:    
+        # bulk_create DOES NOT CALL save()
+        items = [Article(**article_data) for article_data in articles]
+        for item in items:
+            item.clean()
+        total = sum(item.total() for item in items)
+
+        with transaction.atomic():
+            order = Order.objects.create(
+                **validated_data,
+                client = user,
+                total = total
+            )
+
+            for item in items:
+                item.order = order
+            Article.objects.bulk_create(items)
+
             # CREATE TRANSACTION FOR ORDER
-            from apps.billings.models import Transaction
-            
-            order_transaction = Transaction.objects.create(
-                user=order.client,
-                order=order,
-                type=Transaction.TYPES.PAYMENT,
-                amount=float(order.total()),
+            Transaction.objects.create(
+                user = order.client,
+                order = order,
+                type = Transaction.TYPES.PAYMENT,
+                amount = total,
             )
-        
-        return order
\ No newline at end of file
+
+            # LAST: HOT PRODUCT ROWS STAY LOCKED UNTIL COMMIT
+            Reservation.objects.reserve(order, items)
+
+        return order
@@ -0,0 +1,72 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.orders.models import Article, Order, Reservation
+from apps.orders.search import get_search_backend
+from apps.outbox.events import publish
+
+# CLIENT FIELDS INDEXED IN ORDER SEARCH DOCUMENTS
+CLIENT_FIELDS = {'first_name', 'last_name', 'username', 'code'}
+
+
+## KEEP STORED ORDER TOTALS UP TO DATE
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def refresh_order_total(sender, instance: Article, **kwargs):
+    ''' Recompute the total of the article's order in one UPDATE. '''
+
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
+
+
+## PUBLISH ORDER EVENTS
+@receiver(post_save, sender=Order)
+def publish_order_event(sender, instance: Order, created, **kwargs):
+    ''' Record the change in the outbox, in the transaction saving the order. '''
+
+    publish(
+        'order.created' if created else 'order.updated',
+        instance,
+        {'status': instance.status, 'total': instance.total}
+    )
+
+
+## REINDEX ORDERS WHEN THEIR ARTICLES OR CLIENT CHANGE
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def publish_articles_changed(sender, instance: Article, **kwargs):
+    ''' Order documents list product names. '''
+
+    publish('order.articles_changed', Order(pk=instance.order_id))
+
+
+@receiver(post_save, sender=User)
+def publish_client_updated(sender, instance: User, created, update_fields=None, **kwargs):
+    ''' Order documents list client names, not updated by logins (last_login only). '''
+
+    if created or (update_fields is not None and not set(update_fields) & CLIENT_FIELDS):
+        return
+    publish('client.updated', instance)
+
+
+## REMOVE DELETED ORDERS FROM THE SEARCH INDEX
+@receiver(post_delete, sender=Order)
+def unindex_order(sender, instance: Order, **kwargs):
+    ''' Remove a deleted order from the search index. '''
+
+    get_search_backend().remove([instance.pk])
+
+
+## GIVE THE STOCK OF DELETED ORDERS BACK
+@receiver(pre_delete, sender=Order)
+def release_order_stock(sender, instance: Order, **kwargs):
+    ''' Release held reservations before they are deleted with their order. '''
+
+    Reservation.objects.filter(order=instance.pk).release()
+
+
+## CREATE SEARCH INDEX
+def create_search_index(sender, using, **kwargs):
+    ''' Create the orders search index structures after migrations. '''
+
+    get_search_backend(using).setup()
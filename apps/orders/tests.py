@@ -1,3 +1,612 @@
-from django.test import TestCase
+import json
+import time
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.billings.models import Transaction
+from apps.categories.models import Category
+from apps.categories.tree import get_category_tree
+from apps.orders.models import Article, Order, Reservation
+from apps.orders.search import get_search_backend as get_order_search_backend
+from apps.products.models import Product, ProductMedia
+from core import idempotency
+from core.exceptions import IdempotencyKeyInProgressError
+from core.idempotency import IdempotencyStore
 
 # Create your tests here.
+
+
+####
+##      ORDERS FIELDSETS TEST CASE
+#####
+class OrdersFieldsetsTestCase(TestCase):
+    ''' Ensure ?fields= and ?expand= trim order representations and queries. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'buyer', 'P@ssw0rd',
+            email = 'buyer@fakestore.com',
+            phone_number = '+22890000001'
+        )
+        category = Category.objects.create(name = 'Orders category')
+        products = [
+            Product.objects.create(name = f'Product {i}', brand = 'Acme', category = category, price = 100 * (i + 1))
+            for i in range(5)
+        ]
+        ProductMedia.objects.bulk_create([
+            ProductMedia(product = product, file = f'products/{product.name}/front.png', code = f'PDM-{i}')
+            for i, product in enumerate(products)
+        ])
+        for i in range(10):
+            order = Order.objects.create(client = cls.user)
+            Article.objects.bulk_create([
+                Article(order = order, product = product, selling_price = product.price, quantity = 2, code = f'ART-{i}-{j}')
+                for j, product in enumerate(products)
+            ])
+            # bulk_create: NO PAYMENT REQUEST SIGNAL
+            Transaction.objects.bulk_create([
+                Transaction(user = cls.user, order = order, amount = 3000, code = f'TRX-{i}')
+            ])
+        # bulk_create: NO TOTAL REFRESH SIGNAL, NO SNAPSHOT
+        Order.objects.refresh_totals()
+        call_command('snapshot_articles', stdout = StringIO())
+
+    def setUp(self):
+        cache.clear()
+        # WARM CATEGORY TREE: QUERY COUNTS BELOW ARE FOR A WARM WORKER
+        get_category_tree()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_full_representation(self):
+        # COUNT, ORDERS (CLIENT JOINED), ARTICLES, TRANSACTIONS: PRODUCTS COME FROM SNAPSHOTS
+        with self.assertNumQueries(4):
+            response = self.client.get('/orders/?limit=10')
+
+        order = response.data['results'][0]
+        self.assertEqual(order['client']['id'], str(self.user.pk))
+        self.assertEqual(order['total'], 3000)
+        product = order['articles'][0]['product']
+        self.assertEqual(set(product), {'id', 'name', 'code', 'price', 'thumbnail'})
+        self.assertEqual(product['name'], 'Product 0')
+        self.assertEqual(product['thumbnail'], 'http://testserver/medias/products/Product%200/front.png')
+        self.assertEqual(order['transaction']['code'], 'TRX-9')
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/orders/?limit=10&fields=id,total,client')
+
+        self.assertEqual(
+            response.data['results'][0],
+            {
+                'id': response.data['results'][0]['id'],
+                'client': str(self.user.pk),
+                'total': 3000
+            }
+        )
+
+    def test_expand(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/orders/?limit=10&fields=id&expand=articles.product'
+            )
+
+        order = response.data['results'][0]
+        self.assertEqual(set(order), {'id', 'articles'})
+        product = order['articles'][0]['product']
+        self.assertEqual(product['category'], str(Category.objects.get().pk))
+        self.assertNotIn('medias', product)
+        self.assertNotIn('thumbnail', product)
+
+
+####
+##      ORDER CREATION TEST CASE
+#####
+@patch('apps.billings.tasks.PaymentService')
+class OrderCreationTestCase(TestCase):
+    ''' Ensure orders are created atomically, priced server side, in constant queries. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'cart', 'P@ssw0rd',
+            email = 'cart@fakestore.com',
+            phone_number = '+22890000002'
+        )
+        category = Category.objects.create(name = 'Cart category')
+        cls.products = Product.objects.bulk_create([
+            Product(name = f'Cart product {i}', brand = 'Acme', category = category, price = 100 * (i + 1), code = f'PRD-{i}')
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        get_category_tree()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, products, quantity = 2, **extra):
+        return self.client.post('/orders/', {
+            'articles': [
+                {'product': str(product.pk), 'quantity': quantity, **extra}
+                for product in products
+            ]
+        }, format = 'json')
+
+    def test_prices_come_from_products(self, service):
+        response = self.post(self.products[:3], selling_price = 1)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([a['selling_price'] for a in response.data['articles']], [100, 200, 300])
+        self.assertEqual(response.data['total'], 1200)
+        self.assertEqual(Transaction.objects.get(order = response.data['id']).amount, 1200)
+
+    def test_queries_do_not_grow_with_cart_size(self, service):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.post(self.products[:2]).status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.post(self.products).status_code, 201)
+
+        self.assertEqual(len(small), len(large))
+
+    def test_unknown_product_creates_nothing(self, service):
+        missing = Product(name = 'Missing')
+        response = self.post([self.products[0], missing])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(missing.pk), response.data['message']['en'])
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(OUTBOX = {'ASYNC': False})
+    @patch('apps.billings.handlers.send_transaction_update')
+    def test_payment_is_requested_after_commit(self, notify, service):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post(self.products[:3])
+
+        # THE RESPONSE NEVER WAITS FOR THE PROVIDER
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['payment_status'], 'pending')
+        service.return_value.create_transaction.assert_not_called()
+
+        def initiate(transaction):
+            transaction.payment_link = 'https://pay.example.com/checkout/1'
+            transaction.save()
+        service.return_value.create_transaction.side_effect = initiate
+
+        # RELAYED ONCE COMMITTED, THE LINK IS PUSHED TO THE USER
+        for callback in callbacks:
+            callback()
+        service.return_value.create_transaction.assert_called_once()
+        notify.assert_called_once()
+        self.assertEqual(notify.call_args.args[0].payment_link, 'https://pay.example.com/checkout/1')
+
+    @override_settings(OUTBOX = {'ASYNC': False})
+    @patch('apps.billings.handlers.send_transaction_update')
+    def test_failed_payment_request_keeps_the_order(self, notify, service):
+        service.side_effect = RuntimeError('provider misconfigured')
+
+        with self.captureOnCommitCallbacks(execute = True):
+            response = self.post(self.products[:3])
+
+        self.assertEqual(response.status_code, 201)
+        transaction = Transaction.objects.get(order = response.data['id'])
+        self.assertEqual(transaction.status, Transaction.STATUES.FAILED)
+        notify.assert_called_once_with(transaction)
+
+    def test_articles_keep_the_product_as_bought(self, service):
+        product = self.products[0]
+        order_id = self.post([product]).data['id']
+        Product.objects.filter(pk = product.pk).update(name = 'Renamed', price = 999)
+
+        response = self.client.get(f'/orders/{order_id}')
+        article = response.data['articles'][0]
+        self.assertEqual((article['product']['name'], article['product']['price']), ('Cart product 0', 100))
+
+        response = self.client.get(f'/orders/{order_id}?expand=articles.product')
+        article = response.data['articles'][0]
+        self.assertEqual((article['product']['name'], article['product']['price']), ('Renamed', 999))
+
+    def test_rejects_empty_cart_and_null_quantities(self, service):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(self.products[:1], quantity = 0).status_code, 400)
+
+
+####
+##      ORDER TOTALS TEST CASE
+#####
+class OrderTotalsTestCase(TestCase):
+    ''' Ensure stored totals follow articles and can be sorted and filtered in SQL. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'totals', 'P@ssw0rd',
+            email = 'totals@fakestore.com',
+            phone_number = '+22890000003'
+        )
+        category = Category.objects.create(name = 'Totals category')
+        cls.product = Product.objects.create(name = 'Totals product', brand = 'Acme', category = category, price = 100)
+        cls.orders = []
+        for quantity in (3, 1, 2):
+            order = Order.objects.create(client = cls.user)
+            Article.objects.create(order = order, product = cls.product, selling_price = 100, quantity = quantity)
+            cls.orders.append(order)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_articles_changes_refresh_total(self):
+        order = self.orders[0]
+        self.assertEqual(Order.objects.get(pk = order.pk).total, 300)
+
+        article = order.articles.get()
+        article.quantity = 5
+        article.save()
+        self.assertEqual(Order.objects.get(pk = order.pk).total, 500)
+
+        article.delete()
+        self.assertEqual(Order.objects.get(pk = order.pk).total, 0)
+
+    def test_ordering_and_filtering_on_total(self):
+        response = self.client.get('/orders/?fields=total&ordering=total')
+        self.assertEqual([o['total'] for o in response.data['results']], [100, 200, 300])
+
+        response = self.client.get('/orders/?fields=total&ordering=-total&total__gte=200')
+        self.assertEqual([o['total'] for o in response.data['results']], [300, 200])
+
+    def test_recompute_fixes_drift(self):
+        Order.objects.filter(pk = self.orders[1].pk).update(total = 42)
+        self.assertEqual(list(Order.objects.drifted()), [self.orders[1]])
+
+        out = StringIO()
+        call_command('recompute_order_totals', stdout = out)
+
+        self.assertIn('1 Orders', out.getvalue())
+        self.assertFalse(Order.objects.drifted().exists())
+        self.assertEqual(Order.objects.get(pk = self.orders[1].pk).total, 100)
+
+
+####
+##      ORDER SEARCH TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False})
+class OrderSearchTestCase(TestCase):
+    ''' Ensure order search documents follow writes and results are ranked, once per order. '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'search', 'P@ssw0rd',
+            email = 'search@fakestore.com',
+            phone_number = '+22890000005',
+            first_name = 'Kofi', last_name = 'Mensah'
+        )
+        self.other = User.objects.create_user(
+            'other', 'P@ssw0rd',
+            email = 'other@fakestore.com',
+            phone_number = '+22890000006',
+            first_name = 'Ama', last_name = 'Laptop'
+        )
+        electronics = Category.objects.create(name = 'Electronics')
+        computers = Category.objects.create(name = 'Computers', parent = electronics)
+        self.laptop = Product.objects.create(name = 'Laptop Pro', brand = 'Acme', category = computers, price = 100)
+        self.bag = Product.objects.create(name = 'Laptop bag', brand = 'Acme', category = computers, price = 10)
+
+        with self.captureOnCommitCallbacks(execute = True):
+            self.order = Order.objects.create(client = self.user)
+            for product in (self.laptop, self.bag):
+                Article.objects.create(order = self.order, product = product, selling_price = product.price)
+            self.other_order = Order.objects.create(client = self.other)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        response = self.client.get('/orders/', {'search': query, 'fields': 'id'})
+        return [order['id'] for order in response.data['results']]
+
+    def test_ranked_and_deduplicated(self):
+        # CLIENT NAMES WEIGH MORE THAN PRODUCT NAMES, TWO MATCHING ARTICLES GIVE ONE ROW
+        self.assertEqual(self.search('laptop'), [str(self.other_order.pk), str(self.order.pk)])
+        self.assertEqual(self.search('electro'), [str(self.order.pk)])
+        self.assertEqual(self.search(self.order.code), [str(self.order.pk)])
+        self.assertEqual(self.search('kofi laptop'), [str(self.order.pk)])
+
+    def test_document_follows_articles_and_client(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.other.first_name = 'Efua'
+            self.other.save()
+            Article.objects.create(order = self.other_order, product = self.bag, selling_price = 10)
+
+        self.assertEqual(self.search('efua bag'), [str(self.other_order.pk)])
+
+        with self.captureOnCommitCallbacks(execute = True):
+            self.other_order.delete()
+        self.assertEqual(self.search('efua'), [])
+
+    def test_rebuild_command(self):
+        get_order_search_backend().clear()
+        self.assertEqual(self.search('kofi'), [])
+
+        call_command('rebuild_order_search_index', stdout = StringIO())
+        self.assertEqual(self.search('kofi'), [str(self.order.pk)])
+
+
+####
+##      ORDER IDEMPOTENCY TEST CASE
+#####
+@patch('apps.billings.tasks.PaymentService')
+class OrderIdempotencyTestCase(TestCase):
+    ''' Ensure retried order creations with an Idempotency-Key create a single order. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'retry', 'P@ssw0rd',
+            email = 'retry@fakestore.com',
+            phone_number = '+22890000007'
+        )
+        category = Category.objects.create(name = 'Retry category')
+        cls.product = Product.objects.create(name = 'Retry product', brand = 'Acme', category = category, price = 100)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, key, quantity = 1, product = None):
+        return self.client.post('/orders/', {
+            'articles': [{'product': str(product or self.product.pk), 'quantity': quantity}]
+        }, format = 'json', headers = {'Idempotency-Key': key})
+
+    def test_retry_replays_the_response(self, service):
+        first = self.post('checkout-1')
+        self.assertEqual(first.status_code, 201)
+
+        # NEITHER ORDERS NOR THE PROVIDER ARE TOUCHED AGAIN, ONLY THE SHARED KEYS TABLE
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post('checkout-1')
+        self.assertTrue(all(
+            'idempotency_keys' in query['sql'] or 'SAVEPOINT' in query['sql']
+            for query in queries
+        ))
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_key_reused_with_another_body(self, service):
+        self.assertEqual(self.post('checkout-2').status_code, 201)
+
+        response = self.post('checkout-2', quantity = 3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_frees_its_key(self, service):
+        response = self.post('checkout-3', product = Product(name = 'Missing').pk)
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.post('checkout-3').status_code, 201)
+
+    def test_concurrent_duplicate_waits_for_the_first(self, service):
+        store = IdempotencyStore({**idempotency.DEFAULTS, 'WAIT': 5, 'POLL_INTERVAL': 0.01})
+        self.assertIsNone(store.begin('idempotency:test', 'fingerprint'))
+
+        results = []
+        duplicate = threading.Thread(
+            target = lambda: results.append(store.begin('idempotency:test', 'fingerprint'))
+        )
+        duplicate.start()
+        time.sleep(0.05)
+        self.assertTrue(duplicate.is_alive())
+
+        store.complete('idempotency:test', 'fingerprint', Response({'id': 1}, status = 201))
+        duplicate.join(1)
+        self.assertEqual(results[0]['response']['data'], {'id': 1})
+
+        # A DUPLICATE GIVES UP AFTER WAIT SECONDS
+        store = IdempotencyStore({**idempotency.DEFAULTS, 'WAIT': 0})
+        store.begin('idempotency:other', 'fingerprint')
+        with self.assertRaises(IdempotencyKeyInProgressError):
+            store.begin('idempotency:other', 'fingerprint')
+
+    def test_keys_are_shared_by_workers(self, service):
+        # ANOTHER WORKER: A NEW CACHE INSTANCE ON THE SAME STORAGE
+        config = idempotency.get_config()
+        params = settings.CACHES[config['CACHE_ALIAS']]
+        other = IdempotencyStore({**config, 'WAIT': 0})
+        other.cache = type(other.cache)(params['LOCATION'], params)
+
+        self.assertIsNone(IdempotencyStore().begin('idempotency:shared', 'fingerprint'))
+        with self.assertRaises(IdempotencyKeyInProgressError):
+            other.begin('idempotency:shared', 'fingerprint')
+
+
+####
+##      STOCK RESERVATION TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False})
+@patch('apps.billings.handlers.send_transaction_update')
+@patch('apps.billings.tasks.PaymentService')
+class StockReservationTestCase(TestCase):
+    ''' Ensure checkouts hold stock without overselling and give it back when unpaid. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'stock', 'P@ssw0rd',
+            email = 'stock@fakestore.com',
+            phone_number = '+22890000008'
+        )
+        category = Category.objects.create(name = 'Stock category')
+        cls.product = Product.objects.create(name = 'Hot product', brand = 'Acme', category = category, price = 100, stock = 3)
+        cls.untracked = Product.objects.create(name = 'Plenty product', brand = 'Acme', category = category, price = 10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, quantity = 2):
+        with self.captureOnCommitCallbacks(execute = True):
+            return self.client.post('/orders/', {'articles': [
+                {'product': str(self.product.pk), 'quantity': quantity},
+                {'product': str(self.untracked.pk), 'quantity': 5},
+            ]}, format = 'json')
+
+    def stock(self):
+        self.product.refresh_from_db(fields = ['stock'])
+        return self.product.stock
+
+    def settle(self, order_id, change):
+        payment = Transaction.objects.get(order = order_id)
+        with self.captureOnCommitCallbacks(execute = True):
+            change(payment)
+
+    def test_checkout_never_oversells(self, service, notify):
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(self.stock(), 1)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Hot product', response.data['message']['en'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.stock(), 1)
+        self.assertIsNone(Product.objects.get(pk = self.untracked.pk).stock)
+
+    def test_failed_or_cancelled_payment_gives_stock_back(self, service, notify):
+        failed, cancelled = self.checkout(1).data['id'], self.checkout(1).data['id']
+        self.assertEqual(self.stock(), 1)
+
+        self.settle(failed, Transaction.fail)
+        self.settle(cancelled, Transaction.cancel)
+        self.assertEqual(self.stock(), 3)
+
+        # RELEASED ONCE, WHATEVER THE NUMBER OF DELIVERIES
+        self.assertEqual(Reservation.objects.release(), 0)
+        self.assertEqual(self.stock(), 3)
+
+    def test_paid_order_keeps_its_stock(self, service, notify):
+        order_id = self.checkout().data['id']
+        self.settle(order_id, Transaction.succeed)
+
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(
+            set(Reservation.objects.filter(order = order_id).values_list('status', flat = True)),
+            {Reservation.STATUES.CONSUMED}
+        )
+
+    def test_expired_reservations_are_released(self, service, notify):
+        order_id = self.checkout().data['id']
+        Reservation.objects.update(expires_at = timezone.now())
+
+        with self.captureOnCommitCallbacks(execute = True):
+            call_command('release_expired_reservations', stdout = StringIO())
+
+        self.assertEqual(self.stock(), 3)
+        self.assertEqual(Transaction.objects.get(order = order_id).status, Transaction.STATUES.CANCELLED)
+
+        # A PAYMENT CONFIRMED AFTER EXPIRY TAKES THE STOCK AGAIN
+        self.settle(order_id, Transaction.succeed)
+        self.assertEqual(self.stock(), 1)
+
+    def test_checkout_releases_expired_reservations(self, service, notify):
+        abandoned = self.checkout().data['id']
+        Reservation.objects.update(expires_at = timezone.now())
+
+        self.assertEqual(self.checkout(3).status_code, 201)
+        self.assertEqual(self.stock(), 0)
+        self.assertEqual(
+            Reservation.objects.get(order = abandoned, product = self.product).status,
+            Reservation.STATUES.RELEASED
+        )
+
+
+####
+##      ORDER EXPORT TEST CASE
+#####
+class OrderExportTestCase(TestCase):
+    ''' Ensure exports stream flat rows, follow filters and resume after a row. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'exporter', 'exporter@fakestore.com', 'P@ssw0rd',
+            phone_number = '+22890000009'
+        )
+        cls.user = User.objects.create_user(
+            'exported', 'P@ssw0rd',
+            email = 'exported@fakestore.com',
+            phone_number = '+22890000010'
+        )
+        category = Category.objects.create(name = 'Export category')
+        product = Product.objects.create(name = 'Export product', brand = 'Acme', category = category, price = 100)
+        cls.orders = []
+        for quantity in (1, 2, 3):
+            order = Order.objects.create(client = cls.user)
+            Article.objects.create(order = order, product = product, selling_price = 100, quantity = quantity)
+            cls.orders.append(order)
+        Order.objects.filter(pk = cls.orders[2].pk).update(status = Order.OrderStatus.COMPLETED)
+        Transaction.objects.create(
+            user = cls.user, order = cls.orders[0], amount = 100,
+            status = Transaction.STATUES.SUCCESSFUL
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get('/orders/export', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_rows(self):
+        lines = self.export().splitlines()
+
+        self.assertEqual(
+            lines[0],
+            'id,code,created,status,total,items,payment_status,client,client_username,client_email'
+        )
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(order.pk) for order in self.orders])
+        first = lines[1].split(',')
+        self.assertEqual(first[5:7], ['1', Transaction.STATUES.SUCCESSFUL])
+        self.assertEqual(first[8:], ['exported', 'exported@fakestore.com'])
+
+    def test_filters_and_ndjson(self):
+        rows = [json.loads(line) for line in self.export(output = 'ndjson', status = Order.OrderStatus.COMPLETED).splitlines()]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], str(self.orders[2].pk))
+        self.assertEqual(rows[0]['items'], 3)
+        self.assertIsNone(rows[0]['payment_status'])
+
+    def test_resume_after_last_row(self):
+        lines = self.export(resume = str(self.orders[0].pk)).splitlines()
+
+        # NO HEADER, ONLY THE NEXT ROWS
+        self.assertEqual([line.split(',')[0] for line in lines], [str(order.pk) for order in self.orders[1:]])
+
+        response = self.client.get('/orders/export', {'resume': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/orders/export').status_code, 403)
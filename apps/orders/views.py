@@ -1,35 +1,93 @@
+from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import (
     IsAuthenticated,IsAdminUser,AllowAny
 )
 
+from apps.billings.models import Transaction
+from apps.orders.exports import OrderExport
+from apps.orders.models import Article
+from apps.orders.search import OrderSearchFilter
 from apps.orders.serializers import (
     OrderSerializer,
 )
+from apps.products.models import Product
+from core.export import ExportMixin
+from core.fieldsets import FieldSet
+from core.idempotency import IdempotentCreateMixin
 
 
 ####
 ##      BILLS VIEWSET
 #####
-class OrderViewSet(ModelViewSet):
+class OrderViewSet(IdempotentCreateMixin, ExportMixin, ModelViewSet):
     ''' ViewSet class for Products Model. '''
     
     queryset = OrderSerializer.Meta.model.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
-    filterset_fields = [
-        'client', 'status',# 'is_paid','is_validated'
-    ]
-    search_fields = [
-        'client__first_name','client__last_name',
-        'client__address','articles__product__name',
-        'articles__product__category__name',
-        'articles__product__category__description',
-        'articles__product__description',
-        'client__id','client__code'
+    filter_backends = [
+        DjangoFilterBackend, OrderSearchFilter, OrderingFilter
     ]
+    filterset_fields = {
+        'client': ['exact'],
+        'status': ['exact'],# 'is_paid','is_validated'
+        'total': ['exact', 'gte', 'lte'],
+        'created': ['gte', 'lte', 'date__gte', 'date__lte'],
+    }
+    ordering_fields = ['total', 'created']
     lookup_field = 'id'
+    export_class = OrderExport
+
+    def get_queryset(self):
+        ''' Return orders with what OrderSerializer renders for the request preloaded. '''
+
+        queryset = super().get_queryset()
+        fieldset = FieldSet.from_request(self.request)
+
+        if fieldset.expands('client'):
+            queryset = queryset.select_related('client')
+
+        if fieldset.expands('articles'):
+            articles = fieldset.nested('articles')
+            lookups = [Prefetch('articles', queryset = Article.objects.all())]
+            if articles.expands_explicitly('product'):
+                lookups.append(Prefetch(
+                    'articles__product',
+                    queryset = Product.objects.for_representation(
+                        self.request.user, articles.nested('product')
+                    )
+                ))
+            queryset = queryset.prefetch_related(*lookups)
+
+        if fieldset.expands('transaction') or fieldset.includes('payment_status'):
+            queryset = queryset.prefetch_related(
+                Prefetch('transactions', queryset = Transaction.objects.select_related('user'))
+            )
+
+        return queryset
     
+    def create(self, request, *args, **kwargs):
+        ''' Create an order once per Idempotency-Key. '''
+
+        return self.dispatch_idempotent(request, self.create_order, *args, **kwargs)
+
+    def create_order(self, request, *args, **kwargs):
+        ''' Create an order, then render it with the same preloading as reads. '''
+
+        serializer = self.get_serializer(data = request.data)
+        serializer.is_valid(raise_exception = True)
+        self.perform_create(serializer)
+
+        # A CONSTANT NUMBER OF QUERIES WHATEVER THE CART SIZE
+        order = self.get_queryset().get(pk = serializer.instance.pk)
+        data = self.get_serializer(order).data
+        return Response(data, status = status.HTTP_201_CREATED, headers = self.get_success_headers(data))
+
     def get_permissions(self):
         ''' Define a way to use permissions based on requesting user. '''
         
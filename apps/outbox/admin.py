@@ -0,0 +1,45 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from apps.outbox.models import OutboxEvent
+
+# Register your models here.
+
+LIMIT_PER_PAGE = 100
+
+
+####
+##      OUTBOX EVENTS ADMIN SITE
+#####
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    ''' Admin site configs for Outbox Events Model. '''
+
+    list_display = [
+        'id', 'event_type', 'aggregate_type', 'aggregate_id',
+        'status', 'attempts', 'created', 'processed_at'
+    ]
+    list_filter = [
+        'status', 'event_type', 'aggregate_type',
+    ]
+    search_fields = [
+        'aggregate_id', 'event_type'
+    ]
+    readonly_fields = [
+        'aggregate_type', 'aggregate_id', 'event_type', 'payload', 'created',
+        'processed_at', 'attempts', 'claim', 'last_error'
+    ]
+    list_per_page = LIMIT_PER_PAGE
+    actions = ['retry_events']
+
+    @admin.action(description = 'Retry selected failed events')
+    def retry_events(self, request, queryset):
+        ''' Give failed (dead-lettered) events a new round of attempts. '''
+
+        count = queryset.filter(status = OutboxEvent.STATUES.FAILED).update(
+            status = OutboxEvent.STATUES.PENDING,
+            attempts = 0,
+            available_at = timezone.now(),
+            claim = '',
+        )
+        self.message_user(request, f'{count} event(s) will be retried.')
@@ -0,0 +1,69 @@
+"""
+Domain events of Fake Shop API.
+
+`publish` records an event in the outbox table, in the database transaction
+that changed its aggregate: the event exists if and only if the change was
+committed. Handlers are registered against event types with `@handler` and
+run later by the relay (apps.outbox.relay), never inline.
+
+Delivery is at-least-once: handlers must be idempotent.
+
+Event types whose handlers call slow external services (payment providers)
+are registered with a `queue`: the in-process relay delivers them from a
+separate thread pool, so they never hold the threads relaying other events.
+"""
+
+from django.db import transaction
+
+from apps.outbox.models import OutboxEvent
+
+# EVENT TYPE -> HANDLERS, IN REGISTRATION ORDER
+HANDLERS = {}
+
+# EVENT TYPE -> RELAY QUEUE, FOR EVENT TYPES NOT RELAYED BY THE DEFAULT QUEUE
+QUEUES = {}
+DEFAULT_QUEUE = 'default'
+
+
+def handler(event_type, queue=None):
+    '''
+    Register the decorated function as a handler of `event_type` events.
+    Every handler of an event type runs on the queue it was registered with.
+    '''
+
+    def register(func):
+        HANDLERS.setdefault(event_type, []).append(func)
+        if queue is not None:
+            QUEUES[event_type] = queue
+        return func
+    return register
+
+
+def get_queue(event_type):
+    ''' Return the relay queue of `event_type` events. '''
+
+    return QUEUES.get(event_type, DEFAULT_QUEUE)
+
+
+def publish(event_type, instance, payload=None):
+    ''' Record an `event_type` event about instance in the current transaction. '''
+
+    return publish_event(event_type, instance._meta.label_lower, instance.pk, payload)
+
+
+def publish_event(event_type, aggregate_type, aggregate_id, payload=None):
+    ''' Record an `event_type` event about any aggregate, e.g. one received from outside. '''
+
+    from apps.outbox.relay import kick
+
+    event = OutboxEvent.objects.create(
+        aggregate_type = aggregate_type,
+        aggregate_id = str(aggregate_id),
+        event_type = event_type,
+        payload = payload or {},
+    )
+
+    # DELIVER SOON AFTER COMMIT, relay_outbox CATCHES UP ON ANYTHING MISSED
+    queue = get_queue(event_type)
+    transaction.on_commit(lambda: kick(queue))
+    return event
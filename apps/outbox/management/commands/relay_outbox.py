@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.outbox import relay
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to relay outbox events to their handlers"""
+
+    help = "Drain the outbox in batches, forever or once, and report relay lag and throughput"
+
+    def add_arguments(self, parser):
+        """Add relay_outbox Comand arguments"""
+
+        # BATCH SIZE
+        parser.add_argument(
+            '-b', '--batch-size', type = int, default = None,
+            help = 'Number of events claimed per batch'
+        )
+
+        # POLL INTERVAL
+        parser.add_argument(
+            '-i', '--interval', type = float, default = 1.0,
+            help = 'Seconds to wait when the outbox is empty'
+        )
+
+        # ONCE
+        parser.add_argument(
+            '--once', action = 'store_true',
+            help = 'Drain the outbox once and exit'
+        )
+
+        # METRICS
+        parser.add_argument(
+            '--metrics', action = 'store_true',
+            help = 'Print relay lag and throughput, then exit'
+        )
+
+        # PURGE
+        parser.add_argument(
+            '--purge-days', type = int, default = None,
+            help = 'Delete events processed more than this many days ago, then exit'
+        )
+
+    def handle(self, *args, **options):
+        """Handle relay_outbox command"""
+
+        if options.get('metrics'):
+            metrics = relay.get_metrics()
+            self.stdout.write(
+                f"pending {metrics['pending']}, failed {metrics['failed']}, "
+                f"lag {metrics['lag_seconds']:.1f}s, "
+                f"{metrics['processed']} processed in the last minute ({metrics['throughput']:.1f}/s)"
+            )
+            return
+
+        if options.get('purge_days') is not None:
+            deleted = relay.purge(options.get('purge_days'))
+            self.stdout.write(self.style.SUCCESS(f'Purged {deleted} processed events'))
+            return
+
+        worker = relay.Relay(batch_size = options.get('batch_size'))
+        while True:
+            stats = worker.drain()
+            if stats.claimed:
+                self.stdout.write(stats.report())
+            if options.get('once'):
+                break
+            if not stats.claimed:
+                time.sleep(options.get('interval'))
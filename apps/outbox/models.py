@@ -0,0 +1,63 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# Create your models here.
+
+####
+##      OUTBOX EVENT MODEL
+#####
+class OutboxEvent(models.Model):
+    '''
+    Domain event recorded in the transaction that changed its aggregate,
+    delivered to handlers by apps.outbox.relay once committed.
+
+    Uses an auto-increment id (not TimeStampedUUIDModel): ids give the
+    delivery order of the events of an aggregate.
+    '''
+
+    # STATUES CHOICES
+    class STATUES(models.TextChoices):
+        ''' Delivery statues. '''
+
+        PENDING = 'pending', _('PENDING')
+        PROCESSED = 'processed', _('PROCESSED')
+        FAILED = 'failed', _('FAILED')
+
+    aggregate_type = models.CharField(max_length = 100)
+    aggregate_id = models.CharField(max_length = 100)
+    event_type = models.CharField(max_length = 100)
+    payload = models.JSONField(default = dict, blank = True)
+    status = models.CharField(
+        max_length = 20,
+        choices = STATUES.choices,
+        default = STATUES.PENDING
+    )
+
+    # DELIVERY
+    created = models.DateTimeField(default = timezone.now)
+    available_at = models.DateTimeField(default = timezone.now)
+    processed_at = models.DateTimeField(null = True, blank = True)
+    attempts = models.PositiveIntegerField(default = 0)
+    claim = models.CharField(max_length = 32, blank = True, default = '')
+    last_error = models.TextField(blank = True, default = '')
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Outbox Event Model. '''
+
+        verbose_name = _('Outbox Event')
+        verbose_name_plural = _('Outbox Events')
+        ordering = ['id']
+        indexes = [
+            # RELAY: OLDEST PENDING EVENTS FIRST
+            models.Index(fields = ['status', 'id']),
+            # RELAY: HEAD OF EACH AGGREGATE
+            models.Index(fields = ['aggregate_type', 'aggregate_id', 'status', 'id']),
+            models.Index(fields = ['claim']),
+            # THROUGHPUT METRICS AND PURGE
+            models.Index(fields = ['processed_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.aggregate_type}:{self.aggregate_id}'
@@ -0,0 +1,292 @@
+"""
+Outbox relay.
+
+Pending events are claimed in batches, handed to their handlers, then marked
+processed; failures are retried with an exponential backoff and marked
+failed after `MAX_ATTEMPTS`. Only the oldest pending event of each
+aggregate can be claimed, so the events of an aggregate are delivered in
+order even with several relays running. Claims are leases: events of a relay
+that died are claimed again once `LEASE` seconds have passed.
+
+Committed events are relayed in-process by a small thread pool right after
+commit (`kick`), one pool per queue (see apps.outbox.events) sized by
+`QUEUES[<queue>]['WORKERS']`; `manage.py relay_outbox` is the durable worker
+draining whatever is left, of every queue.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F, Min, OuterRef, Q
+from django.utils import timezone
+
+from apps.outbox.events import DEFAULT_QUEUE, HANDLERS, QUEUES
+from apps.outbox.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 4,
+    'BATCH_SIZE': 100,
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 10,
+    'RETRY_DELAY': 5,
+    'MAX_RETRY_DELAY': 3600,
+    # QUEUE NAME -> {'WORKERS': ...}, QUEUES WITHOUT SETTINGS USE WORKERS
+    'QUEUES': {},
+}
+
+_lock = threading.Lock()
+_pools = {}
+_queued = {}
+_local = threading.local()
+
+
+def get_config():
+    ''' Return OUTBOX settings merged with defaults. '''
+
+    return {**DEFAULTS, **getattr(settings, 'OUTBOX', {})}
+
+
+def get_workers(queue):
+    ''' Return the number of in-process relay threads of queue. '''
+
+    config = get_config()
+    return config['QUEUES'].get(queue, {}).get('WORKERS', config['WORKERS'])
+
+
+####
+##      RELAY STATS
+#####
+class RelayStats:
+    ''' Counters of one drain, reported by relay_outbox. '''
+
+    def __init__(self):
+        self.claimed = 0
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.max_lag = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        ''' Return a human readable throughput summary. '''
+
+        elapsed = max(self.elapsed, 1e-6)
+        return (
+            f'{self.processed} processed ({self.processed / elapsed:.1f}/s), '
+            f'{self.retried} retried, {self.failed} failed, '
+            f'max lag {self.max_lag:.2f}s in {elapsed:.2f}s'
+        )
+
+
+####
+##      RELAY
+#####
+class Relay:
+    ''' Deliver pending outbox events to their handlers. '''
+
+    def __init__(self, batch_size=None, queue=None):
+        config = get_config()
+        # None: EVENTS OF EVERY QUEUE
+        self.queue = queue
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.lease = timedelta(seconds = config['LEASE'])
+        self.max_attempts = config['MAX_ATTEMPTS']
+        self.retry_delay = config['RETRY_DELAY']
+        self.max_retry_delay = config['MAX_RETRY_DELAY']
+
+    def get_queue_filter(self):
+        ''' Return the condition selecting the events of the relayed queue. '''
+
+        if self.queue is None:
+            return Q()
+        if self.queue == DEFAULT_QUEUE:
+            return ~Q(event_type__in = list(QUEUES))
+        return Q(event_type__in = [event_type for event_type, queue in QUEUES.items() if queue == self.queue])
+
+    def claim(self):
+        '''
+        Lease the next batch of deliverable events, oldest first. Events wait
+        for older pending events of their aggregate, whatever their queue.
+        '''
+
+        now = timezone.now()
+        older = OutboxEvent.objects.filter(
+            aggregate_type = OuterRef('aggregate_type'),
+            aggregate_id = OuterRef('aggregate_id'),
+            status = OutboxEvent.STATUES.PENDING,
+            id__lt = OuterRef('id'),
+        )
+        candidates = list(
+            OutboxEvent.objects.filter(
+                self.get_queue_filter(),
+                status = OutboxEvent.STATUES.PENDING, available_at__lte = now
+            ).exclude(Exists(older)).order_by('id').values_list('id', flat = True)[:self.batch_size]
+        )
+        if not candidates:
+            return []
+
+        # CONDITIONAL UPDATE: A CONCURRENT RELAY CANNOT CLAIM THE SAME EVENTS
+        token = uuid.uuid4().hex
+        OutboxEvent.objects.filter(
+            pk__in = candidates,
+            status = OutboxEvent.STATUES.PENDING,
+            available_at__lte = now,
+        ).update(
+            claim = token,
+            available_at = now + self.lease,
+            attempts = F('attempts') + 1,
+        )
+        return list(OutboxEvent.objects.filter(claim = token).order_by('id'))
+
+    def deliver(self, event):
+        ''' Run every handler of event, each in its own transaction. '''
+
+        for func in HANDLERS.get(event.event_type, []):
+            with transaction.atomic():
+                func(event)
+
+    def retry_at(self, attempts):
+        ''' Return when an event failing for the `attempts` time is tried again. '''
+
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+        return timezone.now() + timedelta(seconds = delay)
+
+    def run_batch(self, stats):
+        ''' Claim and deliver one batch, return the number of claimed events. '''
+
+        events = self.claim()
+        stats.claimed += len(events)
+
+        processed = []
+        for event in events:
+            try:
+                self.deliver(event)
+            except Exception as e:
+                failed = event.attempts >= self.max_attempts
+                OutboxEvent.objects.filter(pk = event.pk, claim = event.claim).update(
+                    status = OutboxEvent.STATUES.FAILED if failed else OutboxEvent.STATUES.PENDING,
+                    available_at = self.retry_at(event.attempts),
+                    claim = '',
+                    last_error = f'{e.__class__.__name__}: {e}',
+                )
+                if failed:
+                    stats.failed += 1
+                    logger.error(f'Outbox event {event.pk} ({event}) failed {event.attempts} times: {e}')
+                else:
+                    stats.retried += 1
+                    logger.warning(f'Outbox event {event.pk} ({event}) will be retried: {e}')
+                continue
+
+            processed.append(event.pk)
+            stats.max_lag = max(stats.max_lag, (timezone.now() - event.created).total_seconds())
+
+        if processed:
+            stats.processed += OutboxEvent.objects.filter(pk__in = processed).update(
+                status = OutboxEvent.STATUES.PROCESSED,
+                processed_at = timezone.now(),
+                claim = '',
+            )
+        return len(events)
+
+    def drain(self, max_batches=None):
+        ''' Deliver batches until nothing is deliverable, return RelayStats. '''
+
+        stats, batches = RelayStats(), 0
+        _local.draining = True
+        try:
+            while max_batches is None or batches < max_batches:
+                batches += 1
+                if not self.run_batch(stats):
+                    break
+        finally:
+            _local.draining = False
+        return stats
+
+
+## IN-PROCESS RELAY
+def get_pool(queue=DEFAULT_QUEUE):
+    ''' Return the thread pool relaying events of queue committed by this process. '''
+
+    with _lock:
+        if queue not in _pools:
+            _pools[queue] = ThreadPoolExecutor(
+                max_workers = get_workers(queue), thread_name_prefix = f'outbox-relay-{queue}'
+            )
+        return _pools[queue]
+
+
+def _drain_job(queue):
+    ''' Background job: drain the events of queue. '''
+
+    with _lock:
+        _queued[queue] -= 1
+    try:
+        stats = Relay(queue = queue).drain()
+        if stats.claimed:
+            logger.info(f'Outbox relay ({queue}): {stats.report()}')
+        if stats.processed:
+            # EVENTS OF OTHER QUEUES MAY HAVE WAITED FOR THESE (ORDER PER AGGREGATE)
+            for other in {DEFAULT_QUEUE, *QUEUES.values()} - {queue}:
+                kick(other)
+    except Exception as e:
+        logger.error(f'Outbox relay job failed: {str(e)}')
+    finally:
+        close_old_connections()
+
+
+def kick(queue=DEFAULT_QUEUE):
+    ''' Relay newly committed events of queue, without waiting for relay_outbox. '''
+
+    if not get_config()['ASYNC']:
+        # EVENTS PUBLISHED BY HANDLERS ARE PICKED UP BY THE RUNNING DRAIN
+        if not getattr(_local, 'draining', False):
+            Relay().drain()
+        return
+
+    # A QUEUED JOB THAT HAS NOT STARTED YET WILL SEE THE NEW EVENTS
+    with _lock:
+        if _queued.get(queue, 0) >= get_workers(queue):
+            return
+        _queued[queue] = _queued.get(queue, 0) + 1
+    get_pool(queue).submit(_drain_job, queue)
+
+
+## METRICS
+def get_metrics(window=60):
+    ''' Return relay lag and throughput over the last `window` seconds. '''
+
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(status = OutboxEvent.STATUES.PENDING)
+    oldest = pending.aggregate(oldest = Min('created'))['oldest']
+    processed = OutboxEvent.objects.filter(processed_at__gte = now - timedelta(seconds = window)).count()
+
+    return {
+        'pending': pending.count(),
+        'failed': OutboxEvent.objects.filter(status = OutboxEvent.STATUES.FAILED).count(),
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+        'processed': processed,
+        'throughput': processed / window,
+    }
+
+
+def purge(days):
+    ''' Delete events processed more than `days` days ago, return how many. '''
+
+    deleted, _ = OutboxEvent.objects.filter(
+        status = OutboxEvent.STATUES.PROCESSED,
+        processed_at__lt = timezone.now() - timedelta(days = days),
+    ).delete()
+    return deleted
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.outbox import events, relay
+from apps.outbox.events import publish
+from apps.outbox.models import OutboxEvent
+from apps.outbox.relay import Relay, get_metrics
+
+# Create your tests here.
+
+
+####
+##      OUTBOX RELAY TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False, 'BATCH_SIZE': 10, 'MAX_ATTEMPTS': 2})
+class OutboxRelayTestCase(TestCase):
+    ''' Ensure events are delivered after commit, in order per aggregate, at least once. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                f'outbox{i}', 'P@ssw0rd',
+                email = f'outbox{i}@fakestore.com',
+                phone_number = f'+2289000010{i}'
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.delivered = []
+        self.failures = {}
+
+        def record(event):
+            if self.failures.get(event.pk):
+                self.failures[event.pk] -= 1
+                raise RuntimeError('handler down')
+            self.delivered.append((event.aggregate_id, event.payload['n']))
+
+        handlers = patch.dict(events.HANDLERS, {'test.happened': [record]})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def publish(self, user, n):
+        return publish('test.happened', user, {'n': n})
+
+    def test_delivered_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.publish(self.users[0], 1)
+        self.assertEqual(self.delivered, [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.delivered, [(str(self.users[0].pk), 1)])
+        self.assertEqual(OutboxEvent.objects.get().status, OutboxEvent.STATUES.PROCESSED)
+
+    def test_failures_are_retried_in_aggregate_order(self):
+        first = self.publish(self.users[0], 1)
+        self.publish(self.users[0], 2)
+        self.publish(self.users[1], 1)
+        self.failures[first.pk] = 1
+
+        Relay().drain()
+        # THE FAILED EVENT BLOCKS ITS AGGREGATE ONLY
+        self.assertEqual(self.delivered, [(str(self.users[1].pk), 1)])
+
+        OutboxEvent.objects.filter(pk = first.pk).update(available_at = timezone.now())
+        Relay().drain()
+        self.assertEqual(self.delivered[1:], [(str(self.users[0].pk), 1), (str(self.users[0].pk), 2)])
+
+    def test_failed_after_max_attempts(self):
+        event = self.publish(self.users[0], 1)
+        self.failures[event.pk] = 5
+
+        for _ in range(2):
+            Relay().drain()
+            OutboxEvent.objects.filter(pk = event.pk).update(available_at = timezone.now())
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.STATUES.FAILED, 2))
+        self.assertIn('handler down', event.last_error)
+
+    def test_expired_claims_are_delivered_again(self):
+        self.publish(self.users[0], 1)
+        self.assertEqual(len(Relay().claim()), 1)
+        # CLAIMED BY A RELAY THAT DIED
+        self.assertEqual(Relay().claim(), [])
+
+        OutboxEvent.objects.update(available_at = timezone.now() - timedelta(seconds = 1))
+        Relay().drain()
+        self.assertEqual(len(self.delivered), 1)
+
+    def test_queues_keep_aggregate_order(self):
+        slow = patch.dict(events.HANDLERS, {'test.slow': [lambda event: self.delivered.append(('slow', 1))]})
+        with slow, patch.dict(events.QUEUES, {'test.slow': 'provider'}):
+            publish('test.slow', self.users[0], {})
+            self.publish(self.users[0], 1)
+            self.publish(self.users[1], 1)
+
+            # THE DEFAULT QUEUE SKIPS SLOW EVENTS, AND EVENTS WAITING FOR THEM
+            Relay(queue = events.DEFAULT_QUEUE).drain()
+            self.assertEqual(self.delivered, [(str(self.users[1].pk), 1)])
+
+            Relay(queue = 'provider').drain()
+            Relay(queue = events.DEFAULT_QUEUE).drain()
+            self.assertEqual(self.delivered[1:], [('slow', 1), (str(self.users[0].pk), 1)])
+
+    @override_settings(OUTBOX = {'ASYNC': True, 'WORKERS': 4, 'QUEUES': {'provider': {'WORKERS': 1}}})
+    def test_queues_have_their_own_pools(self):
+        with patch.dict(relay._queued, clear = True), patch.object(relay, 'get_pool') as get_pool:
+            relay.kick('provider')
+            relay.kick('provider')
+            relay.kick()
+
+        self.assertEqual(
+            [call.args for call in get_pool.call_args_list],
+            [('provider',), (events.DEFAULT_QUEUE,)]
+        )
+
+    def test_metrics(self):
+        self.publish(self.users[0], 1)
+        OutboxEvent.objects.update(created = timezone.now() - timedelta(seconds = 30))
+        self.assertGreaterEqual(get_metrics()['lag_seconds'], 30)
+
+        out = StringIO()
+        call_command('relay_outbox', once = True, stdout = out)
+        self.assertIn('1 processed', out.getvalue())
+
+        metrics = get_metrics()
+        self.assertEqual((metrics['pending'], metrics['processed'], metrics['lag_seconds']), (0, 1, 0.0))
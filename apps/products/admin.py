@@ -27,7 +27,7 @@ class ProductAdmin(admin.ModelAdmin):
     
     list_display = [
         'code','name','category',
-        'price','tva','created'
+        'price','tva','stock','likes_count','created'
     ]
     list_filter = [
         'category'
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.products"
+
+    def ready(self) -> None:
+        ''' Load the Products App Signals. '''
+        from django.db.models.signals import post_migrate
+        from apps.products import signals
+
+        post_migrate.connect(signals.create_search_index, sender=self)
+        return super().ready()
@@ -0,0 +1,35 @@
+from django_filters import rest_framework as filters
+
+from apps.categories.models import Category
+from apps.products.models import Product
+from apps.products.search import ProductSearchIndex
+from core.search import SearchIndexFilter
+
+
+####
+##      PRODUCT FILTERSET
+#####
+class ProductFilter(filters.FilterSet):
+    ''' Filters of the products listing. '''
+
+    category_tree = filters.UUIDFilter(method = 'filter_category_tree')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'brand', 'category_tree']
+
+    def filter_category_tree(self, queryset, name, value):
+        ''' Products of a category or any of its descendants (path range, no recursion). '''
+
+        return queryset.filter(
+            category__in = Category.objects.subtree(value).values('pk')
+        )
+
+
+####
+##      PRODUCT SEARCH FILTER
+#####
+class ProductSearchFilter(SearchIndexFilter):
+    ''' Full-text search on products through the search index, best matches first. '''
+
+    index_class = ProductSearchIndex
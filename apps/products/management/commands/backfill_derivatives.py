@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from apps.categories.models import Category
+from apps.products.models import ProductMedia
+from apps.utils import images
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to render missing image derivatives"""
+
+    help = "Render thumb/card/full derivatives of existing ProductMedia and Category images, in parallel"
+
+    def add_arguments(self, parser):
+        """Add backfill_derivatives Comand arguments"""
+
+        # WORKERS
+        parser.add_argument(
+            '-w', '--workers', type = int, default = multiprocessing.cpu_count(),
+            help = 'Number of rendering processes'
+        )
+
+        # FORCE
+        parser.add_argument(
+            '-f', '--force', action = 'store_true',
+            help = 'Render again images that already have derivatives'
+        )
+
+    def handle(self, *args, **options):
+        """Handle backfill_derivatives command"""
+
+        workers = options.get('workers')
+        force = options.get('force')
+
+        def job(instance):
+            # THREADS OVERLAP STORAGE I/O WITH RENDERING, RESULTS ARE SAVED FROM THE MAIN THREAD
+            return instance, images.build(instance, executor = pool, force = force)
+
+        processed = failed = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers = workers, mp_context = multiprocessing.get_context('spawn')
+        ) as pool, ThreadPoolExecutor(max_workers = workers * 2) as threads:
+            for model in (ProductMedia, Category):
+                pending = set()
+                for instance in model.objects.order_by('pk').iterator(chunk_size = 500):
+                    if not images.stale_fields(instance, force = force):
+                        continue
+
+                    # KEEP A BOUNDED WINDOW OF IMAGES IN MEMORY
+                    if len(pending) >= workers * 4:
+                        done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                        processed, failed = self.collect(done, processed, failed)
+                    pending.add(threads.submit(job, instance))
+
+                processed, failed = self.collect(wait(pending).done, processed, failed)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rendered derivatives of {processed} objects in {elapsed:.1f}s '
+                f'({processed / elapsed if elapsed else 0:.1f}/s), {failed} failed'
+            )
+        )
+
+    def collect(self, futures, processed, failed):
+        """Record finished jobs and report failures"""
+
+        for future in futures:
+            try:
+                instance, derivatives = future.result()
+                if derivatives is not None:
+                    images.record(instance, derivatives)
+                processed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Failed: {str(e)}')
+        return processed, failed
@@ -0,0 +1,76 @@
+from apps.categories.models import Category
+from apps.products.filters import ProductFilter
+from apps.products.models import Product
+from apps.utils.benchmarks import BenchmarkCommand
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to compare flat and subtree category browsing"""
+
+    help = "Benchmark first listing pages filtered on a leaf category and on category subtrees"
+
+    # NODES PER LEVEL
+    LEVELS = (4, 16, 64, 256)
+
+    def add_arguments(self, parser):
+        """Add bench_category_browsing Comand arguments"""
+
+        super().add_arguments(parser)
+        parser.add_argument(
+            '-p', '--products', type = int, default = 100000,
+            help = 'Number of products spread over leaf categories'
+        )
+        parser.add_argument(
+            '-l', '--limit', type = int, default = 20,
+            help = 'Page size'
+        )
+
+    def seed(self, count):
+        """Create the category tree and spread products over its leaves"""
+
+        levels, parents = [], [None]
+        for size in self.LEVELS:
+            parents = [
+                Category.objects.create(
+                    name = f'Browse {len(levels)}-{i}', parent = parents[i % len(parents)]
+                )
+                for i in range(size)
+            ]
+            levels.append(parents)
+
+        leaves = levels[-1]
+        for start in range(0, count, 5000):
+            Product.objects.bulk_create([
+                Product(
+                    code = f'PRD-BROWSE-{i}', name = f'product {i}', brand = f'brand{i % 50}',
+                    category = leaves[i % len(leaves)], price = i % 1000,
+                )
+                for i in range(start, min(start + 5000, count))
+            ])
+        return levels
+
+    def run(self, **options):
+        """Time first pages and counts for each filter"""
+
+        limit = options.get('limit')
+        self.stdout.write(f'Seeding {options.get("products")} products...')
+        levels = self.seed(options.get('products'))
+
+        def page(params):
+            return lambda: list(
+                ProductFilter(params, Product.objects.all()).qs.order_by('created', 'id')[:limit]
+            )
+
+        def count(params):
+            return lambda: ProductFilter(params, Product.objects.all()).qs.count()
+
+        filters = [('category=<leaf>', {'category': levels[-1][0].pk})] + [
+            (f'category_tree=<depth {depth} node>', {'category_tree': nodes[0].pk})
+            for depth, nodes in enumerate(levels)
+        ]
+        for label, params in filters:
+            self.measure(f'{label:<30} first page', page(params))
+        for label, params in filters:
+            self.measure(f'{label:<30} count', count(params))
@@ -0,0 +1,51 @@
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.products.models import Product
+from apps.utils.benchmarks import BenchmarkCommand, seed_products
+from core.pagination import KeysetPagination, StandardPagination
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """Django command to compare limit/offset and keyset pages latency"""
+
+    help = "Benchmark first and deep pages with limit/offset and cursor pagination"
+
+    def add_arguments(self, parser):
+        """Add bench_pagination Comand arguments"""
+
+        super().add_arguments(parser)
+        parser.add_argument(
+            '-l', '--limit', type = int, default = 10,
+            help = 'Page size'
+        )
+        parser.add_argument(
+            '-p', '--page', type = int, default = 10000,
+            help = 'Deep page number to measure'
+        )
+
+    def run(self, **options):
+        """Seed enough products to reach the deep page and time both paginations"""
+
+        limit, page = options.get('limit'), options.get('page')
+        count = limit * page
+        self.stdout.write(f'Seeding {count} products...')
+        seed_products(count)
+
+        factory = APIRequestFactory()
+        queryset = Product.objects.all()
+
+        # CURSOR OF THE LAST ROW BEFORE THE DEEP PAGE, AS A CLIENT FOLLOWING "next" WOULD HAVE
+        before = queryset.order_by('created', 'pk')[(page - 1) * limit - 1]
+        deep_cursor = KeysetPagination().encode_cursor(before)
+
+        def paginate(params):
+            request = Request(factory.get('/products/', params))
+            return lambda: StandardPagination().paginate_queryset(queryset, request)
+
+        self.measure('limit/offset  page 1', paginate({'limit': limit}))
+        self.measure(f'limit/offset  page {page}', paginate({'limit': limit, 'offset': (page - 1) * limit}))
+        self.measure('cursor        page 1', paginate({'limit': limit, 'cursor': ''}))
+        self.measure(f'cursor        page {page}', paginate({'limit': limit, 'cursor': deep_cursor}))
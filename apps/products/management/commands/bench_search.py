@@ -0,0 +1,63 @@
+from django.db.models import Q
+
+from apps.products.models import Product
+from apps.products.search import get_search_backend
+from apps.utils.benchmarks import BenchmarkCommand, seed_products
+
+####
+##      COMMAND CLASS
+#####
+class Command(BenchmarkCommand):
+    """
+    Django command to compare LIKE scans with the search index.
+
+    Each measure mimics a paginated page: a COUNT then the first 100 rows.
+    """
+
+    help = "Benchmark icontains search against the full-text index"
+
+    QUERIES = ('phone', 'lap', 'coffee shoes', 'brand7', 'nothingmatches')
+
+    def add_arguments(self, parser):
+        """Add bench_search Comand arguments"""
+
+        super().add_arguments(parser)
+        parser.add_argument(
+            '-p', '--products', type = int, default = 100000,
+            help = 'Number of synthetic products'
+        )
+
+    def run(self, **options):
+        """Seed the catalog, index it and time both search strategies"""
+
+        count = options.get('products')
+        self.stdout.write(f'Seeding {count} products...')
+        seed_products(count)
+
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(f'Backend: {backend.__class__.__name__}')
+
+        fields = (
+            'name', 'description', 'brand', 'category__name',
+            'category__description', 'category__code',
+        )
+        for query in self.QUERIES:
+            def like_scan():
+                # SAME LOOKUPS AS DRF's SearchFilter
+                queryset = Product.objects.all()
+                for term in query.split():
+                    condition = Q()
+                    for field in fields:
+                        condition |= Q(**{f'{field}__icontains': term})
+                    queryset = queryset.filter(condition)
+                queryset.count()
+                list(queryset[:100])
+
+            def indexed():
+                queryset = backend.search(Product.objects.all(), query)
+                queryset.count()
+                list(queryset[:100])
+
+            self.measure(f'LIKE    "{query}"', like_scan)
+            self.measure(f'INDEX   "{query}"', indexed)
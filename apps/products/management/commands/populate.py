@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 
-from apps.utils.script import add_products
+from apps.utils.importer import ProductImporter, DEFAULT_SOURCE
 
 ####
 ##      COMMAND CLASS
@@ -19,6 +19,40 @@ class Command(BaseCommand):
             help = 'Nombre de produits à générer'
         )
 
+        # SOURCE FILE
+        parser.add_argument(
+            '-s', '--source', default = DEFAULT_SOURCE,
+            help = 'JSON array of products to import'
+        )
+
+        # CHUNK SIZE
+        parser.add_argument(
+            '-c', '--chunk-size', type = int, default = 100,
+            help = 'Number of products created per transaction'
+        )
+
+        # DOWNLOAD WORKERS
+        parser.add_argument(
+            '-w', '--workers', type = int, default = 8,
+            help = 'Number of concurrent image downloads'
+        )
+
+        # CHECKPOINT
+        parser.add_argument(
+            '--checkpoint', default = None,
+            help = 'Checkpoint file (defaults to <source>.checkpoint)'
+        )
+        parser.add_argument(
+            '--restart', action = 'store_true',
+            help = 'Ignore the checkpoint of an interrupted import'
+        )
+
+        # IMAGES
+        parser.add_argument(
+            '--no-images', action = 'store_true',
+            help = 'Do not download product images'
+        )
+
     def handle(self, *args, **options):
         """Handle Populate command"""
 
@@ -27,16 +61,28 @@ class Command(BaseCommand):
 
         # Generate products
         limit = options.get('limit')
+        importer = ProductImporter(
+            source = options.get('source'),
+            limit = limit,
+            chunk_size = options.get('chunk_size'),
+            workers = options.get('workers'),
+            checkpoint = options.get('checkpoint'),
+            download = not options.get('no_images'),
+        )
+
+        def progress(position, stats):
+            self.stdout.write(f'{position} records processed: {stats.report()}')
+
         try:
-            add_products(limit)
+            stats = importer.run(resume = not options.get('restart'), progress = progress)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'Generated {limit} Products successfully'
+                    f'Generated {stats.products} Products successfully: {stats.report()}'
                 )
             )
         except Exception as e:
              self.stdout.write(
                 self.style.ERROR(
-                    f'Error Generated {limit} Products: {e}'
+                    f'Error Generated {limit} Products: {e} (run again to resume)'
                 )
             )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.models import Product
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to reconcile stored product likes counters"""
+
+    help = "Recompute Product.likes_count from the likes table, in chunks"
+
+    def add_arguments(self, parser):
+        """Add recount_likes Comand arguments"""
+
+        # CHUNK SIZE
+        parser.add_argument(
+            '-c', '--chunk-size', type = int, default = 1000,
+            help = 'Number of products updated per query'
+        )
+
+    def handle(self, *args, **options):
+        """Handle recount_likes command"""
+
+        chunk_size = options.get('chunk_size')
+
+        # KEYSET CHUNKS: ONLY ONE CHUNK OF IDS IS EVER HELD IN MEMORY
+        updated, last = 0, None
+        while True:
+            products = Product.objects.order_by('pk')
+            if last is not None:
+                products = products.filter(pk__gt = last)
+            ids = list(products.values_list('pk', flat = True)[:chunk_size])
+            if not ids:
+                break
+
+            updated += Product.objects.filter(pk__in = ids).refresh_likes_count()
+            last = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Recounted likes of {updated} Products successfully'
+            )
+        )
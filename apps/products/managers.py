@@ -0,0 +1,81 @@
+from django.db import models
+from django.db.models import (
+    Count, OuterRef, Subquery, Exists, Value, BooleanField
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.fieldsets import FULL
+
+####
+##      PRODUCT QUERYSET
+#####
+class ProductQuerySet(models.QuerySet):
+    ''' Custom QuerySet for Product Model. '''
+
+    def refresh_likes_count(self):
+        ''' Recompute the stored likes counter of every product in one UPDATE, touching them. '''
+
+        through = self.model.likes.through
+        likes = through.objects.filter(
+            product = OuterRef('pk')
+        ).values('product').annotate(
+            total = Count('pk')
+        ).values('total')
+
+        # MODIFIED TOO, AS Product.like / unlike: CONDITIONAL GET VALIDATORS MUST CHANGE
+        return self.update(
+            likes_count = Coalesce(Subquery(likes), 0),
+            modified = timezone.now()
+        )
+
+    def touch(self):
+        ''' Bump modified dates so conditional GET validators change. '''
+
+        return self.update(modified = timezone.now())
+
+    def for_representation(self, user=None, fieldset=FULL):
+        '''
+        Preload what ProductSerializer renders for fieldset, and nothing else.
+
+        Categories are read from the category tree, thumbnails of lean
+        representations come from subqueries on the first media instead of
+        prefetching every media.
+        '''
+
+        queryset = self
+
+        # ONLY LOAD REQUESTED COLUMNS
+        if fieldset.fields is not None:
+            columns = {'id', 'created'} | {
+                field.name for field in self.model._meta.concrete_fields
+                if fieldset.includes(field.name)
+            }
+            if fieldset.includes('likes'):
+                columns.add('likes_count')
+            queryset = queryset.only(*columns)
+
+        if fieldset.expands('medias'):
+            queryset = queryset.prefetch_related('medias')
+        elif fieldset.includes_explicitly('thumbnail'):
+            medias = self.model._meta.get_field('medias').related_model.objects.filter(
+                product = OuterRef('pk')
+            ).order_by('created')
+            queryset = queryset.annotate(
+                thumbnail_file = Subquery(medias.values('file')[:1]),
+                thumbnail_derivatives = Subquery(medias.values('derivatives')[:1]),
+            )
+
+        # LIKE STATUS OF THE REQUESTING USER AS A SUBQUERY
+        if fieldset.includes('has_been_liked'):
+            if user is not None and user.is_authenticated:
+                has_been_liked = Exists(
+                    self.model.likes.through.objects.filter(
+                        product = OuterRef('pk'), user = user.id
+                    )
+                )
+            else:
+                has_been_liked = Value(False, output_field = BooleanField())
+            queryset = queryset.annotate(has_been_liked = has_been_liked)
+
+        return queryset
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
@@ -9,6 +11,7 @@ from apps.utils.models import (
 from apps.categories.models import (
     Category,
 )
+from apps.products.managers import ProductQuerySet
 
 # Create your models here.
 
@@ -31,6 +34,14 @@ class Product(TimeStampedUUIDModel):
     price = models.IntegerField(default = 0)
     tva = models.IntegerField(default = 0)
     likes = models.ManyToManyField("accounts.User", related_name='liked_products', blank=True)
+    likes_count = models.PositiveIntegerField(default = 0, editable = False)
+
+    # UNITS LEFT FOR SALE, NOT TRACKED (NEVER OUT OF STOCK) WHEN NULL.
+    # ONLY CHANGED BY CONDITIONAL UPDATES, SEE apps.orders.managers.ReservationQuerySet
+    stock = models.PositiveIntegerField(null = True, blank = True, default = None)
+
+    # SET OBJECT MANAGER CLASS
+    objects = ProductQuerySet.as_manager()
     
     # META CLASS
     class Meta:
@@ -39,6 +50,14 @@ class Product(TimeStampedUUIDModel):
         verbose_name = _('Product')
         verbose_name_plural = _('Products')
         ordering=['created']
+        indexes = [
+            # KEYSET PAGINATION
+            models.Index(fields = ['created', 'id']),
+            # BRAND FILTER AND FACET
+            models.Index(fields = ['brand']),
+            # CATEGORY (AND SUBTREE) BROWSING IN LISTING ORDER
+            models.Index(fields = ['category', 'created', 'id']),
+        ]
     
     def __str__(self):
         return self.name
@@ -47,6 +66,36 @@ class Product(TimeStampedUUIDModel):
         ''' Return a specific ID prefix for Product Model Objects '''
         return 'PRD'
 
+    def like(self, user):
+        ''' Add user to product likes, return False if already liked. '''
+
+        with transaction.atomic():
+            _, created = Product.likes.through.objects.get_or_create(
+                product_id = self.pk, user_id = user.pk
+            )
+            if created:
+                Product.objects.filter(pk = self.pk).update(
+                    likes_count = F('likes_count') + 1,
+                    modified = timezone.now()
+                )
+        self.refresh_from_db(fields = ['likes_count'])
+        return created
+
+    def unlike(self, user):
+        ''' Remove user from product likes, return False if not liked yet. '''
+
+        with transaction.atomic():
+            deleted, _ = Product.likes.through.objects.filter(
+                product_id = self.pk, user_id = user.pk
+            ).delete()
+            if deleted:
+                Product.objects.filter(pk = self.pk).update(
+                    likes_count = F('likes_count') - 1,
+                    modified = timezone.now()
+                )
+        self.refresh_from_db(fields = ['likes_count'])
+        return bool(deleted)
+
 
 ####
 ##      PRODUCTMEDIA MODEL
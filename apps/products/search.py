@@ -0,0 +1,42 @@
+"""
+Full-text search index for Products.
+
+Products are indexed in a side table kept in sync by signals, see
+core.search for the SQLite (FTS5) and PostgreSQL (tsvector) backends.
+"""
+
+from core import search
+
+from apps.products.models import Product
+
+
+####
+##      PRODUCT SEARCH INDEX
+#####
+class ProductSearchIndex(search.SearchIndex):
+    ''' Products with their category, by name, brand, category and description. '''
+
+    model = Product
+    table = 'products_product_search'
+    key = 'product_id'
+    columns = ('name', 'brand', 'category', 'description')
+    weights = (10.0, 5.0, 2.0, 1.0)
+    search_fields = (
+        'name', 'brand', 'description',
+        'category__name', 'category__code', 'category__description',
+    )
+
+    def documents(self, queryset):
+        rows = queryset.order_by().values_list(
+            'pk', 'name', 'brand', 'description',
+            'category__name', 'category__code', 'category__description',
+        )
+        for pk, name, brand, description, cat_name, cat_code, cat_description in rows.iterator(chunk_size=2000):
+            category = ' '.join(filter(None, (cat_name, cat_code, cat_description)))
+            yield pk, name, brand, category, description or ''
+
+
+def get_search_backend(using=None):
+    ''' Return the search backend matching the Product database. '''
+
+    return search.get_search_backend(ProductSearchIndex(), using)
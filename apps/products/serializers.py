@@ -3,6 +3,9 @@ from rest_framework import serializers
 from apps.products.models import (
     Product, ProductMedia,
 )
+from apps.utils.images import srcset
+from apps.categories.tree import get_category_tree
+from core.fieldsets import SparseFieldsMixin
 
 ####
 ##      PRODUCTMEDIA SERIALIZER
@@ -25,43 +28,97 @@ class ProductMediaSerializer(serializers.ModelSerializer):
         return {
             'id': rep['id'],
             'code': rep['code'],
-            'file': rep['file']
+            'file': rep['file'],
+            'srcset': srcset(instance, 'file', self.context.get('request')),
         }
 
 ####
 ##      PRODUCT SERIALIZER
 #####
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ''' Serializer class for Products Model. '''
+
+    # RENDERED BY to_representation
+    custom_fields = ('category',)
     
     # META CLASS
     class Meta:
         ''' Meta class for Product Serializer. '''
         model = Product
         fields ="__all__"
+        extra_kwargs = {
+            # LIKES ARE RENDERED AS A COUNT, NEVER AS A LIST OF USER IDS
+            'likes': {'write_only': True}
+        }
         
     def to_representation(self, instance:Product):
         ''' Override Instance reprensentation method to customize fields. '''
         
-        # GET INSTANCE REPRESENTATION FIRST
+        # GET INSTANCE REPRESENTATION FIRST (REQUESTED FIELDS ONLY)
         rep = super().to_representation(instance)
+        fieldset = self.fieldset
 
-        user = self.context.get('view').request.user
-        
-        rep['category'] = {
-            'id': str(instance.category.id),
-            'code': instance.category.code,
-            'name': instance.category.name
-        }
-        # Likes
-        likes = instance.likes.all()
-        rep['likes'] = likes.count()
-        rep['has_been_liked'] = likes.filter(id = user.id).exists()
+        if fieldset.expands('category'):
+            category = self.get_category(instance)
+            rep['category'] = {
+                'id': str(category.id),
+                'code': category.code,
+                'name': category.name
+            }
+        elif fieldset.includes('category'):
+            rep['category'] = str(instance.category_id)
+
+        # Likes (LIKE STATUS IS PRECOMPUTED BY ProductQuerySet.for_representation WHEN AVAILABLE)
+        if fieldset.includes('likes'):
+            rep['likes'] = instance.likes_count
+        if fieldset.includes('has_been_liked'):
+            if hasattr(instance, 'has_been_liked'):
+                rep['has_been_liked'] = instance.has_been_liked
+            else:
+                user = self.context.get('view').request.user
+                rep['has_been_liked'] = Product.likes.through.objects.filter(
+                    product_id = instance.pk, user_id = user.id
+                ).exists()
+
+        # OPT-IN ONLY, THE FULL REPRESENTATION ALREADY RENDERS THE MEDIAS
+        if fieldset.includes_explicitly('thumbnail'):
+            rep['thumbnail'] = self.get_thumbnail(instance)
 
         # Add media details using ProductMediaSerializer
-        media_queryset = instance.medias.all()
-        rep['medias'] = ProductMediaSerializer(
-            media_queryset, many=True, context = self.context
-        ).data
+        # (USES THE PREFETCHED MEDIAS WHEN AVAILABLE)
+        if fieldset.expands('medias'):
+            media_queryset = instance.medias.all()
+            rep['medias'] = ProductMediaSerializer(
+                media_queryset, many=True, context = self.context
+            ).data
         
-        return rep
\ No newline at end of file
+        return rep
+
+    def get_category(self, instance:Product):
+        ''' Return the product category from the worker's category tree. '''
+
+        # ONE TREE LOOKUP PER SERIALIZER (THE CHILD OF A LIST SERIALIZER IS SHARED)
+        if not hasattr(self, '_category_tree'):
+            self._category_tree = get_category_tree()
+        return self._category_tree.get(instance.category_id) or instance.category
+
+    def get_thumbnail(self, instance:Product):
+        ''' Return the thumbnail URL of the first product media, or None. '''
+
+        # ANNOTATED BY ProductQuerySet.for_representation, ELSE FROM MEDIAS
+        if hasattr(instance, 'thumbnail_file'):
+            if not instance.thumbnail_file:
+                return None
+            media = ProductMedia(
+                file = instance.thumbnail_file,
+                derivatives = instance.thumbnail_derivatives or {}
+            )
+        else:
+            media = next(iter(instance.medias.all()), None)
+            if media is None:
+                return None
+
+        request = self.context.get('request')
+        thumb = srcset(media, 'file', request).get('thumb', {})
+        url = thumb.get('webp') or media.file.url
+        return url if thumb or request is None else request.build_absolute_uri(url)
@@ -0,0 +1,95 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.categories.models import Category
+from apps.products.models import Product, ProductMedia
+from apps.products.search import get_search_backend
+from apps.utils import images
+from core.cache import invalidate_tags
+
+
+## KEEP LIKES COUNTER IN SYNC
+@receiver(m2m_changed, sender=Product.likes.through)
+def sync_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    ''' Recount likes when they change outside Product.like/unlike (admin, serializers...). '''
+
+    # REVERSE SIDE (user.liked_products): REMEMBER PRODUCTS BEFORE A CLEAR
+    if reverse and action == 'pre_clear':
+        instance._cleared_liked_products = list(
+            instance.liked_products.values_list('pk', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_liked_products', [])
+    else:
+        product_ids = pk_set or []
+
+    Product.objects.filter(pk__in=product_ids).refresh_likes_count()
+    invalidate_tags('products', *[f'products:{pk}' for pk in product_ids])
+
+
+## TOUCH PRODUCTS WHEN THEIR MEDIAS CHANGE
+@receiver(post_save, sender=ProductMedia)
+@receiver(post_delete, sender=ProductMedia)
+def touch_media_product(sender, instance: ProductMedia, **kwargs):
+    ''' Medias are embedded in products representation, bump their product. '''
+
+    Product.objects.filter(pk=instance.product_id).touch()
+    invalidate_tags('products', f'products:{instance.product_id}')
+
+
+## RENDER MEDIA DERIVATIVES
+@receiver(post_save, sender=ProductMedia)
+def render_media_derivatives(sender, instance: ProductMedia, **kwargs):
+    ''' Schedule thumb/card/full renditions of a new or replaced media file. '''
+
+    images.schedule(instance)
+
+
+## PURGE CACHED PRODUCT RESPONSES
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def purge_product_responses(sender, instance: Product, **kwargs):
+    ''' Invalidate product lists and the product detail. '''
+
+    invalidate_tags('products', f'products:{instance.pk}')
+
+
+## CREATE SEARCH INDEX
+def create_search_index(sender, using, **kwargs):
+    ''' Create the products search index structures after migrations. '''
+
+    get_search_backend(using).setup()
+
+
+## KEEP SEARCH INDEX IN SYNC
+@receiver(post_save, sender=Product)
+def index_product(sender, instance: Product, **kwargs):
+    ''' (Re)index a saved product. '''
+
+    get_search_backend().index(
+        Product.objects.filter(pk=instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance: Product, **kwargs):
+    ''' Remove a deleted product from the search index. '''
+
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance: Category, created, update_fields=None, **kwargs):
+    ''' Reindex the products of a saved category (not for its image derivatives). '''
+
+    if not created and not images.is_derivatives_update(update_fields):
+        get_search_backend().index(
+            Product.objects.filter(category=instance)
+        )
@@ -1,3 +1,761 @@
-from django.test import TestCase
+import os
+import json
+import time
+import tempfile
+from io import BytesIO, StringIO
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.categories.models import Category
+from apps.categories.tree import get_category_tree
+from apps.products.models import (
+    Product, ProductMedia,
+)
+from apps.utils import images
+from apps.utils.importer import ProductImporter, ImportStats, iter_json_array
 
 # Create your tests here.
+
+
+####
+##      PRODUCTS LISTING QUERIES TEST CASE
+#####
+class ProductsListingQueriesTestCase(TestCase):
+    ''' Ensure the products listing costs a fixed number of queries. '''
+
+    PRODUCTS_COUNT = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        ''' Create a 1,000 products catalog with medias and likes. '''
+
+        cls.user = User.objects.create_user(
+            'tester', 'P@ssw0rd',
+            email = 'tester@fakestore.com',
+            phone_number = '+22890000000'
+        )
+        categories = [
+            Category.objects.create(name = f'Category {i}')
+            for i in range(10)
+        ]
+        products = Product.objects.bulk_create([
+            Product(
+                code = f'PRD-{i}',
+                name = f'Product {i}',
+                brand = 'fake',
+                category = categories[i % len(categories)],
+                price = i
+            )
+            for i in range(cls.PRODUCTS_COUNT)
+        ])
+        ProductMedia.objects.bulk_create([
+            ProductMedia(
+                code = f'PDM-{i}',
+                product = product,
+                file = f'products/{product.name}/image.jpg'
+            )
+            for i, product in enumerate(products)
+        ])
+        Product.likes.through.objects.bulk_create([
+            Product.likes.through(product = product, user = cls.user)
+            for product in products[::2]
+        ])
+        Product.objects.refresh_likes_count()
+
+    def setUp(self):
+        cache.clear()
+        # WARM CATEGORY TREE: QUERY COUNTS BELOW ARE FOR A WARM WORKER
+        get_category_tree()
+        self.client = APIClient()
+
+    def test_anonymous_listing_query_count_is_constant(self):
+        ''' VALIDATORS + COUNT + PRODUCTS + MEDIAS, whatever the page size. '''
+
+        for limit in (10, self.PRODUCTS_COUNT):
+            with self.assertNumQueries(4):
+                response = self.client.get(f'/products/?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_authenticated_listing_query_count_is_constant(self):
+        ''' Like status must come from the listing query itself. '''
+
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/products/?limit={self.PRODUCTS_COUNT}')
+
+        results = {p['name']: p for p in response.data['results']}
+        self.assertEqual(results['Product 0']['likes'], 1)
+        self.assertTrue(results['Product 0']['has_been_liked'])
+        self.assertEqual(results['Product 1']['likes'], 0)
+        self.assertFalse(results['Product 1']['has_been_liked'])
+        self.assertEqual(len(results['Product 1']['medias']), 1)
+
+    def test_sparse_listing(self):
+        ''' A lean listing is served by the products query alone (plus validators and count). '''
+
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f'/products/?limit={self.PRODUCTS_COUNT}&fields=id,name,price,thumbnail'
+            )
+
+        product = response.data['results'][0]
+        self.assertEqual(set(product), {'id', 'name', 'price', 'thumbnail'})
+        self.assertTrue(product['thumbnail'].endswith('image.jpg'))
+
+        # THUMBNAILS ARE OPT-IN, THE FULL REPRESENTATION IS UNCHANGED
+        response = self.client.get('/products/?limit=1')
+        self.assertNotIn('thumbnail', response.data['results'][0])
+
+    def test_expand(self):
+        response = self.client.get('/products/?limit=1&fields=id&expand=category')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'category'})
+        self.assertIn('name', response.data['results'][0]['category'])
+
+        response = self.client.get('/products/?limit=1&expand=medias')
+        product = response.data['results'][0]
+        self.assertEqual(len(product['medias']), 1)
+        self.assertIsInstance(product['category'], str)
+        self.assertIn('description', product)
+
+
+####
+##      PRODUCT LIKES TEST CASE
+#####
+class ProductLikesTestCase(TestCase):
+    ''' Ensure like toggles keep the stored likes counter in sync. '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'tester', 'P@ssw0rd',
+            email = 'tester@fakestore.com',
+            phone_number = '+22890000000'
+        )
+        self.product = Product.objects.create(
+            name = 'Product', brand = 'fake',
+            category = Category.objects.create(name = 'Category')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/products/{self.product.id}/like'
+
+    def test_like_and_unlike_toggle(self):
+        ''' Toggle returns only the like status and counter. '''
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {'liked': True, 'likes_count': 1})
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data, {'liked': False, 'likes_count': 0})
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_counter_follows_m2m_changes_and_recount(self):
+        ''' Likes changed through the M2M manager are recounted. '''
+
+        self.product.likes.add(self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes_count, 1)
+
+        self.user.liked_products.clear()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes_count, 0)
+
+        Product.objects.filter(pk = self.product.pk).update(likes_count = 42)
+        call_command('recount_likes', stdout = StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes_count, 0)
+
+    def test_recount_walks_every_chunk(self):
+        for i in range(4):
+            Product.objects.create(name = f'Other {i}', brand = 'fake', category = self.product.category)
+        self.product.likes.add(self.user)
+        Product.objects.update(likes_count = 42)
+
+        output = StringIO()
+        call_command('recount_likes', chunk_size = 2, stdout = output)
+
+        self.assertIn('Recounted likes of 5 Products', output.getvalue())
+        self.assertEqual(
+            dict(Product.objects.values_list('name', 'likes_count')),
+            {'Product': 1, **{f'Other {i}': 0 for i in range(4)}}
+        )
+
+
+####
+##      PRODUCT SEARCH TEST CASE
+#####
+class ProductSearchTestCase(TestCase):
+    ''' Ensure the search index follows catalog writes and ranks results. '''
+
+    def setUp(self):
+        cache.clear()
+        self.phones = Category.objects.create(name = 'Phones')
+        self.laptop = Product.objects.create(
+            name = 'Laptop', brand = 'acme', category = self.phones,
+            description = 'Works great next to your phone.'
+        )
+        self.phone = Product.objects.create(
+            name = 'Smartphone X', brand = 'acme', category = self.phones,
+            description = 'A phone.'
+        )
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/products/', {'q': query})
+        return [p['name'] for p in response.data['results']]
+
+    def test_search_ranks_and_matches_prefixes(self):
+        self.assertEqual(self.search('smartph'), ['Smartphone X'])
+        self.assertEqual(self.search('phone'), ['Smartphone X', 'Laptop'])
+        self.assertEqual(self.search('laptop "phone'), ['Laptop'])
+        self.assertEqual(self.search('unknown'), [])
+
+    def test_index_follows_writes(self):
+        self.laptop.name = 'Notebook'
+        self.laptop.save()
+        self.assertEqual(self.search('notebook'), ['Notebook'])
+        self.assertEqual(self.search('laptop'), [])
+
+        self.phones.name = 'Mobiles'
+        self.phones.save()
+        self.assertEqual(len(self.search('mobiles')), 2)
+
+        self.phone.delete()
+        self.assertEqual(self.search('smartphone'), [])
+
+
+####
+##      PRODUCTS CURSOR PAGINATION TEST CASE
+#####
+class ProductsCursorPaginationTestCase(TestCase):
+    ''' Ensure cursor pages walk (created, id) without gaps or COUNT queries. '''
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name = 'Category')
+        created = timezone.now()
+        # HALF OF THE PRODUCTS SHARE THE SAME CREATION DATE
+        Product.objects.bulk_create([
+            Product(
+                code = f'PRD-{i}', name = f'Product {i}', brand = 'fake',
+                category = category,
+                created = created if i % 2 else created + timedelta(seconds = i)
+            )
+            for i in range(25)
+        ])
+        self.expected = [
+            str(pk) for pk in Product.objects.order_by('created', 'pk').values_list('pk', flat = True)
+        ]
+        self.client = APIClient()
+
+        # WARM CATEGORY TREE: QUERY COUNTS BELOW ARE FOR A WARM WORKER
+        get_category_tree()
+
+    def test_walk_forward_and_backward(self):
+        seen, url = [], '/products/?cursor=&limit=10'
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            seen += [p['id'] for p in response.data['results']]
+            self.assertNotIn('count', response.data)
+            last, url = response.data, response.data['next']
+        self.assertEqual(seen, self.expected)
+
+        # A NEW PRODUCT DOES NOT SHIFT PAGES ALREADY SERVED
+        Product.objects.create(
+            name = 'Newcomer', brand = 'fake', category = Category.objects.first()
+        )
+        previous = self.client.get(last['previous']).data
+        self.assertEqual([p['id'] for p in previous['results']], self.expected[10:20])
+        self.assertIsNotNone(previous['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/products/?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_rejects_other_orderings(self):
+        # THE KEYSET ORDER IS (created, id), ASCENDING FOR PRODUCTS
+        for params in ({'ordering': 'price'}, {'ordering': '-created'}, {'search': 'product'}, {'q': 'product'}):
+            response = self.client.get('/products/', {'cursor': '', **params})
+            self.assertEqual(response.status_code, 400, params)
+
+        response = self.client.get('/products/', {'cursor': '', 'ordering': 'created'})
+        self.assertEqual(response.status_code, 200)
+
+
+####
+##      PRODUCTS CONDITIONAL GET TEST CASE
+#####
+class ProductsConditionalGetTestCase(TestCase):
+    ''' Ensure unchanged catalog reads are answered with 304. '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'tester', 'P@ssw0rd',
+            email = 'tester@fakestore.com',
+            phone_number = '+22890000000'
+        )
+        self.category = Category.objects.create(name = 'Category')
+        self.product = Product.objects.create(
+            name = 'Product', brand = 'fake', category = self.category
+        )
+        self.client = APIClient()
+
+    def test_list_not_modified(self):
+        # AUTHENTICATED READS ARE NEVER SERVED FROM THE RESPONSE CACHE
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/products/')
+        etag = response['ETag']
+
+        # ONLY THE VALIDATORS QUERY IS RUN
+        with self.assertNumQueries(1):
+            response = self.client.get('/products/', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 304)
+
+        # NO Last-Modified ON LISTS: A DELETION WOULD NOT MAKE IT NEWER
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get('/products/', HTTP_IF_MODIFIED_SINCE = http_date(time.time()))
+        self.assertEqual(response.status_code, 200)
+
+        # OTHER FILTERS, OTHER USERS AND CATALOG WRITES CHANGE THE ETAG
+        response = self.client.get('/products/?brand=fake', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(None)
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/products/{self.product.id}/like')
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['has_been_liked'])
+        etag = response['ETag']
+
+        self.category.name = 'Renamed'
+        self.category.save()
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_not_modified(self):
+        url = f'/products/{self.product.id}'
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH = etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE = last_modified).status_code, 304)
+
+    def test_likes_through_m2m_change_validators(self):
+        url = f'/products/{self.product.id}'
+        etag = self.client.get(url)['ETag']
+        before = Product.objects.get(pk = self.product.pk).modified
+
+        # ADMIN / M2M PATH, RECOUNTED BY THE m2m_changed SIGNAL
+        self.product.likes.add(self.user)
+
+        self.assertGreater(Product.objects.get(pk = self.product.pk).modified, before)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH = etag).status_code, 200)
+
+        ProductMedia.objects.create(product = self.product, file = 'products/image.jpg')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH = etag).status_code, 200)
+
+
+####
+##      PRODUCTS RESPONSE CACHE TEST CASE
+#####
+class ProductsResponseCacheTestCase(TestCase):
+    ''' Ensure anonymous catalog reads are cached and purged on writes. '''
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name = 'Category')
+        self.product = Product.objects.create(
+            name = 'Product', brand = 'fake', category = self.category
+        )
+        self.other = Product.objects.create(
+            name = 'Other', brand = 'fake', category = self.category
+        )
+        self.client = APIClient()
+
+    def get(self, url, **kwargs):
+        response = self.client.get(url, **kwargs)
+        return response, response['X-Cache']
+
+    def test_hits_and_tag_invalidation(self):
+        detail = f'/products/{self.product.id}'
+        self.assertEqual(self.get('/products/')[1], 'MISS')
+        self.assertEqual(self.get(detail)[1], 'MISS')
+
+        # SAME QUERY IN ANOTHER ORDER IS THE SAME ENTRY, SERVED WITHOUT QUERIES
+        self.assertEqual(self.get('/products/?brand=fake&limit=5')[1], 'MISS')
+        with self.assertNumQueries(0):
+            response, hit = self.get('/products/?limit=5&brand=fake')
+        self.assertEqual(hit, 'HIT')
+        self.assertEqual(len(response.data['results']), 2)
+
+        # ANOTHER PRODUCT WRITE KEEPS THE DETAIL, PURGES LISTS
+        self.other.name = 'Renamed'
+        self.other.save()
+        self.assertEqual(self.get(detail)[1], 'HIT')
+        self.assertEqual(self.get('/products/')[1], 'MISS')
+
+        # EMBEDDED CATEGORY WRITE PURGES THE DETAIL
+        self.category.name = 'Renamed'
+        self.category.save()
+        response, hit = self.get(detail)
+        self.assertEqual(hit, 'MISS')
+        self.assertEqual(response.data['category']['name'], 'Renamed')
+
+        # CACHED ETAG STILL ANSWERS 304
+        response, hit = self.get(detail, HTTP_IF_NONE_MATCH = response['ETag'])
+        self.assertEqual((response.status_code, hit), (304, 'HIT'))
+
+    def test_read_racing_a_write_is_invalidated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.product.name = 'Renamed'
+            self.product.save()
+            # A READ BEFORE THE COMMIT CACHES THE ROWS IT SEES
+            self.assertEqual(self.get('/products/')[1], 'MISS')
+            self.assertEqual(self.get('/products/')[1], 'HIT')
+
+        self.assertEqual(self.get('/products/')[1], 'MISS')
+
+    def test_stats_are_admin_only(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@fakestore.com', 'P@ssw0rd', phone_number = '+22890000001'
+        )
+        self.get('/products/')
+        self.get('/products/')
+        self.assertEqual(self.client.get('/cache/stats').status_code, 401)
+
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/cache/stats').data
+        self.assertEqual(stats['products'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+
+####
+##      IMAGE DERIVATIVES TEST CASE
+#####
+@override_settings(
+    MEDIA_ROOT = tempfile.mkdtemp(),
+    IMAGE_DERIVATIVES = {'ASYNC': False, 'SIZES': {'thumb': 16, 'card': 48}}
+)
+class ImageDerivativesTestCase(TestCase):
+    ''' Ensure uploaded images get responsive derivatives after commit. '''
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name = 'Images')
+        self.product = Product.objects.create(
+            name = 'Camera', brand = 'Brand', category = self.category
+        )
+
+    def image(self, name):
+        buffer = BytesIO()
+        Image.new('RGBA', (100, 80), (200, 10, 10, 128)).save(buffer, format = 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type = 'image/png')
+
+    def test_media_derivatives(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            media = ProductMedia.objects.create(
+                product = self.product, file = self.image('front.png')
+            )
+
+        media.refresh_from_db()
+        self.assertEqual(media.derivatives['file']['source'], media.file.name)
+
+        response = self.client.get(f'/products/{self.product.pk}')
+        srcset = response.data['medias'][0]['srcset']
+        self.assertEqual(set(srcset), {'thumb', 'card'})
+        self.assertTrue(srcset['thumb']['webp'].endswith('front.thumb.webp'))
+
+        with Image.open(media.file.storage.path(media.derivatives['file']['sizes']['card']['jpeg'])) as card:
+            self.assertEqual(card.size, (48, 38))
+
+    def test_category_derivatives_follow_replaced_image(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.category.icon = self.image('icon.png')
+            self.category.save()
+        self.category.refresh_from_db()
+        first = self.category.derivatives['icon']['sizes']['thumb']['webp']
+
+        with self.captureOnCommitCallbacks(execute = True):
+            self.category.icon = self.image('other.png')
+            self.category.save()
+        self.category.refresh_from_db()
+
+        storage = self.category.icon.storage
+        self.assertFalse(storage.exists(first))
+        self.assertEqual(self.category.derivatives['icon']['source'], self.category.icon.name)
+
+        response = self.client.get(f'/categories/{self.category.pk}')
+        self.assertIn('other.thumb.webp', response.data['icon_srcset']['thumb']['webp'])
+        self.assertEqual(response.data['image_srcset'], {})
+        self.assertNotIn('derivatives', response.data)
+
+    def test_category_derivatives_do_not_reindex_products(self):
+        self.category.icon = self.image('icon.png')
+        self.category.save()
+
+        # THE BACKGROUND JOB RECORDING THE RENDERED DERIVATIVES
+        with patch('apps.products.signals.get_search_backend') as backend:
+            self.assertTrue(images.generate(self.category))
+
+        self.category.refresh_from_db()
+        self.assertIn('icon', self.category.derivatives)
+        backend.return_value.index.assert_not_called()
+
+    def test_backfill_command(self):
+        ProductMedia.objects.bulk_create([
+            ProductMedia(product = self.product, file = self.image('a.png'))
+        ])
+        media = ProductMedia.objects.get()
+        media.file.save('a.png', self.image('a.png'))
+        ProductMedia.objects.update(derivatives = {})
+
+        call_command('backfill_derivatives', workers = 1, stdout = StringIO())
+
+        media.refresh_from_db()
+        self.assertEqual(set(media.derivatives['file']['sizes']), {'thumb', 'card'})
+
+
+####
+##      PRODUCT IMPORT TEST CASE
+#####
+@override_settings(MEDIA_ROOT = tempfile.mkdtemp())
+class ProductImportTestCase(TestCase):
+    ''' Ensure the populate engine streams, bulk creates and resumes imports. '''
+
+    class Session:
+        ''' Minimal HTTP session serving one PNG for every URL. '''
+
+        def __init__(self, content):
+            self.content, self.calls = content, 0
+
+        def get(self, url, **kwargs):
+            self.calls += 1
+            session = self
+
+            class Response:
+                def __enter__(self):
+                    return self
+                def __exit__(self, *args):
+                    pass
+                def raise_for_status(self):
+                    pass
+                def iter_content(self, chunk_size):
+                    for i in range(0, len(session.content), chunk_size):
+                        yield session.content[i:i + chunk_size]
+            return Response()
+
+    def setUp(self):
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, format = 'PNG')
+        self.session = self.Session(buffer.getvalue())
+
+        records = [
+            {
+                'name': f'Imported {i}',
+                'description': f'Description {i}',
+                'original_price': 100 + i,
+                'dmCategorie': [{'name': f'Imported category {i % 2}'}],
+                'medias': [{'id': f'media-{i}', 'type': 'IMG', 'file': f'https://cdn.test/img/{i}?v=1'}],
+            }
+            for i in range(5)
+        ]
+        records.append(dict(records[0]))
+        directory = tempfile.mkdtemp()
+        self.source = f'{directory}/products.json'
+        with open(self.source, 'w') as f:
+            json.dump(records, f, indent = 4)
+
+    def importer(self, **kwargs):
+        return ProductImporter(
+            source = self.source, chunk_size = 2, workers = 2,
+            session = self.session, **kwargs
+        )
+
+    def test_stream_parser(self):
+        names = [record['name'] for record in iter_json_array(self.source, buffer_size = 16)]
+        self.assertEqual(names, [f'Imported {i}' for i in range(5)] + ['Imported 0'])
+
+    def test_import(self):
+        stats = self.importer().run()
+
+        self.assertEqual((stats.products, stats.skipped, stats.medias), (5, 1, 5))
+        self.assertEqual(Category.objects.filter(name__startswith = 'Imported').count(), 2)
+        product = Product.objects.get(name = 'Imported 3')
+        self.assertTrue(product.code.startswith('PRD-'))
+        self.assertEqual(product.price, 103)
+        media = product.medias.get()
+        self.assertEqual(media.file.name, 'products/Imported 3/3.png')
+        self.assertTrue(media.file.storage.exists(media.file.name))
+        self.assertFalse(os.path.exists(f'{self.source}.checkpoint'))
+
+    @override_settings(IMAGE_DERIVATIVES = {'ASYNC': False, 'SIZES': {'thumb': 4}})
+    def test_import_renders_derivatives(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.importer(limit = 2).run()
+
+        media = ProductMedia.objects.get(product__name = 'Imported 1')
+        self.assertEqual(media.derivatives['file']['source'], media.file.name)
+        self.assertEqual(set(media.derivatives['file']['sizes']), {'thumb'})
+
+    def test_resume(self):
+        importer = self.importer(limit = 5)
+        importer.save_checkpoint(4, ImportStats(products = 4))
+
+        stats = importer.run()
+
+        self.assertEqual(stats.products, 5)
+        self.assertEqual(
+            sorted(Product.objects.filter(name__startswith = 'Imported').values_list('name', flat = True)),
+            ['Imported 4']
+        )
+        self.assertEqual(self.session.calls, 1)
+
+
+####
+##      PRODUCTS FACETS TEST CASE
+#####
+class ProductsFacetsTestCase(TestCase):
+    ''' Ensure facets are counted with a few queries and follow catalog writes. '''
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.phones = Category.objects.create(name = 'Phones')
+        self.laptops = Category.objects.create(name = 'Laptops')
+        for i, (category, brand, price) in enumerate([
+            (self.phones, 'Acme', 1000),
+            (self.phones, 'Acme', 7000),
+            (self.phones, 'Globex', 30000),
+            (self.laptops, 'Acme', 120000),
+            (self.laptops, 'Initech', 60000),
+        ]):
+            Product.objects.create(
+                name = f'Item {i}', brand = brand, category = category, price = price
+            )
+
+        # WARM CATEGORY TREE: QUERY COUNTS BELOW ARE FOR A WARM WORKER
+        get_category_tree()
+
+    def test_facets(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/products/facets')
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            [(facet['name'], facet['count']) for facet in response.data['category']],
+            [('Phones', 3), ('Laptops', 2)]
+        )
+        self.assertEqual(response.data['brand'][0], {'value': 'Acme', 'count': 3})
+        self.assertEqual(
+            [bucket['count'] for bucket in response.data['price']],
+            [1, 1, 0, 1, 1, 1]
+        )
+        self.assertEqual(response.data['price'][-1], {'min': 100000, 'max': None, 'count': 1})
+
+    def test_facets_follow_filters_and_search(self):
+        response = self.client.get('/products/facets', {
+            'category': self.phones.pk, 'price_buckets': '0,10000'
+        })
+
+        # A FACET IGNORES ITS OWN FILTER
+        self.assertEqual(len(response.data['category']), 2)
+        self.assertEqual(
+            response.data['brand'], [{'value': 'Acme', 'count': 2}, {'value': 'Globex', 'count': 1}]
+        )
+        self.assertEqual([bucket['count'] for bucket in response.data['price']], [2, 1])
+
+        response = self.client.get('/products/facets', {'q': 'globex'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['category'][0]['name'], 'Phones')
+
+        response = self.client.get('/products/facets', {'price_buckets': 'cheap'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_category_missing_from_tree(self):
+        # A WORKER WHOSE TREE PREDATES THE CATEGORY (BUMP NOT SEEN YET)
+        stale = get_category_tree()
+        tablets = Category.objects.create(name = 'Tablets')
+        Product.objects.create(name = 'Item 5', brand = 'Acme', category = tablets, price = 10)
+
+        with patch('apps.products.views.get_category_tree', return_value = stale):
+            response = self.client.get('/products/facets')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(('Tablets', 1), [(facet['name'], facet['count']) for facet in response.data['category']])
+
+    def test_facets_cache(self):
+        self.client.get('/products/facets')
+        with self.assertNumQueries(0):
+            response = self.client.get('/products/facets')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        Product.objects.create(name = 'Item 5', brand = 'Acme', category = self.laptops, price = 10)
+        response = self.client.get('/products/facets')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 6)
+
+        self.laptops.name = 'Computers'
+        self.laptops.save()
+        response = self.client.get('/products/facets')
+        self.assertIn('Computers', [facet['name'] for facet in response.data['category']])
+
+
+####
+##      PRODUCTS CATEGORY TREE FILTER TEST CASE
+#####
+class ProductsCategoryTreeFilterTestCase(TestCase):
+    ''' Ensure category_tree matches products of every descendant category. '''
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name = 'Electronics')
+        self.phones = Category.objects.create(name = 'Phones', parent = self.electronics)
+        self.android = Category.objects.create(name = 'Android', parent = self.phones)
+        self.fashion = Category.objects.create(name = 'Fashion')
+        for i, category in enumerate([self.electronics, self.phones, self.android, self.fashion]):
+            Product.objects.create(name = f'Item {i}', brand = 'Acme', category = category)
+
+    def names(self, params):
+        response = self.client.get('/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['name'] for product in response.data['results'])
+
+    def test_category_tree(self):
+        self.assertEqual(self.names({'category_tree': self.electronics.pk}), ['Item 0', 'Item 1', 'Item 2'])
+        self.assertEqual(self.names({'category_tree': self.phones.pk}), ['Item 1', 'Item 2'])
+        self.assertEqual(self.names({'category': self.phones.pk}), ['Item 1'])
+
+        # MOVED SUBTREES ARE FOLLOWED, EVEN BY CACHED RESPONSES
+        self.assertEqual(self.names({'category_tree': self.fashion.pk}), ['Item 3'])
+        self.phones.parent = self.fashion
+        self.phones.save()
+        self.assertEqual(self.names({'category_tree': self.fashion.pk}), ['Item 1', 'Item 2', 'Item 3'])
+
+        self.assertEqual(self.client.get('/products/', {'category_tree': 'nope'}).status_code, 400)
+
+    def test_category_tree_facets(self):
+        response = self.client.get('/products/facets', {'category_tree': self.phones.pk})
+        self.assertEqual(
+            sorted(facet['name'] for facet in response.data['category']), ['Android', 'Phones']
+        )
@@ -1,8 +1,18 @@
+from django.conf import settings
+from django.db.models import Max, Count, Q
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import (
     IsAuthenticated,IsAdminUser,AllowAny
 )
 
+from core.cache import CachedResponseMixin, invalidate_tags
+from core.conditional import ConditionalGetMixin
+from core.fieldsets import FieldSet
+from apps.categories.models import Category
+from apps.categories.tree import get_category_tree
+from apps.products.filters import ProductFilter, ProductSearchFilter
+from apps.products.models import Product
 from apps.products.serializers import (
     ProductSerializer,
     ProductMediaSerializer,
@@ -19,19 +29,65 @@ from core.exceptions import (
 ####
 ##      PRODUCTS VIEWSET
 #####
-class ProductsViewSet(ModelViewSet):
+class ProductsViewSet(CachedResponseMixin, ConditionalGetMixin, ModelViewSet):
     ''' ViewSet class for Products Model. '''
     
+    cache_namespace = 'products'
     queryset = ProductSerializer.Meta.model.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
-    filterset_fields = ['category','brand']
-    search_fields = [
-        'name','description','brand',
-        'category__name','category__description',
-        'category__code','category__id'
-    ]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductFilter
     lookup_field = 'id'
+    cached_actions = ('list', 'retrieve', 'facets')
+
+    def get_queryset(self):
+        ''' Return products with what ProductSerializer renders for the request preloaded. '''
+
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        # LIKE TOGGLES ONLY NEED THE PRODUCT ROW ITSELF
+        if self.action == 'like':
+            return queryset.only('id', 'likes_count')
+
+        return queryset.for_representation(
+            user, FieldSet.from_request(self.request)
+        )
+    
+    def get_request_cache_tags(self, request):
+        ''' Subtree filters depend on the whole category tree. '''
+
+        tags = super().get_request_cache_tags(request)
+        if request.query_params.get('category_tree'):
+            tags = tags + ['categories']
+        return tags
+
+    def get_response_cache_tags(self, request, response):
+        ''' Products embed their category. '''
+
+        data = response.data
+        if self.action == 'facets':
+            return {f"categories:{facet['id']}" for facet in data['category']}
+        products = data.get('results', [data]) if isinstance(data, dict) else data
+        return {
+            f"categories:{product['category']['id']}" for product in products
+            if isinstance(product.get('category'), dict)
+        }
+
+    def is_cacheable(self, request):
+        ''' Facets do not depend on the requesting user, cache them for everyone. '''
+
+        if self.action == 'facets':
+            return request.method in ('GET', 'HEAD')
+        return super().is_cacheable(request)
+
+    def get_conditional_aggregates(self):
+        ''' Products embed their category, which has its own modified date. '''
+
+        aggregates = super().get_conditional_aggregates()
+        aggregates['category_modified'] = Max('category__modified')
+        return aggregates
     
     def get_permissions(self):
         ''' Define a way to use permissions based on requesting user. '''
@@ -48,39 +104,135 @@ class ProductsViewSet(ModelViewSet):
     
     @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, id=None):
-        """ Custom action to like a product. """
+        """ Custom action to like or unlike a product. """
         try:
             product = self.get_object()
             user = request.user
 
             if request.method == "DELETE":
-                if user in product.likes.all():
-                    product.likes.remove(user)
-                    return Response(
-                        self.get_serializer(product).data, 
-                        status=status.HTTP_200_OK
-                    )
-                else:
+                if not product.unlike(user):
                     raise DataValidationError(
                         details="Product not liked yet."
                     )
             if request.method == "POST":
-                if user not in product.likes.all():
-                    product.likes.add(user)
-                    return Response(
-                        self.get_serializer(product).data, 
-                        status=status.HTTP_200_OK
-                    )
-                else:
+                if not product.like(user):
                     raise DataValidationError(
                         details="Product already liked."
                     )
+
+            # LIKES ARE UPDATED WITHOUT SAVING THE PRODUCT, PURGE CACHED RESPONSES
+            invalidate_tags('products', f'products:{product.pk}')
+
+            # LIGHTWEIGHT TOGGLE RESPONSE
+            return Response(
+                {
+                    'liked': request.method == "POST",
+                    'likes_count': product.likes_count
+                },
+                status=status.HTTP_200_OK
+            )
         except Exception as e:
             raise BusinessLogicError(
                 details=str(e)
             )
 
 
+    def get_facet_queryset(self, exclude=None):
+        '''
+        Return products matching the request search and filters, except the
+        `exclude` filter: a facet counts the values its own filter can switch to.
+        '''
+
+        params = self.request.query_params.copy()
+        params.pop(exclude, None)
+
+        queryset = ProductSearchFilter().filter_queryset(
+            self.request, Product.objects.all(), self
+        )
+        filterset = DjangoFilterBackend().get_filterset_class(self, queryset)(
+            data = params, queryset = queryset, request = self.request
+        )
+        if not filterset.is_valid():
+            raise DataValidationError(details = filterset.errors)
+        return filterset.qs.order_by()
+
+    def get_price_buckets(self):
+        ''' Return sorted bucket lower bounds, from "?price_buckets=0,100,500" or settings. '''
+
+        raw = self.request.query_params.get('price_buckets')
+        if not raw:
+            return settings.PRODUCT_FACET_PRICE_BUCKETS
+        try:
+            return sorted({int(bound) for bound in raw.split(',') if bound.strip()})
+        except ValueError:
+            raise DataValidationError(
+                details = "price_buckets must be a comma separated list of integers."
+            )
+
+    def get_facets(self, request, *args, **kwargs):
+        ''' Compute facet counts with one GROUP BY query per facet. '''
+
+        # CATEGORIES
+        # (NAMES FROM THE CATEGORY TREE, NO JOIN)
+        tree = get_category_tree()
+        rows = self.get_facet_queryset(exclude = 'category').values(
+            'category'
+        ).annotate(count = Count('pk')).order_by()
+        # CATEGORIES NEWER THAN THIS WORKER'S TREE, IN ONE QUERY
+        missing = Category.objects.in_bulk(
+            [row['category'] for row in rows if tree.get(row['category']) is None]
+        )
+        categories = [
+            (tree.get(row['category']) or missing[row['category']], row['count'])
+            for row in rows
+        ]
+        categories.sort(key = lambda facet: (-facet[1], facet[0].name))
+
+        # BRANDS
+        brands = self.get_facet_queryset(exclude = 'brand').values(
+            'brand'
+        ).annotate(count = Count('pk')).order_by('-count', 'brand')[:settings.PRODUCT_FACET_BRANDS_LIMIT]
+
+        # PRICE BUCKETS (AND TOTAL) IN A SINGLE AGGREGATE
+        bounds = self.get_price_buckets()
+        ranges = list(zip(bounds, bounds[1:] + [None]))
+        counts = self.get_facet_queryset().aggregate(
+            total = Count('pk'),
+            **{
+                f'bucket_{i}': Count('pk', filter = Q(
+                    price__gte = low, **({'price__lt': high} if high is not None else {})
+                ))
+                for i, (low, high) in enumerate(ranges)
+            }
+        )
+
+        return Response({
+            'count': counts['total'],
+            'category': [
+                {
+                    'id': str(category.id),
+                    'code': category.code,
+                    'name': category.name,
+                    'count': count,
+                }
+                for category, count in categories
+            ],
+            'brand': [
+                {'value': row['brand'], 'count': row['count']} for row in brands
+            ],
+            'price': [
+                {'min': low, 'max': high, 'count': counts[f'bucket_{i}']}
+                for i, (low, high) in enumerate(ranges)
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """ Counts per category, brand and price bucket for the current search and filters. """
+
+        return self.dispatch_cached(request, self.get_facets)
+
+
 ####
 ##      PRODUCTMEDIAS VIEWSET
 #####
@@ -0,0 +1,69 @@
+from django.contrib import admin
+
+from apps.sales.models import (
+    SaleEntry,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    DailyTransactions,
+)
+
+# Register your models here.
+
+LIMIT_PER_PAGE = 100
+
+
+####
+##      READ ONLY ROLLUP ADMIN
+#####
+class RollupAdmin(admin.ModelAdmin):
+    ''' Rollups are only written by apps.sales.rollups. '''
+
+    date_hierarchy = 'date'
+    list_per_page = LIMIT_PER_PAGE
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj = None):
+        return False
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(RollupAdmin):
+    ''' Admin site configs for Daily Sales Model. '''
+
+    list_display = ['date', 'orders', 'revenue', 'refunds', 'refunded', 'units']
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(RollupAdmin):
+    ''' Admin site configs for Daily Product Sales Model. '''
+
+    list_display = ['date', 'product', 'units', 'revenue']
+    list_select_related = ['product']
+
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(RollupAdmin):
+    ''' Admin site configs for Daily Category Sales Model. '''
+
+    list_display = ['date', 'category', 'units', 'revenue']
+    list_select_related = ['category']
+
+
+@admin.register(DailyTransactions)
+class DailyTransactionsAdmin(RollupAdmin):
+    ''' Admin site configs for Daily Transactions Model. '''
+
+    list_display = ['date', 'provider', 'status', 'count', 'amount']
+    list_filter = ['provider', 'status']
+
+
+@admin.register(SaleEntry)
+class SaleEntryAdmin(RollupAdmin):
+    ''' Admin site configs for Sale Entry Model. '''
+
+    list_display = ['date', 'transaction', 'status', 'provider', 'amount']
+    list_filter = ['status', 'provider']
+    raw_id_fields = ['transaction', 'order']
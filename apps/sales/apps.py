@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class SalesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.sales'
+    verbose_name = 'Sales'
+
+    def ready(self) -> None:
+        ''' Load the Sales App outbox event handlers. '''
+        from apps.sales import handlers
+
+        return super().ready()
@@ -0,0 +1,25 @@
+"""
+Outbox event handlers of the sales app, loaded by SalesConfig.ready().
+
+Handlers run after commit in the outbox relay, at least once: a payment
+is rolled up once per counted status (SaleEntry unique constraint).
+"""
+
+from apps.billings.models import Transaction
+from apps.outbox.events import handler
+from apps.sales.rollups import COUNTED, record
+
+
+## ROLL UP PAYMENTS
+@handler('transaction.created')
+@handler('transaction.updated')
+def roll_up_transaction(event):
+    ''' Count payments becoming successful or refunded in the rollups of the day. '''
+
+    payload = event.payload
+    if payload.get('type') != Transaction.TYPES.PAYMENT or payload.get('status') not in COUNTED:
+        return
+
+    transaction = Transaction.objects.filter(pk=event.aggregate_id).first()
+    if transaction is not None:
+        record(transaction, payload['status'], event.created)
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.billings.models import Transaction
+from apps.sales.models import SaleEntry
+from apps.sales.rollups import COUNTED, rebuild
+
+####
+##      COMMAND CLASS
+#####
+class Command(BaseCommand):
+    """Django command to rebuild daily sales rollups"""
+
+    help = "Recompute the daily sales rollups of a date range from sale entries"
+
+    def add_arguments(self, parser):
+        """Add rebuild_sales_rollups Comand arguments"""
+
+        parser.add_argument(
+            '-s', '--start', type = date.fromisoformat,
+            help = 'First day to rebuild (YYYY-MM-DD), the first payment by default'
+        )
+        parser.add_argument(
+            '-e', '--end', type = date.fromisoformat,
+            help = 'Last day to rebuild (YYYY-MM-DD), today by default'
+        )
+        parser.add_argument(
+            '-d', '--days', type = int, default = 31,
+            help = 'Days rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Handle rebuild_sales_rollups command"""
+
+        end = options.get('end') or timezone.localdate()
+        start = options.get('start')
+        if start is None:
+            first_entry = SaleEntry.objects.aggregate(first = Min('date'))['first']
+            first_payment = Transaction.objects.filter(
+                type = Transaction.TYPES.PAYMENT, status__in = COUNTED
+            ).aggregate(first = Min('modified'))['first']
+            start = min(
+                day for day in (
+                    first_entry, first_payment and timezone.localdate(first_payment), end
+                ) if day
+            )
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        entries, day = 0, start
+        while day <= end:
+            last = min(day + timedelta(days = options.get('days') - 1), end)
+            entries += rebuild(day, last)
+            day = last + timedelta(days = 1)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt sales rollups from {start} to {end} ({entries} entries)'
+            )
+        )
@@ -0,0 +1,178 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from apps.billings.models import Transaction
+from apps.categories.models import Category
+from apps.orders.models import Order
+from apps.products.models import Product
+
+# Create your models here.
+
+# MONEY COLUMNS, WIDE ENOUGH FOR SUMS OF Transaction.amount
+MONEY = {'max_digits': 16, 'decimal_places': 2, 'default': 0}
+
+
+####
+##      SALE ENTRY MODEL
+#####
+class SaleEntry(models.Model):
+    '''
+    A payment counted in the rollups: one row per transaction and counted
+    status (successful, then refunded), so an entry is rolled up once
+    whatever the number of event deliveries. Rollups are rebuilt from
+    entries by `manage.py rebuild_sales_rollups`.
+    '''
+
+    transaction = models.ForeignKey(
+        Transaction, on_delete = models.CASCADE,
+        related_name = 'sale_entries'
+    )
+    order = models.ForeignKey(
+        Order, on_delete = models.SET_NULL,
+        null = True, blank = True,
+        related_name = 'sale_entries'
+    )
+    status = models.CharField(max_length = 100, choices = Transaction.STATUES.choices)
+    provider = models.CharField(max_length = 100)
+    amount = models.DecimalField(max_digits = 10, decimal_places = 2)
+    date = models.DateField()
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Sale Entry Model. '''
+
+        verbose_name = _('Sale Entry')
+        verbose_name_plural = _('Sale Entries')
+        ordering = ['date', 'id']
+        constraints = [
+            models.UniqueConstraint(fields = ['transaction', 'status'], name = 'unique_sale_entry'),
+        ]
+        indexes = [
+            models.Index(fields = ['date']),
+        ]
+
+    def __str__(self):
+        return f'{self.transaction_id} {self.status} {self.date}'
+
+    @property
+    def sign(self):
+        ''' Refunds are rolled up negatively. '''
+        return -1 if self.status == Transaction.STATUES.REFUNDED else 1
+
+
+####
+##      DAILY SALES MODEL
+#####
+class DailySales(models.Model):
+    ''' Paid orders and revenue of a day. '''
+
+    date = models.DateField(unique = True)
+    orders = models.PositiveIntegerField(default = 0)
+    revenue = models.DecimalField(**MONEY)
+    refunds = models.PositiveIntegerField(default = 0)
+    refunded = models.DecimalField(**MONEY)
+    units = models.IntegerField(default = 0)
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Daily Sales Model. '''
+
+        verbose_name = _('Daily Sales')
+        verbose_name_plural = _('Daily Sales')
+        ordering = ['-date']
+
+    def __str__(self):
+        return str(self.date)
+
+
+####
+##      DAILY PRODUCT SALES MODEL
+#####
+class DailyProductSales(models.Model):
+    ''' Units and revenue of a product in a day, net of refunds. '''
+
+    date = models.DateField()
+    product = models.ForeignKey(
+        Product, on_delete = models.CASCADE,
+        related_name = 'daily_sales'
+    )
+    units = models.IntegerField(default = 0)
+    revenue = models.DecimalField(**MONEY)
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Daily Product Sales Model. '''
+
+        verbose_name = _('Daily Product Sales')
+        verbose_name_plural = _('Daily Product Sales')
+        ordering = ['-date', '-revenue']
+        constraints = [
+            models.UniqueConstraint(fields = ['date', 'product'], name = 'unique_daily_product_sales'),
+        ]
+        indexes = [
+            models.Index(fields = ['product', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.product_id}'
+
+
+####
+##      DAILY CATEGORY SALES MODEL
+#####
+class DailyCategorySales(models.Model):
+    ''' Units and revenue of a category (its own products) in a day, net of refunds. '''
+
+    date = models.DateField()
+    category = models.ForeignKey(
+        Category, on_delete = models.CASCADE,
+        related_name = 'daily_sales'
+    )
+    units = models.IntegerField(default = 0)
+    revenue = models.DecimalField(**MONEY)
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Daily Category Sales Model. '''
+
+        verbose_name = _('Daily Category Sales')
+        verbose_name_plural = _('Daily Category Sales')
+        ordering = ['-date', '-revenue']
+        constraints = [
+            models.UniqueConstraint(fields = ['date', 'category'], name = 'unique_daily_category_sales'),
+        ]
+        indexes = [
+            models.Index(fields = ['category', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.category_id}'
+
+
+####
+##      DAILY TRANSACTIONS MODEL
+#####
+class DailyTransactions(models.Model):
+    ''' Payments of a provider reaching a status in a day. '''
+
+    date = models.DateField()
+    provider = models.CharField(max_length = 100)
+    status = models.CharField(max_length = 100, choices = Transaction.STATUES.choices)
+    count = models.PositiveIntegerField(default = 0)
+    amount = models.DecimalField(**MONEY)
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Daily Transactions Model. '''
+
+        verbose_name = _('Daily Transactions')
+        verbose_name_plural = _('Daily Transactions')
+        ordering = ['-date', 'provider', 'status']
+        constraints = [
+            models.UniqueConstraint(
+                fields = ['date', 'provider', 'status'], name = 'unique_daily_transactions'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.provider} {self.status}'
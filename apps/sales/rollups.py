@@ -0,0 +1,224 @@
+"""
+Daily sales rollups.
+
+Dashboards read small per-day tables instead of scanning transactions and
+articles. A payment is counted when it becomes successful, and counted
+back when it is refunded: `record` stores a SaleEntry for the transaction
+and status, then adds it to the rollup rows of its day with one UPDATE per
+table. The entry unique constraint makes at-least-once delivery safe.
+
+`rebuild` recomputes the rollups of a date range from entries with a few
+aggregate queries, recording first the payments that were never counted.
+"""
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.billings.models import Transaction
+from apps.orders.models import Article
+from apps.sales.models import (
+    SaleEntry,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    DailyTransactions,
+)
+
+# PAYMENT STATUES COUNTED IN THE ROLLUPS
+COUNTED = (Transaction.STATUES.SUCCESSFUL, Transaction.STATUES.REFUNDED)
+
+ROLLUPS = (DailySales, DailyProductSales, DailyCategorySales, DailyTransactions)
+
+
+def add(rows, lookup, **deltas):
+    ''' Accumulate deltas on the rollup row identified by lookup. '''
+
+    key = tuple(sorted(lookup.items()))
+    row = rows.setdefault(key, {})
+    for field, delta in deltas.items():
+        row[field] = row.get(field, 0) + delta
+
+
+def increment(model, rows):
+    ''' Add accumulated rows to model, creating missing rows, in two queries. '''
+
+    if not rows:
+        return
+
+    model.objects.bulk_create(
+        [model(**dict(key)) for key in rows], ignore_conflicts = True
+    )
+
+    condition = Q()
+    for key in rows:
+        condition |= Q(**dict(key))
+    fields = {field for deltas in rows.values() for field in deltas}
+    model.objects.filter(condition).update(**{
+        field: F(field) + Case(
+            *[When(Q(**dict(key)), then = Value(deltas.get(field, 0))) for key, deltas in rows.items()],
+            default = Value(0),
+            output_field = model._meta.get_field(field)
+        )
+        for field in fields
+    })
+
+
+def roll_up(entries):
+    ''' Add entries to the rollups of their day. '''
+
+    sales, products, categories, transactions = {}, {}, {}, {}
+
+    lines = {}
+    for order, product, category, quantity, price in Article.objects.filter(
+        order__in = {entry.order_id for entry in entries if entry.order_id}
+    ).values_list('order', 'product', 'product__category', 'quantity', 'selling_price'):
+        lines.setdefault(order, []).append((product, category, quantity, price))
+
+    for entry in entries:
+        sign, paid = entry.sign, entry.status == Transaction.STATUES.SUCCESSFUL
+        units = 0
+        for product, category, quantity, price in lines.get(entry.order_id, ()):
+            units += quantity
+            add(products, {'date': entry.date, 'product_id': product}, units = sign * quantity, revenue = sign * quantity * price)
+            add(categories, {'date': entry.date, 'category_id': category}, units = sign * quantity, revenue = sign * quantity * price)
+
+        add(
+            sales, {'date': entry.date},
+            orders = int(paid and entry.order_id is not None),
+            revenue = entry.amount if paid else 0,
+            refunds = int(not paid),
+            refunded = 0 if paid else entry.amount,
+            units = sign * units,
+        )
+        add(
+            transactions, {'date': entry.date, 'provider': entry.provider, 'status': entry.status},
+            count = 1, amount = entry.amount
+        )
+
+    increment(DailySales, sales)
+    increment(DailyProductSales, products)
+    increment(DailyCategorySales, categories)
+    increment(DailyTransactions, transactions)
+
+
+def new_entry(transaction, status, date):
+    return SaleEntry(
+        transaction = transaction,
+        order_id = transaction.order_id,
+        status = status,
+        provider = transaction.provider,
+        amount = transaction.amount,
+        date = date,
+    )
+
+
+def record(transaction, status, when=None):
+    ''' Count transaction reaching status on the day of when, once. Return the entry or None. '''
+
+    if transaction.type != Transaction.TYPES.PAYMENT or status not in COUNTED:
+        return None
+
+    date = timezone.localdate(when or timezone.now())
+    with db_transaction.atomic():
+        try:
+            with db_transaction.atomic():
+                entry = new_entry(transaction, status, date)
+                entry.save()
+        except IntegrityError:
+            # ALREADY COUNTED (EVENT DELIVERED AGAIN, OR SAVED AGAIN WITH THE SAME STATUS)
+            return None
+        roll_up([entry])
+    return entry
+
+
+## REBUILD
+def backfill(start, end, batch_size=1000):
+    '''
+    Record payments of start..end that have no entry (e.g. counted before
+    rollups existed or missed by the relay), dated by their last change.
+    '''
+
+    created = 0
+    for status in COUNTED:
+        # A REFUNDED PAYMENT WAS SUCCESSFUL FIRST
+        statues = COUNTED if status == Transaction.STATUES.SUCCESSFUL else (status,)
+        missing = Transaction.objects.filter(
+            type = Transaction.TYPES.PAYMENT,
+            status__in = statues,
+            modified__date__range = (start, end),
+        ).exclude(sale_entries__status = status).only(
+            'order', 'provider', 'amount', 'modified'
+        )
+
+        batch = []
+        for transaction in missing.iterator(chunk_size = batch_size):
+            batch.append(new_entry(transaction, status, timezone.localdate(transaction.modified)))
+            if len(batch) >= batch_size:
+                created += len(SaleEntry.objects.bulk_create(batch, ignore_conflicts = True))
+                batch = []
+        created += len(SaleEntry.objects.bulk_create(batch, ignore_conflicts = True))
+    return created
+
+
+def rebuild(start, end):
+    ''' Recompute every rollup of days start..end from entries, return the number of entries. '''
+
+    money = DecimalField(max_digits = 16, decimal_places = 2)
+    paid = Q(status = Transaction.STATUES.SUCCESSFUL)
+    refunded = Q(status = Transaction.STATUES.REFUNDED)
+    sign = Case(When(refunded, then = Value(-1)), default = Value(1), output_field = IntegerField())
+
+    with db_transaction.atomic():
+        backfill(start, end)
+        entries = SaleEntry.objects.filter(date__range = (start, end)).order_by()
+        for model in ROLLUPS:
+            model.objects.filter(date__range = (start, end)).delete()
+
+        # ARTICLES OF EVERY ENTRY, ONCE PER ENTRY (A REFUNDED ORDER IS COUNTED THEN COUNTED BACK)
+        lines = entries.filter(order__isnull = False).annotate(
+            line_units = sign * F('order__articles__quantity'),
+            line_revenue = sign * F('order__articles__quantity') * F('order__articles__selling_price'),
+        )
+
+        units = {}
+        products = []
+        for row in lines.values('date', product_id = F('order__articles__product')).annotate(
+            units = Sum('line_units'), revenue = Sum('line_revenue')
+        ):
+            # ORDERS WITHOUT ARTICLES
+            if row['product_id'] is None:
+                continue
+            units[row['date']] = units.get(row['date'], 0) + row['units']
+            products.append(DailyProductSales(**row))
+        DailyProductSales.objects.bulk_create(products, batch_size = 1000)
+
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(**row)
+            for row in lines.values('date', category_id = F('order__articles__product__category')).annotate(
+                units = Sum('line_units'), revenue = Sum('line_revenue')
+            )
+            if row['category_id'] is not None
+        ], batch_size = 1000)
+
+        DailySales.objects.bulk_create([
+            DailySales(units = units.get(row['date'], 0), **row)
+            for row in entries.values('date').annotate(
+                orders = Count('pk', filter = paid & Q(order__isnull = False)),
+                revenue = Coalesce(Sum('amount', filter = paid), Value(0), output_field = money),
+                refunds = Count('pk', filter = refunded),
+                refunded = Coalesce(Sum('amount', filter = refunded), Value(0), output_field = money),
+            )
+        ], batch_size = 1000)
+
+        DailyTransactions.objects.bulk_create([
+            DailyTransactions(**row)
+            for row in entries.values('date', 'provider', 'status').annotate(
+                count = Count('pk'), amount = Sum('amount')
+            )
+        ], batch_size = 1000)
+
+        return entries.count()
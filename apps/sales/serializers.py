@@ -0,0 +1,15 @@
+from rest_framework import serializers
+
+from apps.sales.models import DailySales
+
+####
+##      DAILY SALES SERIALIZER
+#####
+class DailySalesSerializer(serializers.ModelSerializer):
+    ''' Serializer class for Daily Sales Model. '''
+
+    # META CLASS
+    class Meta:
+        ''' Meta class for Daily Sales Serializer. '''
+        model = DailySales
+        exclude = ('id',)
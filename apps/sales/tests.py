@@ -0,0 +1,130 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.billings.models import Transaction
+from apps.categories.models import Category
+from apps.orders.models import Article, Order
+from apps.products.models import Product
+from apps.sales.models import (
+    SaleEntry,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    DailyTransactions,
+)
+from apps.sales.rollups import ROLLUPS, record
+
+# Create your tests here.
+
+
+####
+##      SALES ROLLUPS TEST CASE
+#####
+@override_settings(OUTBOX = {'ASYNC': False})
+@patch('apps.billings.handlers.send_transaction_update')
+@patch('apps.billings.tasks.PaymentService')
+class SalesRollupsTestCase(TestCase):
+    ''' Ensure rollups follow payments once, can be rebuilt and back the dashboard. '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'buyer', 'P@ssw0rd',
+            email = 'buyer@fakestore.com',
+            phone_number = '+22890000009'
+        )
+        cls.admin = User.objects.create_superuser(
+            'boss', 'boss@fakestore.com', 'P@ssw0rd', phone_number = '+22890000010'
+        )
+        cls.books = Category.objects.create(name = 'Books')
+        cls.games = Category.objects.create(name = 'Games')
+        cls.novel = Product.objects.create(name = 'Novel', brand = 'Acme', category = cls.books, price = 100)
+        cls.chess = Product.objects.create(name = 'Chess', brand = 'Acme', category = cls.games, price = 300)
+
+    def buy(self, *lines):
+        ''' Create a paid order of (product, quantity) lines, return its payment. '''
+
+        with self.captureOnCommitCallbacks(execute = True):
+            order = Order.objects.create(client = self.user)
+            for product, quantity in lines:
+                Article.objects.create(order = order, product = product, selling_price = product.price, quantity = quantity)
+            order.refresh_from_db()
+            payment = Transaction.objects.create(
+                user = self.user, order = order, amount = order.total, type = Transaction.TYPES.PAYMENT
+            )
+        self.change(payment, Transaction.STATUES.SUCCESSFUL)
+        return payment
+
+    def change(self, payment, status):
+        with self.captureOnCommitCallbacks(execute = True):
+            payment.status = status
+            payment.save()
+
+    def rollups(self):
+        return {
+            model.__name__: sorted(
+                tuple(value for field, value in row.items() if field != 'id')
+                for row in model.objects.values()
+            )
+            for model in ROLLUPS
+        }
+
+    def test_payments_are_rolled_up_once(self, service, notify):
+        payment = self.buy((self.novel, 2), (self.chess, 1))
+        self.buy((self.novel, 1))
+
+        # DELIVERED AGAIN, OR SAVED AGAIN WITH THE SAME STATUS
+        self.assertIsNone(record(payment, Transaction.STATUES.SUCCESSFUL))
+        self.change(payment, Transaction.STATUES.SUCCESSFUL)
+
+        today = DailySales.objects.get(date = timezone.localdate())
+        self.assertEqual((today.orders, today.revenue, today.units, today.refunds), (2, 600, 4, 0))
+        self.assertEqual(DailyProductSales.objects.get(product = self.novel).units, 3)
+        self.assertEqual(DailyCategorySales.objects.get(category = self.games).revenue, 300)
+        self.assertEqual(DailyTransactions.objects.get(status = Transaction.STATUES.SUCCESSFUL).count, 2)
+
+        self.change(payment, Transaction.STATUES.REFUNDED)
+        today.refresh_from_db()
+        self.assertEqual((today.orders, today.revenue, today.units, today.refunds, today.refunded), (2, 600, 1, 1, 500))
+        self.assertEqual(DailyCategorySales.objects.get(category = self.games).units, 0)
+
+    def test_rebuild_matches_incremental_rollups(self, service, notify):
+        refunded = self.buy((self.novel, 2), (self.chess, 1))
+        self.buy((self.chess, 3))
+        self.change(refunded, Transaction.STATUES.REFUNDED)
+        incremental = self.rollups()
+
+        call_command('rebuild_sales_rollups', stdout = StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+        # PAYMENTS NEVER RECORDED ARE RECORDED FROM TRANSACTIONS
+        SaleEntry.objects.all().delete()
+        call_command('rebuild_sales_rollups', stdout = StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_dashboard_reads_rollups_only(self, service, notify):
+        self.buy((self.novel, 2), (self.chess, 1))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        today = timezone.localdate().isoformat()
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = client.get('/sales/summary', {'date__gte': today, 'date__lte': today})
+            products = client.get('/sales/products', {'date__gte': today})
+            providers = client.get('/sales/providers')
+
+        self.assertEqual(summary.data['revenue'], 500)
+        self.assertEqual([row['product__name'] for row in products.data['results']], ['Chess', 'Novel'])
+        self.assertEqual(providers.data[0]['count'], 1)
+        self.assertFalse([q for q in queries if 'billings_transaction' in q['sql'] or 'orders_article' in q['sql']])
+
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/sales/summary').status_code, 403)
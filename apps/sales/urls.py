@@ -0,0 +1,15 @@
+from rest_framework import routers
+
+from apps.sales.views import (
+    SalesViewSet,
+)
+
+# INSTANCIATE DEFAULT ROUTER
+router = routers.DefaultRouter(trailing_slash = False)
+
+# SALES DASHBOARD URLS
+router.register(
+    '', SalesViewSet
+)
+
+urlpatterns = router.urls
@@ -0,0 +1,94 @@
+from django.db.models import Sum
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.viewsets import ReadOnlyModelViewSet
+from rest_framework.permissions import (
+    IsAuthenticated, IsAdminUser
+)
+
+from apps.sales.models import (
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    DailyTransactions,
+)
+from apps.sales.serializers import DailySalesSerializer
+
+# Create your views here.
+
+####
+##      SALES DASHBOARD VIEWSET
+#####
+class SalesViewSet(ReadOnlyModelViewSet):
+    '''
+    Sales dashboard for admins, read from the daily rollups only
+    (apps.sales.rollups). Every endpoint takes a ?date__gte= / ?date__lte= range.
+    '''
+
+    queryset = DailySales.objects.all()
+    serializer_class = DailySalesSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        'date': ['exact', 'gte', 'lte'],
+    }
+    lookup_field = 'date'
+
+    def get_rollup(self, model):
+        ''' Return the rows of a rollup table in the requested date range. '''
+
+        return self.filter_queryset(model.objects.order_by())
+
+    def paginated(self, rows):
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
+
+    @action(methods=['GET'], detail=False)
+    def summary(self, request):
+        ''' Totals over the date range. '''
+
+        totals = self.get_rollup(DailySales).aggregate(
+            orders = Sum('orders'), revenue = Sum('revenue'),
+            refunds = Sum('refunds'), refunded = Sum('refunded'),
+            units = Sum('units'),
+        )
+        return Response({field: value or 0 for field, value in totals.items()})
+
+    @action(methods=['GET'], detail=False)
+    def products(self, request):
+        ''' Best selling products over the date range. '''
+
+        return self.paginated(
+            self.get_rollup(DailyProductSales).values(
+                'product', 'product__code', 'product__name'
+            ).annotate(
+                units = Sum('units'), revenue = Sum('revenue')
+            ).order_by('-revenue', 'product')
+        )
+
+    @action(methods=['GET'], detail=False)
+    def categories(self, request):
+        ''' Best selling categories over the date range. '''
+
+        return self.paginated(
+            self.get_rollup(DailyCategorySales).values(
+                'category', 'category__code', 'category__name'
+            ).annotate(
+                units = Sum('units'), revenue = Sum('revenue')
+            ).order_by('-revenue', 'category')
+        )
+
+    @action(methods=['GET'], detail=False)
+    def providers(self, request):
+        ''' Payments per provider and status over the date range. '''
+
+        return Response(list(
+            self.get_rollup(DailyTransactions).values(
+                'provider', 'status'
+            ).annotate(
+                count = Sum('count'), amount = Sum('amount')
+            ).order_by('provider', 'status')
+        ))
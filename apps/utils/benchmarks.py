@@ -0,0 +1,98 @@
+""" Helpers shared by benchmark management commands. """
+
+import time
+import statistics
+from abc import ABC, abstractmethod
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+####
+##      BASE BENCHMARK COMMAND
+#####
+class BenchmarkCommand(ABC, BaseCommand):
+    """
+    Base class for benchmark commands.
+
+    Fixtures are created inside a transaction that is rolled back once
+    the benchmark is done, so the database is left untouched.
+    """
+
+    def add_arguments(self, parser):
+        """Add common benchmark arguments"""
+
+        parser.add_argument(
+            '-r', '--repeat', type = int, default = 5,
+            help = 'Number of runs per measure'
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark inside a rolled back transaction"""
+
+        self.repeat = options.get('repeat')
+        with transaction.atomic():
+            try:
+                self.run(**options)
+            finally:
+                transaction.set_rollback(True)
+
+    @abstractmethod
+    def run(self, **options):
+        """Benchmark body, to be implemented by subclasses"""
+
+    def measure(self, label, func):
+        """Run func `repeat` times and report best and median timings in ms"""
+
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        best, median = min(timings), statistics.median(timings)
+        self.stdout.write(f'{label:<50} best {best:>9.2f} ms   median {median:>9.2f} ms')
+        return median
+
+    def count_queries(self, func):
+        """Run func once and return the number of SQL queries it executed"""
+
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            func()
+        return count
+
+
+def seed_products(count, categories = 20, chunk_size = 5000):
+    """Bulk create `count` synthetic products spread over `categories` categories"""
+
+    from apps.categories.models import Category
+    from apps.products.models import Product
+
+    words = (
+        'phone', 'laptop', 'shirt', 'shoes', 'coffee', 'watch', 'camera',
+        'speaker', 'bag', 'lamp', 'chair', 'guitar', 'bike', 'perfume',
+    )
+    cats = [
+        Category.objects.create(name = f'Bench {words[i % len(words)]} {i}')
+        for i in range(categories)
+    ]
+    products = []
+    for start in range(0, count, chunk_size):
+        products += Product.objects.bulk_create([
+            Product(
+                code = f'PRD-BENCH-{i}',
+                name = f'{words[i % len(words)]} {words[(i * 7) % len(words)]} {i}',
+                brand = f'brand{i % 50}',
+                description = f'A {words[(i * 3) % len(words)]} for everyday use, item {i}.',
+                category = cats[i % categories],
+                price = i % 1000,
+            )
+            for i in range(start, min(start + chunk_size, count))
+        ])
+    return cats, products
@@ -0,0 +1,247 @@
+"""
+Responsive image derivatives.
+
+Uploaded images are resized and re-encoded (thumb, card, full in WebP and
+JPEG) after the upload transaction commits. Rendering runs in a process pool
+fed by a background thread, so the request that saved the image never waits
+for Pillow. Generated files are recorded in the model's `derivatives` JSON
+field, keyed by image field name together with the source file they were
+rendered from.
+"""
+
+import io
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'SIZES': {'thumb': 160, 'card': 480, 'full': 1200},
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_lock = threading.Lock()
+_process_pool = None
+_jobs = None
+
+
+def get_config():
+    ''' Return IMAGE_DERIVATIVES settings merged with defaults. '''
+
+    return {**DEFAULTS, **getattr(settings, 'IMAGE_DERIVATIVES', {})}
+
+
+def get_process_pool(workers=None):
+    ''' Return the shared rendering process pool. '''
+
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers or get_config()['WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _process_pool
+
+
+def get_job_pool():
+    ''' Return the background thread pool reading sources and storing results. '''
+
+    global _jobs
+    with _lock:
+        if _jobs is None:
+            _jobs = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+        return _jobs
+
+
+def render(data: bytes, sizes: dict, formats, quality: int) -> dict:
+    '''
+    Render every size/format derivative of an image.
+
+    Runs in pool processes: only depends on Pillow.
+    Returns {size_name: {format: bytes}}.
+    '''
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        rendered = {}
+        for name, width in sizes.items():
+            image = source.copy()
+            image.thumbnail((width, width * 4))
+            rendered[name] = {}
+            for fmt in formats:
+                output = image
+                if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                    output = Image.new('RGB', image.size, (255, 255, 255))
+                    output.paste(image.convert('RGBA'), mask=image.convert('RGBA'))
+                buffer = io.BytesIO()
+                output.save(buffer, format=fmt.upper(), quality=quality, optimize=True)
+                rendered[name][fmt] = buffer.getvalue()
+        return rendered
+
+
+def image_fields(instance):
+    ''' Return names of the instance's fields handled by the pipeline. '''
+
+    return getattr(instance, 'DERIVATIVE_FIELDS', ())
+
+
+def stale_fields(instance, force=False):
+    ''' Return image fields whose derivatives are missing or rendered from another file. '''
+
+    derivatives = instance.derivatives or {}
+    return [
+        name for name in image_fields(instance)
+        if getattr(instance, name) and (
+            force or derivatives.get(name, {}).get('source') != getattr(instance, name).name
+        )
+    ]
+
+
+def read_source(instance, field_name):
+    ''' Return the bytes of an image field. '''
+
+    field_file = getattr(instance, field_name)
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        return f.read()
+
+
+def store(instance, field_name, rendered):
+    ''' Write rendered derivatives next to the source file, return the field entry. '''
+
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+
+    # REMOVE FILES RENDERED FROM A PREVIOUS SOURCE
+    previous = (instance.derivatives or {}).get(field_name, {})
+    for formats in previous.get('sizes', {}).values():
+        for name in formats.values():
+            storage.delete(name)
+
+    sizes = {}
+    for size, formats in rendered.items():
+        sizes[size] = {}
+        for fmt, content in formats.items():
+            name = os.path.join(directory, 'derivatives', f'{stem}.{size}.{EXTENSIONS[fmt]}')
+            sizes[size][fmt] = storage.save(name, ContentFile(content))
+    return {'source': field_file.name, 'sizes': sizes}
+
+
+def build(instance, executor=None, force=False):
+    '''
+    Render and store derivatives of every stale image field of instance.
+
+    Return the updated `derivatives` value, or None when nothing was stale.
+    Only touches the storage, callers record the result in the database.
+    '''
+
+    config = get_config()
+    fields = stale_fields(instance, force=force)
+    if not fields:
+        return None
+
+    jobs = {}
+    for name in fields:
+        args = (read_source(instance, name), config['SIZES'], config['FORMATS'], config['QUALITY'])
+        jobs[name] = executor.submit(render, *args) if executor else args
+
+    derivatives = dict(instance.derivatives or {})
+    for name, job in jobs.items():
+        try:
+            rendered = job.result() if executor else render(*job)
+            derivatives[name] = store(instance, name, rendered)
+        except Exception as e:
+            # NOT AN IMAGE (OR BROKEN): REMEMBER THE SOURCE TO NOT RETRY ON EVERY SAVE
+            logger.warning(f"Failed rendering derivatives of {instance} {name}: {str(e)}")
+            derivatives[name] = {'source': getattr(instance, name).name, 'sizes': {}}
+    return derivatives
+
+
+def record(instance, derivatives):
+    '''
+    Save derivatives on instance. post_save receivers invalidate cached
+    responses, receivers with costlier side effects (search reindexing)
+    skip saves where `is_derivatives_update(update_fields)`.
+    '''
+
+    instance.derivatives = derivatives
+    # save_base SKIPS save() OVERRIDES (Category paths), post_save SEES update_fields AS IS
+    instance.save_base(update_fields=['derivatives'])
+
+
+def is_derivatives_update(update_fields):
+    ''' Is a post_save the recording of derivatives only. '''
+
+    return update_fields is not None and set(update_fields) == {'derivatives'}
+
+
+def generate(instance, executor=None, force=False):
+    ''' Build and record derivatives of instance, return False when nothing was stale. '''
+
+    derivatives = build(instance, executor=executor, force=force)
+    if derivatives is None:
+        return False
+    record(instance, derivatives)
+    return True
+
+
+def _run_job(model, pk):
+    ''' Background job: generate derivatives of one instance in the process pool. '''
+
+    from django.db import close_old_connections
+
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is not None:
+            generate(instance, executor=get_process_pool())
+    except Exception as e:
+        logger.error(f"Image derivatives job failed for {model.__name__} {pk}: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def schedule(instance):
+    ''' Generate derivatives of instance once the current transaction commits. '''
+
+    from django.db import transaction
+
+    if not stale_fields(instance):
+        return
+
+    model, pk = instance.__class__, instance.pk
+    if get_config()['ASYNC']:
+        transaction.on_commit(lambda: get_job_pool().submit(_run_job, model, pk))
+    else:
+        transaction.on_commit(lambda: generate(model.objects.get(pk=pk)))
+
+
+def srcset(instance, field_name, request=None):
+    ''' Return {size: {format: url}} of the derivatives of an image field. '''
+
+    field_file = getattr(instance, field_name)
+    entry = (instance.derivatives or {}).get(field_name, {})
+    if not field_file or entry.get('source') != field_file.name:
+        return {}
+
+    def url(name):
+        location = field_file.storage.url(name)
+        return request.build_absolute_uri(location) if request else location
+
+    return {
+        size: {fmt: url(name) for fmt, name in formats.items()}
+        for size, formats in entry.get('sizes', {}).items()
+    }
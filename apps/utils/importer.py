@@ -0,0 +1,319 @@
+"""
+Bulk product import engine behind `manage.py populate`.
+
+Records are stream-parsed from the source JSON array and imported in chunks:
+images of a chunk are downloaded concurrently through a pooled HTTP session
+and streamed to the media storage, then the chunk's products and medias are
+bulk created in one transaction, their derivatives rendered once it commits.
+A checkpoint file records how many records were imported, so an interrupted
+import resumes after the last committed chunk.
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from apps.categories.models import Category
+from apps.products.models import Product, ProductMedia
+from apps.products.search import get_search_backend
+from apps.utils import images
+from apps.utils.script import determine_extension, clean_filename
+from core.cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE = os.path.join(settings.BASE_DIR, 'apps', 'utils', 'products.json')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def iter_json_array(path, buffer_size=65536):
+    ''' Yield the items of a top-level JSON array without loading the whole file. '''
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, started, eof = '', 0, False, False
+        while True:
+            # SKIP WHITESPACES, SEPARATORS AND THE OPENING BRACKET
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[':
+                if buffer[position] == '[':
+                    started = True
+                position += 1
+            if started and position < len(buffer) and buffer[position] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # INCOMPLETE ITEM: READ MORE
+                if eof:
+                    if buffer[position:].strip():
+                        raise
+                    return
+                chunk = f.read(buffer_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+
+            yield item
+            position = end
+
+
+####
+##      IMPORT STATS
+#####
+class ImportStats:
+    ''' Counters reported when an import finishes. '''
+
+    def __init__(self, **counters):
+        self.products = counters.get('products', 0)
+        self.skipped = counters.get('skipped', 0)
+        self.medias = counters.get('medias', 0)
+        self.failed_downloads = counters.get('failed_downloads', 0)
+        self.bytes = counters.get('bytes', 0)
+        self.started = time.perf_counter()
+
+    def as_dict(self):
+        return {
+            'products': self.products,
+            'skipped': self.skipped,
+            'medias': self.medias,
+            'failed_downloads': self.failed_downloads,
+            'bytes': self.bytes,
+        }
+
+    def report(self):
+        ''' Return a human readable throughput summary. '''
+
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        return (
+            f'{self.products} products ({self.products / elapsed:.1f}/s), '
+            f'{self.skipped} skipped, {self.medias} medias '
+            f'({self.bytes / elapsed / 1024 / 1024:.2f} MB/s), '
+            f'{self.failed_downloads} failed downloads in {elapsed:.1f}s'
+        )
+
+
+####
+##      PRODUCT IMPORTER
+#####
+class ProductImporter:
+    """
+    Import products (and their images) from a JSON array of records.
+
+    Products already in database (same name) are skipped, like the former
+    get_or_create based script did.
+    """
+
+    def __init__(
+        self, source=DEFAULT_SOURCE, limit=None, chunk_size=100, workers=8,
+        checkpoint=None, download=True, session=None, storage=default_storage
+    ):
+        self.source = source
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.checkpoint = checkpoint or f'{source}.checkpoint'
+        self.download = download
+        self.storage = storage
+        self.session = session or self.build_session(workers)
+        self.categories = {}
+
+    @staticmethod
+    def build_session(workers):
+        ''' Return a keep-alive HTTP session sized for `workers` concurrent downloads. '''
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=workers, pool_maxsize=workers,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    ## CHECKPOINT
+    def load_checkpoint(self):
+        ''' Return (position, counters) saved by an interrupted import of the same source. '''
+
+        try:
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0, {}
+        if state.get('source') != os.path.abspath(self.source):
+            return 0, {}
+        return state['position'], state.get('stats', {})
+
+    def save_checkpoint(self, position, stats):
+        ''' Atomically record the number of records imported so far. '''
+
+        temp = f'{self.checkpoint}.tmp'
+        with open(temp, 'w') as f:
+            json.dump({
+                'source': os.path.abspath(self.source),
+                'position': position,
+                'stats': stats.as_dict(),
+            }, f)
+        os.replace(temp, self.checkpoint)
+
+    def clear_checkpoint(self):
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    ## CATEGORIES
+    def get_category(self, name):
+        ''' Return the category named name, created once per import. '''
+
+        if name not in self.categories:
+            self.categories[name], _ = Category.objects.get_or_create(
+                name=name, defaults={'description': name}
+            )
+        return self.categories[name]
+
+    ## IMAGES
+    def media_path(self, product_name, filename):
+        ''' Same location as ProductMedia.get_upload_dir. '''
+
+        return f'products/{product_name}/{filename}'
+
+    def fetch(self, product_name, url):
+        '''
+        Stream an image to the storage, return (stored name, size) or None.
+
+        Images already stored by an interrupted run are reused.
+        '''
+
+        extension = os.path.splitext(unquote(url).split('?')[0])[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            name = self.media_path(product_name, clean_filename(url, extension[1:]))
+            if self.storage.exists(name):
+                return name, 0
+
+        try:
+            with self.session.get(url, stream=True, timeout=(5, 30)) as response:
+                response.raise_for_status()
+                with tempfile.TemporaryFile() as temp:
+                    size, extension = 0, None
+                    for chunk in response.iter_content(chunk_size=65536):
+                        extension = extension or determine_extension(chunk)
+                        temp.write(chunk)
+                        size += len(chunk)
+                    temp.seek(0)
+                    name = self.media_path(product_name, clean_filename(url, extension or 'jpg'))
+                    return self.storage.save(name, File(temp, name=name)), size
+        except Exception as e:
+            logger.warning(f"Download failed for {url}: {str(e)}")
+            return None
+
+    ## IMPORT
+    def build_products(self, records):
+        ''' Return (product, record) pairs of records not imported yet. '''
+
+        names = {record.get('name') for record in records}
+        existing = set(
+            Product.objects.filter(name__in=names).values_list('name', flat=True)
+        )
+
+        pairs, seen = [], set()
+        for record in records:
+            name = record.get('name')
+            if not name or name in existing or name in seen:
+                continue
+            seen.add(name)
+            product = Product(
+                name=name,
+                brand='dm_product',
+                description=record.get('description') or 'No description',
+                category=self.get_category(record['dmCategorie'][0]['name']),
+                price=record.get('original_price') or 0,
+            )
+            # bulk_create DOES NOT CALL save()
+            product.clean()
+            pairs.append((product, record))
+        return pairs
+
+    def import_chunk(self, records, pool, stats):
+        ''' Download images of records, then create their products and medias at once. '''
+
+        pairs = self.build_products(records)
+        stats.skipped += len(records) - len(pairs)
+        if not pairs:
+            return
+
+        jobs = []
+        for product, record in pairs:
+            for media in record.get('medias') or []:
+                if media.get('type') == 'IMG' and media.get('file') and self.download:
+                    jobs.append((product, media, pool.submit(self.fetch, product.name, media['file'])))
+
+        medias = []
+        for product, media, future in jobs:
+            result = future.result()
+            if result is None:
+                stats.failed_downloads += 1
+                continue
+            name, size = result
+            stats.bytes += size
+            item = ProductMedia(
+                product=product,
+                title=(media.get('id') or 'No title yet.')[:255],
+                description=f'Image for {product.name}',
+                file=name,
+            )
+            item.clean()
+            medias.append(item)
+
+        with transaction.atomic():
+            Product.objects.bulk_create([product for product, _ in pairs])
+            ProductMedia.objects.bulk_create(medias)
+            # bulk_create SENDS NO post_save: SCHEDULE DERIVATIVES ONCE THE CHUNK COMMITS
+            for media in medias:
+                images.schedule(media)
+            get_search_backend().index(
+                Product.objects.filter(pk__in=[product.pk for product, _ in pairs])
+            )
+
+        stats.products += len(pairs)
+        stats.medias += len(medias)
+
+    def run(self, resume=True, progress=None):
+        ''' Import the source, return ImportStats. '''
+
+        position, counters = self.load_checkpoint() if resume else (0, {})
+        stats = ImportStats(**counters)
+
+        chunk = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='populate') as pool:
+            for index, record in enumerate(iter_json_array(self.source), start=1):
+                if self.limit is not None and index > self.limit:
+                    break
+                # ALREADY IMPORTED BY AN INTERRUPTED RUN
+                if index <= position:
+                    continue
+
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk, pool, stats)
+                    self.save_checkpoint(index, stats)
+                    chunk = []
+                    if progress:
+                        progress(index, stats)
+
+            if chunk:
+                self.import_chunk(chunk, pool, stats)
+
+        self.clear_checkpoint()
+        invalidate_tags('products', 'categories')
+        return stats
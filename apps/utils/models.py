@@ -60,6 +60,10 @@ class Media(TimeStampedUUIDModel):
     title = models.CharField(max_length = 255,default = 'No title yet.')
     description = models.TextField(default = 'No Description Yet.')
     file = models.FileField(upload_to = upload_to, max_length=3000)
+    derivatives = models.JSONField(default = dict, blank = True, editable = False)
+
+    # IMAGE FIELDS WITH RESPONSIVE DERIVATIVES (apps.utils.images)
+    DERIVATIVE_FIELDS = ('file',)
     
     class Meta:
         abstract = True
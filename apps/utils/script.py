@@ -1,33 +1,5 @@
-import json
 import os
-import requests
-from django.core.files import File
-from django.core.files.temp import NamedTemporaryFile
 from urllib.parse import unquote
-from django.conf import settings
-from apps.categories.models import Category
-from apps.products.models import (
-    ProductMedia,
-    Product
-)
-
-def get_products(limit: int = 100):
-    """ Load product data from JSON file """
-
-    with open(f"{settings.BASE_DIR}/apps/utils/products.json", "r") as f:
-        products = json.loads(f.read())
-    return products[:limit]
-
-def add_category(category_name):
-    """ Add products categories """
-    category, created = Category.objects.get_or_create(
-        name=category_name,
-        defaults={
-            "description": category_name
-        }
-    )
-    return category
-
 
 def determine_extension(file_content):
     """Detect the file type using magic numbers"""
@@ -41,34 +13,6 @@ def determine_extension(file_content):
         return 'webp'
     return 'jpg'
 
-def download_image(image_url):
-    """
-    Download an image from URL and return File object with correct extension
-    Args:
-        image_url (str): URL of the image to download
-    Returns:
-        Tuple (File object, extension) or (None, None) if failed
-    """
-    try:
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()
-
-        # Read content to determine actual image type
-        content = b''.join([chunk for chunk in response.iter_content(chunk_size=8192)])
-        extension = determine_extension(content)
-
-        # Create file with proper extension
-        img_temp = NamedTemporaryFile(delete=True, suffix=f'.{extension}')
-        img_temp.write(content)
-        img_temp.seek(0)
-
-        return File(img_temp), extension
-
-    except Exception as e:
-        print(f"Download failed for {image_url}: {str(e)}")
-        return None, None
-
-
 def clean_filename(url, extension):
     """
     Sanitize filename from URL and ensure proper extension
@@ -88,65 +32,13 @@ def clean_filename(url, extension):
     return basename
 
 
-def add_product_media(product, media_data):
-    """
-    Create ProductMedia entry for a product
-    Args:
-        product (Product): Product instance
-        media_data (dict): Media data from JSON
-    Returns:
-        ProductMedia or None if failed
-    """
-    if media_data.get("type") != "IMG":
-        return None
-
-    image_url = media_data.get("file")
-    if not image_url:
-        return None
-
-    image_file, extension = download_image(image_url)
-    if not image_file:
-        return None
-
-    try:
-        product_media = ProductMedia(
-            product=product,
-            title=media_data.get("id", "No title yet.")[:255],  # Respect CharField limit
-            description=f"Image for {product.name}"[:500],  # Truncate if too long
-        )
-
-        filename = clean_filename(image_url, extension)
-        product_media.file.save(filename, image_file, save=True)
-        return product_media
+def add_products(limit: int = 100, **options):
+    """ Add products and images (see apps.utils.importer). """
 
-    except Exception as e:
-        print(f"Failed creating media for {product.name}: {str(e)}")
-        return None
+    from apps.utils.importer import ProductImporter
 
-
-def add_products(limit: int = 100):
-    """ Add products and images. """
-
-    for p in get_products(limit):
-        category_name = p.get("dmCategorie")[0]["name"]
-        category = add_category(category_name)
-        product, created = Product.objects.get_or_create(
-            name=p.get("name"),
-            defaults={
-                "brand": "dm_product",
-                "description": p.get("description", "No description"),
-                "category": category,
-                "price": p.get("original_price", 0)
-            }
-        )
-        if created:
-            # Import media only for newly created products
-            for media in p.get("medias"):
-                add_product_media(product, media)
+    stats = ProductImporter(limit=limit, **options).run()
 
     print("=== Import completed ===")
-    print(f"Products: {Product.objects.count()}")
-    print(f"Media files: {ProductMedia.objects.count()}")
-
-# if __name__ == "__main__":
-#     add_products()
\ No newline at end of file
+    print(stats.report())
+    return stats
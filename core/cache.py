@@ -0,0 +1,278 @@
+"""
+Tag-invalidated response cache for Fake Shop API.
+
+Anonymous list/retrieve responses are cached under their normalized path and
+query string. Every entry is stored with the versions of its tags, an entry is
+a miss as soon as one of its tags has been invalidated since it was stored.
+
+Versions of the tags known from the request alone (namespace, object id) are
+read before the response is computed, so a write committed while it runs
+invalidates the entry. Tags found in the response content (embedded objects)
+are read afterwards. Writes invalidate their tags immediately and again once
+their transaction commits, so a read that cached the old rows in between is
+not served afterwards.
+
+Tag versions live in the cache: a process-local cache (LocMemCache) keeps
+them per worker, so entries are then only kept RESPONSE_CACHE_LOCAL_TIMEOUT
+seconds.
+"""
+
+import time
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'response-cache'
+
+_process_local_warnings = set()
+
+
+def is_process_local(alias, feature):
+    '''
+    Return True if cache `alias` is private to this process (LocMemCache):
+    values written by one worker are never seen by the others. Logs a
+    warning once per process and feature.
+    '''
+
+    if not isinstance(caches[alias], LocMemCache):
+        return False
+    if feature not in _process_local_warnings:
+        _process_local_warnings.add(feature)
+        logger.warning(
+            f"{feature} is stored in the process-local '{alias}' cache, other workers "
+            f"will not see its updates: configure a shared cache (CACHE_REDIS_URL)."
+        )
+    return True
+
+
+####
+##      RESPONSE CACHE
+#####
+class ResponseCache:
+    ''' Response entries and tag versions stored in a Django cache backend. '''
+
+    def __init__(self, alias='default', timeout=None):
+        self.cache = caches[alias]
+        self.timeout = timeout if timeout is not None else getattr(
+            settings, 'RESPONSE_CACHE_TIMEOUT', 300
+        )
+        # OTHER WORKERS NEVER SEE OUR INVALIDATIONS, BOUND HOW LONG THEY SERVE STALE ENTRIES
+        if is_process_local(alias, 'Response cache tag versions'):
+            self.timeout = min(self.timeout, getattr(settings, 'RESPONSE_CACHE_LOCAL_TIMEOUT', 5))
+
+    def entry_key(self, namespace, request):
+        ''' Return the cache key of a request: normalized path and sorted query. '''
+
+        params = sorted(
+            (key, sorted(values)) for key, values in request.query_params.lists()
+        )
+        raw = f'{request.path.rstrip("/")}|{params}'
+        return f'{KEY_PREFIX}:{namespace}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def tag_key(self, tag):
+        return f'{KEY_PREFIX}:tag:{tag}'
+
+    def tag_versions(self, tags):
+        ''' Return the current version of every tag, creating missing ones. '''
+
+        keys = {self.tag_key(tag): tag for tag in tags}
+        versions = self.cache.get_many(list(keys))
+        for key in keys:
+            if key not in versions:
+                # ADD DOES NOT OVERWRITE A VERSION SET BY ANOTHER WORKER MEANWHILE
+                self.cache.add(key, time.time_ns(), None)
+                versions[key] = self.cache.get(key)
+        return {keys[key]: version for key, version in versions.items()}
+
+    def get(self, namespace, request):
+        ''' Return a fresh cached entry for request, or None. '''
+
+        entry = self.cache.get(self.entry_key(namespace, request))
+        if entry is not None:
+            current = self.cache.get_many(
+                [self.tag_key(tag) for tag in entry['tags']]
+            )
+            if all(
+                current.get(self.tag_key(tag)) == version
+                for tag, version in entry['tags'].items()
+            ):
+                self.count(namespace, 'hits')
+                return entry
+
+        self.count(namespace, 'misses')
+        return None
+
+    def set(self, namespace, request, response, versions):
+        ''' Store response data and headers with the versions of their tags. '''
+
+        self.cache.set(
+            self.entry_key(namespace, request),
+            {
+                'data': response.data,
+                'headers': {
+                    header: response[header]
+                    for header in ('ETag', 'Last-Modified')
+                    if header in response
+                },
+                'tags': versions,
+            },
+            self.timeout
+        )
+
+    def invalidate(self, *tags):
+        ''' Invalidate every entry tagged with one of tags. '''
+
+        version = time.time_ns()
+        self.cache.set_many(
+            {self.tag_key(tag): version for tag in tags}, None
+        )
+
+    def count(self, namespace, counter):
+        ''' Increment a hit/miss counter. '''
+
+        key = f'{KEY_PREFIX}:stats:{namespace}:{counter}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 0, None)
+            self.cache.incr(key)
+
+    def stats(self, namespaces):
+        ''' Return hit/miss counters and hit ratio per namespace. '''
+
+        stats = {}
+        for namespace in namespaces:
+            hits = self.cache.get(f'{KEY_PREFIX}:stats:{namespace}:hits', 0)
+            misses = self.cache.get(f'{KEY_PREFIX}:stats:{namespace}:misses', 0)
+            stats[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return stats
+
+
+# NAMESPACES REGISTERED BY CachedResponseMixin SUBCLASSES
+NAMESPACES = set()
+
+
+def get_response_cache():
+    ''' Return the response cache bound to the configured backend. '''
+
+    return ResponseCache(getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default'))
+
+
+def invalidate_tags(*tags):
+    '''
+    Invalidate cached responses tagged with tags, now and once the current
+    transaction commits, never failing the caller.
+    '''
+
+    def invalidate():
+        try:
+            get_response_cache().invalidate(*tags)
+        except Exception as e:
+            logger.error(f"Failed to invalidate response cache tags {tags}: {str(e)}")
+
+    invalidate()
+    # A READ BEFORE THE COMMIT MAY HAVE CACHED THE OLD ROWS UNDER THE NEW VERSIONS
+    transaction.on_commit(invalidate)
+
+
+####
+##      CACHED RESPONSE MIXIN
+#####
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching anonymous list and retrieve responses.
+
+    Subclasses set `cache_namespace`. Lists are tagged "<namespace>", retrieves
+    "<namespace>:<id>", plus the tags returned by `get_response_cache_tags`.
+    """
+
+    cache_namespace = None
+    cached_actions = ('list', 'retrieve')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_namespace:
+            NAMESPACES.add(cls.cache_namespace)
+
+    def get_request_cache_tags(self, request):
+        ''' Return the tags known before computing the response. '''
+
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return [f'{self.cache_namespace}:{self.kwargs[lookup_url_kwarg]}']
+        return [self.cache_namespace]
+
+    def get_response_cache_tags(self, request, response):
+        ''' Return the tags of objects embedded in the response content. '''
+
+        return []
+
+    def is_cacheable(self, request):
+        return (
+            request.method in ('GET', 'HEAD') and
+            self.action in self.cached_actions and
+            not request.user.is_authenticated
+        )
+
+    def dispatch_cached(self, request, handler, *args, **kwargs):
+        ''' Serve request from the cache when possible, else store the handler response. '''
+
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        response_cache = get_response_cache()
+        entry = response_cache.get(self.cache_namespace, request)
+        if entry is not None:
+            etag = entry['headers'].get('ETag')
+            last_modified = entry['headers'].get('Last-Modified')
+            response = get_conditional_response(
+                request._request,
+                etag=etag,
+                last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+            ) if etag else None
+            response = response or Response(entry['data'])
+            for header, value in entry['headers'].items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            patch_vary_headers(response, ('Authorization', 'Cookie'))
+            return response
+
+        versions = response_cache.tag_versions(self.get_request_cache_tags(request))
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'data'):
+            tags = set(self.get_response_cache_tags(request, response)) - set(versions)
+            versions.update(response_cache.tag_versions(tags))
+            response_cache.set(self.cache_namespace, request, response, versions)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.dispatch_cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.dispatch_cached(request, super().retrieve, *args, **kwargs)
+
+
+## CACHE STATS VIEW
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    ''' Return response cache hit/miss counters for monitoring. '''
+
+    return Response(
+        get_response_cache().stats(sorted(NAMESPACES))
+    )
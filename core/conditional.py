@@ -0,0 +1,102 @@
+"""
+Conditional GET support for Fake Shop API viewsets.
+
+Validators are computed with a single aggregate query on the filtered
+queryset, before anything is serialized, and requests carrying a matching
+If-None-Match / If-Modified-Since header get a 304 without a body.
+"""
+
+import hashlib
+from datetime import datetime
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+####
+##      CONDITIONAL GET MIXIN
+#####
+class ConditionalGetMixin:
+    """
+    ViewSet mixin adding ETag / Last-Modified validators to list and retrieve.
+
+    The ETag covers the path, the query parameters, the requesting user and
+    the aggregates returned by `get_conditional_aggregates`, so deletions
+    (row count) and per-user fields are accounted for. Retrieve responses
+    also carry Last-Modified, the most recent datetime aggregate; lists do
+    not, as a deletion or a row leaving the filter never makes it newer.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def get_conditional_queryset(self):
+        ''' Return the queryset whose rows end up in the response. '''
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return queryset
+
+    def get_conditional_aggregates(self):
+        ''' Return the aggregates the validators are built from. '''
+
+        return {
+            'count': Count('pk'),
+            'modified': Max('modified'),
+        }
+
+    def get_validators(self, request):
+        ''' Return (etag, last_modified) for the current request, or (None, None); lists have no last_modified. '''
+
+        values = self.get_conditional_queryset().order_by().aggregate(
+            **self.get_conditional_aggregates()
+        )
+
+        # NOTHING TO VALIDATE, LET THE VIEW ANSWER (EMPTY LIST OR 404)
+        if not values.get('count'):
+            return None, None
+
+        user = request.user.pk if request.user.is_authenticated else 'anonymous'
+        params = sorted(request.query_params.lists())
+        fingerprint = '|'.join(
+            str(part) for part in (request.path, params, user, sorted(values.items()))
+        )
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+        if self.action != 'retrieve':
+            return etag, None
+
+        dates = [v for v in values.values() if isinstance(v, datetime)]
+        last_modified = int(max(dates).timestamp()) if dates else None
+        return etag, last_modified
+
+    def dispatch_conditional(self, request, handler, *args, **kwargs):
+        ''' Answer 304 when validators match, else run handler and set the validators. '''
+
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        response = not_modified or handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.dispatch_conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.dispatch_conditional(request, super().retrieve, *args, **kwargs)
@@ -486,4 +486,42 @@ class TokenError(SecurityError):
             detail=detail or _("Token error"),
             code="TOKEN_ERROR",
             **kwargs
-        ) 
\ No newline at end of file
+        ) 
+
+# Idempotency Related Exceptions
+class IdempotencyError(FakeShopBaseException):
+    """Base exception for all Idempotency-Key errors."""
+    default_status_code = status.HTTP_400_BAD_REQUEST
+
+    def __init__(self, detail=None, **kwargs):
+        super().__init__(
+            detail=detail or _("Invalid Idempotency-Key header"),
+            code="IDEMPOTENCY_KEY_INVALID",
+            **kwargs
+        )
+
+
+class IdempotencyKeyReusedError(IdempotencyError):
+    """Raised when an Idempotency-Key is reused with a different request."""
+    default_status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def __init__(self, detail=None, **kwargs):
+        FakeShopBaseException.__init__(
+            self,
+            detail=detail or _("Idempotency-Key already used with a different request"),
+            code="IDEMPOTENCY_KEY_REUSED",
+            **kwargs
+        )
+
+
+class IdempotencyKeyInProgressError(IdempotencyError):
+    """Raised when the request holding an Idempotency-Key is still running."""
+    default_status_code = status.HTTP_409_CONFLICT
+
+    def __init__(self, detail=None, **kwargs):
+        FakeShopBaseException.__init__(
+            self,
+            detail=detail or _("A request with this Idempotency-Key is still in progress"),
+            code="IDEMPOTENCY_KEY_IN_PROGRESS",
+            **kwargs
+        )
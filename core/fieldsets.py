@@ -0,0 +1,116 @@
+"""
+Sparse fieldsets and opt-in expansions for Fake Shop API serializers.
+
+`?fields=id,name,price` selects top-level fields, `?expand=articles.product`
+opts into nested relations (dotted paths expand deeper levels). Without any
+of these parameters serializers keep their full representation.
+"""
+
+
+####
+##      FIELDSET
+#####
+class FieldSet:
+    """
+    Fields and relations requested for one serializer level.
+
+    `fields` is a set of field names (None: every field), `expand` a tree of
+    expanded relations (None: every relation, the full representation).
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @staticmethod
+    def parse_names(raw):
+        return [name.strip() for name in raw.split(',') if name.strip()]
+
+    @classmethod
+    def from_request(cls, request):
+        ''' Return the fieldset requested by "?fields=" and "?expand=". '''
+
+        params = getattr(request, 'query_params', None) or {}
+        fields, expand = params.get('fields'), params.get('expand')
+        if fields is None and expand is None:
+            return cls()
+
+        tree = {}
+        for path in cls.parse_names(expand or ''):
+            node = tree
+            for name in path.split('.'):
+                node = node.setdefault(name, {})
+
+        return cls(
+            fields = set(cls.parse_names(fields)) if fields is not None else None,
+            expand = tree
+        )
+
+    @property
+    def is_full(self):
+        return self.fields is None and self.expand is None
+
+    def includes(self, name):
+        ''' Is field `name` rendered at all. '''
+
+        return self.fields is None or name in self.fields or self.expands(name)
+
+    def includes_explicitly(self, name):
+        ''' Is field `name` listed in "?fields=", for fields never rendered by default. '''
+
+        return self.fields is not None and name in self.fields
+
+    def expands(self, name):
+        ''' Is relation `name` rendered as nested object(s). '''
+
+        return self.expand is None or name in self.expand
+
+    def expands_explicitly(self, name):
+        ''' Is relation `name` listed in "?expand=", for relations never expanded by default. '''
+
+        return self.expand is not None and name in self.expand
+
+    def nested(self, name):
+        ''' Return the fieldset of the objects of relation `name`. '''
+
+        return FieldSet(expand = None if self.expand is None else self.expand.get(name, {}))
+
+
+# FULL REPRESENTATION
+FULL = FieldSet()
+
+
+####
+##      SPARSE FIELDS SERIALIZER MIXIN
+#####
+class SparseFieldsMixin:
+    """
+    Serializer mixin rendering only the requested fields.
+
+    The root serializer reads the fieldset from the request, nested
+    serializers receive theirs through `nested_context`. Fields listed in
+    `custom_fields` are rendered by the subclass `to_representation`.
+    """
+
+    custom_fields = ()
+
+    @property
+    def fieldset(self) -> FieldSet:
+        if not hasattr(self, '_fieldset'):
+            fieldset = self.context.get('fieldset')
+            if fieldset is None:
+                fieldset = FieldSet.from_request(self.context.get('request'))
+            self._fieldset = fieldset
+        return self._fieldset
+
+    @property
+    def _readable_fields(self):
+        # UNREQUESTED FIELDS ARE NEVER COMPUTED
+        for field in super()._readable_fields:
+            if field.field_name not in self.custom_fields and self.fieldset.includes(field.field_name):
+                yield field
+
+    def nested_context(self, name):
+        ''' Return the context of the serializer rendering relation `name`. '''
+
+        return {**self.context, 'fieldset': self.fieldset.nested(name)}
@@ -0,0 +1,184 @@
+"""
+Idempotent creation for Fake Shop API viewsets.
+
+Clients send an `Idempotency-Key` header with create requests. The first
+request holding a key runs, then its response is stored under the key with a
+fingerprint of the request body; retries within `TTL` seconds get the stored
+response back without the view running again (no database write, no payment
+provider call). A retry arriving while the first request is still running
+waits for its response instead of racing it.
+
+Keys are scoped to the requesting user and path and live in a Django cache
+backend, `cache.add` making a single request the holder of a key. That cache
+must be shared by every worker (Redis or DatabaseCache): in a process-local
+LocMemCache two retries landing on different workers would both run.
+"""
+
+import json
+import time
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.cache import is_process_local
+from core.exceptions import (
+    IdempotencyError,
+    IdempotencyKeyReusedError,
+    IdempotencyKeyInProgressError,
+)
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+KEY_PREFIX = 'idempotency'
+MAX_KEY_LENGTH = 255
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    # STORED RESPONSES LIFETIME
+    'TTL': 24 * 3600,
+    # IN-FLIGHT MARKER LIFETIME, THE KEY OF A CRASHED REQUEST IS FREED AFTER IT
+    'LOCK_TIMEOUT': 60,
+    # HOW LONG A DUPLICATE WAITS FOR THE IN-FLIGHT REQUEST
+    'WAIT': 10,
+    'POLL_INTERVAL': 0.05,
+}
+
+
+def get_config():
+    ''' Return IDEMPOTENCY settings merged with defaults. '''
+
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+####
+##      IDEMPOTENCY STORE
+#####
+class IdempotencyStore:
+    '''
+    Idempotency keys stored in a Django cache backend.
+
+    An entry is {'fingerprint': ..., 'response': None} while its request runs
+    and holds the response to replay once it completed.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.cache = caches[self.config['CACHE_ALIAS']]
+        is_process_local(self.config['CACHE_ALIAS'], 'Idempotency keys')
+
+    def begin(self, key, fingerprint):
+        '''
+        Return the completed entry of key, or None once the caller holds key.
+
+        Waits up to `WAIT` seconds for a request holding key to complete.
+        '''
+
+        deadline = time.monotonic() + self.config['WAIT']
+        while True:
+            if self.cache.add(
+                key, {'fingerprint': fingerprint, 'response': None}, self.config['LOCK_TIMEOUT']
+            ):
+                return None
+
+            entry = self.cache.get(key)
+            # EXPIRED OR RELEASED MEANWHILE: TRY TO TAKE IT AGAIN
+            if entry is not None:
+                if entry['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReusedError()
+                if entry['response'] is not None:
+                    return entry
+
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgressError()
+            time.sleep(self.config['POLL_INTERVAL'])
+
+    def complete(self, key, fingerprint, response):
+        ''' Store the response of the request holding key. '''
+
+        self.cache.set(key, {
+            'fingerprint': fingerprint,
+            'response': {
+                'status': response.status_code,
+                # PLAIN JSON TYPES, AS RENDERED
+                'data': json.loads(json.dumps(response.data, cls = JSONEncoder)),
+                # CONTENT TYPE IS NEGOTIATED AGAIN ON REPLAY
+                'headers': {
+                    name: value for name, value in response.items()
+                    if name.lower() != 'content-type'
+                },
+            },
+        }, self.config['TTL'])
+
+    def release(self, key):
+        ''' Free key after a failure, so a retry runs again. '''
+
+        self.cache.delete(key)
+
+
+####
+##      IDEMPOTENT CREATE MIXIN
+#####
+class IdempotentCreateMixin:
+    """
+    ViewSet mixin replaying create responses of requests with the same
+    Idempotency-Key.
+
+    Only successful responses are stored: a failed request (validation error,
+    exception) frees its key and may be retried with it. Reusing a key with a
+    different body is rejected. Views overriding create wrap their own
+    implementation with `dispatch_idempotent`.
+    """
+
+    def get_idempotency_key(self, request):
+        ''' Return the store key of the request, None without Idempotency-Key header. '''
+
+        key = request.headers.get(HEADER)
+        if key is None:
+            return None
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError()
+
+        user = request.user.pk if request.user.is_authenticated else 'anonymous'
+        scope = f'{user}|{request.path.rstrip("/")}|{key}'
+        return f'{KEY_PREFIX}:{hashlib.sha256(scope.encode()).hexdigest()}'
+
+    def get_request_fingerprint(self, request):
+        ''' Return a digest of the request body, insensitive to key order. '''
+
+        body = json.dumps(request.data, sort_keys = True, cls = JSONEncoder)
+        return hashlib.sha256(f'{request.method}|{body}'.encode()).hexdigest()
+
+    def dispatch_idempotent(self, request, handler, *args, **kwargs):
+        ''' Replay the stored response of the key, else run handler and store its response. '''
+
+        key = self.get_idempotency_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        store = IdempotencyStore()
+        fingerprint = self.get_request_fingerprint(request)
+        entry = store.begin(key, fingerprint)
+        if entry is not None:
+            stored = entry['response']
+            response = Response(stored['data'], status = stored['status'], headers = stored['headers'])
+            response[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            store.release(key)
+            raise
+
+        if 200 <= response.status_code < 300:
+            store.complete(key, fingerprint, response)
+        else:
+            store.release(key)
+        return response
+
+    def create(self, request, *args, **kwargs):
+        return self.dispatch_idempotent(request, super().create, *args, **kwargs)
@@ -0,0 +1,216 @@
+"""
+Pagination classes for Fake Shop API.
+
+Lists are paginated with limit/offset by default. Keyset (cursor) pagination
+on (created, id) is used when a request sends "?cursor=" (empty for the first
+page) or when the view sets `cursor_pagination = True`. Keyset pages never
+run a COUNT query and stay stable while new rows are inserted. Views listing
+something else than a queryset set `cursor_pagination = None` to refuse
+cursors.
+"""
+
+import base64
+import binascii
+import simplejson as Json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from core.exceptions import DataValidationError
+
+
+####
+##      KEYSET PAGINATION
+#####
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on (created, id).
+
+    The scan direction follows the model's default ordering on `created`,
+    `id` breaks ties between rows created at the same time. Requests asking
+    for another order (?ordering=, search ranking) are rejected rather than
+    silently re-sorted.
+    """
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 1000
+    # PARAMETERS ORDERING RESULTS OTHERWISE (SEARCH FILTERS RANK THEIR MATCHES)
+    ordering_query_param = api_settings.ORDERING_PARAM
+    search_query_params = (api_settings.SEARCH_PARAM, 'q')
+
+    def get_limit(self, request):
+        ''' Return the requested page size. '''
+
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+            if limit > 0:
+                return min(limit, self.max_limit)
+        except (KeyError, ValueError):
+            pass
+        return self.default_limit
+
+    def is_descending(self, queryset):
+        ''' Return True if the model is ordered by "-created" by default. '''
+
+        return '-created' in (queryset.model._meta.ordering or [])
+
+    def encode_cursor(self, instance, reverse=False):
+        ''' Return an opaque cursor pointing at instance. '''
+
+        position = {
+            'c': instance.created.isoformat(),
+            'i': str(instance.pk),
+            'r': int(reverse),
+        }
+        return base64.urlsafe_b64encode(
+            Json.dumps(position).encode()
+        ).decode()
+
+    def decode_cursor(self, request, queryset):
+        ''' Return (created, id, reverse) from the request cursor, or None for the first page. '''
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = Json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created = parse_datetime(position['c'])
+            if created is None:
+                raise ValueError(position['c'])
+            pk = queryset.model._meta.pk.to_python(position['i'])
+            return created, pk, bool(position.get('r'))
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise DataValidationError(
+                details="Invalid cursor."
+            )
+
+    def check_ordering(self, request, queryset):
+        ''' Reject requests whose results are not in the keyset order. '''
+
+        ordering = request.query_params.get(self.ordering_query_param, '').strip()
+        default = '-created' if self.is_descending(queryset) else 'created'
+        searched = [
+            param for param in self.search_query_params
+            if request.query_params.get(param, '').strip()
+        ]
+        if ordering not in ('', default) or searched:
+            raise DataValidationError(
+                details=f"cursor can not be combined with {', '.join(searched or [self.ordering_query_param])}, use offset pagination."
+            )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.check_ordering(request, queryset)
+        self.limit = self.get_limit(request)
+        self.base_url = request.build_absolute_uri()
+
+        position = self.decode_cursor(request, queryset)
+        reverse = bool(position and position[2])
+
+        # WALK BACKWARDS WHEN FOLLOWING A "PREVIOUS" CURSOR
+        descending = self.is_descending(queryset) != reverse
+        if position:
+            created, pk, _ = position
+            lookup = 'lt' if descending else 'gt'
+            # THE LEADING RANGE ON "created" KEEPS THE (created, id) INDEX USABLE
+            queryset = queryset.filter(
+                Q(**{f'created__{lookup}e': created}),
+                Q(**{f'created__{lookup}': created}) | Q(**{f'pk__{lookup}': pk})
+            )
+        ordering = ('-created', '-pk') if descending else ('created', 'pk')
+
+        # FETCH ONE EXTRA ROW TO KNOW IF THERE IS ANOTHER PAGE
+        rows = list(queryset.order_by(*ordering)[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(self.page[0], reverse=True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+####
+##      DEFAULT PAGINATION
+#####
+class StandardPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination, switching to KeysetPagination when the request
+    sends a "cursor" parameter or when the view sets `cursor_pagination = True`.
+    Cursors are rejected on views setting `cursor_pagination = None`.
+    """
+
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request, view=None):
+        ''' Return True if the request must be paginated with a cursor. '''
+
+        requested = self.keyset_class.cursor_query_param in request.query_params
+        enabled = getattr(view, 'cursor_pagination', False)
+        if enabled is None:
+            if requested:
+                raise DataValidationError(
+                    details="cursor pagination is not available on this list, use offset pagination."
+                )
+            return False
+        return requested or enabled
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request, view):
+            self.keyset = self.keyset_class()
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,288 @@
+"""
+Full-text search indexes for Fake Shop API.
+
+A `SearchIndex` describes the documents of a model: the side table storing
+them and a few weighted text columns. Backends keep that table in sync and
+search it:
+- SQLite: an FTS5 virtual table ranked with bm25.
+- PostgreSQL: a tsvector table with a GIN index ranked with ts_rank.
+Any other database falls back to icontains lookups.
+"""
+
+import re
+import logging
+from django.db import connections, router
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+logger = logging.getLogger(__name__)
+
+# MAXIMUM NUMBER OF TERMS TAKEN FROM A SEARCH QUERY
+MAX_TERMS = 10
+
+# POSTGRESQL WEIGHT LABELS, BY DECREASING WEIGHT
+LABELS = 'ABCD'
+
+
+def parse_terms(query: str):
+    ''' Split a raw user query into safe search terms. '''
+
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+####
+##      SEARCH INDEX
+#####
+class SearchIndex:
+    ''' Documents of one model, subclassed per indexed model. '''
+
+    model = None
+    # SIDE TABLE AND ITS COLUMN HOLDING THE MODEL ID
+    table = None
+    key = None
+    # INDEXED COLUMNS AND THEIR RELATIVE WEIGHTS, BY DECREASING WEIGHT (4 AT MOST)
+    columns = ()
+    weights = ()
+    # LOOKUPS OF THE icontains FALLBACK
+    search_fields = ()
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def documents(self, queryset):
+        ''' Yield (pk, *columns) rows to index. '''
+
+        raise NotImplementedError
+
+
+####
+##      BASE SEARCH BACKEND
+#####
+class BaseSearchBackend:
+    ''' Base class for search backends, icontains fallback. '''
+
+    def __init__(self, connection, index: SearchIndex):
+        self.connection = connection
+        self.index_spec = index
+        self.table = index.table
+
+    def setup(self):
+        ''' Create the index structures if they do not exist. '''
+        pass
+
+    def documents(self, queryset):
+        return self.index_spec.documents(queryset)
+
+    def index(self, queryset):
+        ''' (Re)index every object of queryset. '''
+        pass
+
+    def remove(self, pks):
+        ''' Remove objects from the index. '''
+        pass
+
+    def clear(self):
+        ''' Remove every object from the index. '''
+        pass
+
+    def rebuild(self, chunk_size=2000):
+        ''' Drop and rebuild the whole index, return the number of indexed objects. '''
+
+        self.setup()
+        self.clear()
+
+        queryset = self.index_spec.get_queryset()
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(pks), chunk_size):
+            self.index(queryset.filter(pk__in=pks[start:start + chunk_size]))
+        return len(pks)
+
+    def search(self, queryset, query: str):
+        ''' Filter queryset on query, best matches first. '''
+
+        terms = parse_terms(query)
+        if not terms:
+            return queryset
+        return self.filter(queryset, terms)
+
+    def filter(self, queryset, terms):
+        ''' Fallback: AND of icontains lookups across indexed fields. '''
+
+        for term in terms:
+            condition = Q()
+            for field in self.index_spec.search_fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        # MULTI-VALUED LOOKUPS DUPLICATE ROWS
+        return queryset.distinct()
+
+
+####
+##      SQLITE FTS5 SEARCH BACKEND
+#####
+class SQLiteSearchBackend(BaseSearchBackend):
+    ''' FTS5 based search backend, rows are keyed on a 63 bits digest of ids. '''
+
+    @staticmethod
+    def rowid(pk):
+        ''' Return the FTS rowid of an id. '''
+        return pk.int & (2 ** 63 - 1)
+
+    def setup(self):
+        columns = ', '.join(self.index_spec.columns)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+                f'{self.index_spec.key} UNINDEXED, {columns}, '
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def index(self, queryset):
+        rows = [
+            (self.rowid(pk), pk.hex, *texts)
+            for pk, *texts in self.documents(queryset)
+        ]
+        if not rows:
+            return
+        columns = ', '.join(self.index_spec.columns)
+        placeholders = ', '.join(['%s'] * (len(self.index_spec.columns) + 2))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} '
+                f'(rowid, {self.index_spec.key}, {columns}) '
+                f'VALUES ({placeholders})',
+                rows
+            )
+
+    def remove(self, pks):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(self.rowid(pk),) for pk in pks]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def filter(self, queryset, terms):
+        # PREFIX MATCH ON EVERY TERM, TERMS ARE QUOTED SO THEY ARE NEVER PARSED AS SYNTAX
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(w) for w in self.index_spec.weights)
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.{self.index_spec.key} = {queryset.model._meta.db_table}.id',
+                f'{self.table} MATCH %s',
+            ],
+            params=[match],
+            select={'search_rank': f'bm25({self.table}, 0, {weights})'},
+        ).order_by('search_rank', 'created')
+
+
+####
+##      POSTGRESQL SEARCH BACKEND
+#####
+class PostgreSQLSearchBackend(BaseSearchBackend):
+    ''' tsvector/GIN based search backend. '''
+
+    def setup(self):
+        model = self.index_spec.model
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                f'{self.index_spec.key} uuid PRIMARY KEY REFERENCES {model._meta.db_table} (id) '
+                'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table}_document_gin '
+                f'ON {self.table} USING GIN (document)'
+            )
+
+    def index(self, queryset):
+        rows = list(self.documents(queryset))
+        if not rows:
+            return
+        key = self.index_spec.key
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', %s), '{LABELS[i]}')"
+            for i in range(len(self.index_spec.columns))
+        )
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} ({key}, document) VALUES (%s, {document}) '
+                f'ON CONFLICT ({key}) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def remove(self, pks):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE {self.index_spec.key} = ANY(%s)', [list(pks)]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def filter(self, queryset, terms):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        # ts_rank WEIGHTS ARE {D, C, B, A}, RELATIVE TO THE HEAVIEST COLUMN
+        weights = list(self.index_spec.weights) + [0.0] * (len(LABELS) - len(self.index_spec.weights))
+        weights = '{' + ', '.join(str(w / weights[0]) for w in reversed(weights)) + '}'
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.{self.index_spec.key} = {queryset.model._meta.db_table}.id',
+                f"{self.table}.document @@ to_tsquery('simple', %s)",
+            ],
+            params=[tsquery],
+            select={
+                'search_rank': f"-ts_rank('{weights}', {self.table}.document, to_tsquery('simple', %s))"
+            },
+            select_params=[tsquery],
+        ).order_by('search_rank', 'created')
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(index: SearchIndex, using=None):
+    ''' Return the search backend of index matching its model database. '''
+
+    connection = connections[using or router.db_for_write(index.model)]
+    return BACKENDS.get(connection.vendor, BaseSearchBackend)(connection, index)
+
+
+####
+##      SEARCH INDEX FILTER
+#####
+class SearchIndexFilter(BaseFilterBackend):
+    ''' Full-text search through a search index, best matches first. '''
+
+    search_param = 'q'
+    legacy_search_param = 'search'
+    index_class = None
+
+    def get_search_query(self, request):
+        ''' Return the raw search query, "?search=" is kept for older clients. '''
+
+        return request.query_params.get(
+            self.search_param,
+            request.query_params.get(self.legacy_search_param, '')
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query.strip():
+            return queryset
+
+        return get_search_backend(self.index_class(), queryset.db).search(queryset, query)
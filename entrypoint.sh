@@ -3,6 +3,8 @@
 # RUN MIGRATIONS
 # python manage.py makemigrations
 python manage.py migrate --no-input
+# IDEMPOTENCY KEYS TABLE (CACHES["idempotency"] WITHOUT CACHE_REDIS_URL)
+python manage.py createcachetable
 
 # COLLECT STATIC
 # python manage.py collectstatic --no-input
@@ -77,6 +77,8 @@ LOCAL_APPS = [
     "apps.orders",
     "apps.billings",
     "apps.realtime",
+    "apps.outbox",
+    "apps.sales",
 ]
 
 INSTALLED_APPS = THIRDPARTY_APPS + LOCAL_APPS
@@ -124,7 +126,7 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter'
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',
     'EXCEPTION_HANDLER': 'drf_standardized_errors.handler.exception_handler',
     # 'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'PAGE_SIZE': 100
@@ -577,6 +579,75 @@ LOGGING = {
     },
 }
 
+# Cache (local memory for a single process, Redis when shared by gunicorn workers)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+    } if CACHE_REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fake-store",
+    },
+    # IDEMPOTENCY KEYS MUST BE SHARED BY EVERY WORKER: A DATABASE TABLE WITHOUT REDIS
+    # (UNIQUE cache_key, CREATED BY "manage.py createcachetable")
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+    } if CACHE_REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "idempotency_keys",
+    },
+}
+
+# Anonymous catalog responses cache
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+# Timeout used instead when the cache is private to each worker (no shared invalidation)
+RESPONSE_CACHE_LOCAL_TIMEOUT = int(os.getenv("RESPONSE_CACHE_LOCAL_TIMEOUT", 5))
+
+# Seconds a worker trusts its category tree when the cache is not shared (see apps.categories.tree)
+CATEGORY_TREE_TTL = int(os.getenv("CATEGORY_TREE_TTL", 5))
+
+# Products facets (/products/facets): price bucket lower bounds and brands returned
+PRODUCT_FACET_PRICE_BUCKETS = [0, 5000, 10000, 25000, 50000, 100000]
+PRODUCT_FACET_BRANDS_LIMIT = 50
+
+# Seconds stock stays reserved for an unpaid order (see apps.orders.managers.ReservationQuerySet)
+STOCK_RESERVATION_TTL = int(os.getenv("STOCK_RESERVATION_TTL", 900))
+
+# Responsive image derivatives (rendered in a process pool after upload)
+IMAGE_DERIVATIVES = {
+    "ASYNC": True,
+    "WORKERS": int(os.getenv("IMAGE_DERIVATIVES_WORKERS", 2)),
+    "SIZES": {"thumb": 160, "card": 480, "full": 1200},
+    "FORMATS": ("webp", "jpeg"),
+    "QUALITY": 80,
+}
+
+# Outbox relay (domain events delivered after commit, see apps.outbox.relay)
+OUTBOX = {
+    "ASYNC": True,
+    "WORKERS": int(os.getenv("OUTBOX_RELAY_WORKERS", 4)),
+    "BATCH_SIZE": 100,
+    "LEASE": 300,
+    "MAX_ATTEMPTS": 10,
+    "RETRY_DELAY": 5,
+    "MAX_RETRY_DELAY": 3600,
+    # PAYMENT PROVIDER CALLS GET THEIR OWN RELAY THREADS (SLOW PROVIDERS DO NOT DELAY OTHER EVENTS)
+    "QUEUES": {
+        "provider": {"WORKERS": int(os.getenv("OUTBOX_PROVIDER_WORKERS", 2))},
+    },
+}
+
+# Idempotency-Key on order / transaction creation (see core.idempotency)
+IDEMPOTENCY = {
+    "CACHE_ALIAS": "idempotency",
+    "TTL": 24 * 3600,
+    "LOCK_TIMEOUT": 60,
+    "WAIT": 10,
+}
+
 # Channel layer (Redis)
 CHANNEL_LAYERS = {
     "default": {
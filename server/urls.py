@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.cache import cache_stats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/',include('apps.authentications.urls')),
@@ -27,6 +29,8 @@ urlpatterns = [
     path('products/',include('apps.products.urls')),
     path('orders/',include('apps.orders.urls')),
     path('billings/',include('apps.billings.urls')),
+    path('sales/',include('apps.sales.urls')),
+    path('cache/stats',cache_stats),
 ]\
 + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)\
 + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)